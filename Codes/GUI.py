@@ -3,20 +3,37 @@ from PyQt5.QtWidgets import (
     QLineEdit, QCheckBox, QPushButton, QDialog, QDialogButtonBox, QFormLayout, QFileDialog, 
     QMessageBox, QAction, QSlider, QLabel, QSizePolicy, QSplitter
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+import logging
 import sys
 import numpy as np
 from scipy import io
 from scipy import interpolate
 import os
-from lookup import lookup
-from graph import plot_array
+from lookup import lookup, lookup_many
+from lazy_table import default_cache_dir, open_devices
+from lookup_worker import LookupWorker
+import lookup_stats
+from inputs import parse_inputs
+from response_surface import ResponseSurface
+from graph import BlitManager, plot_array
 from matplotlib.axis import Axis 
 import matplotlib.pyplot as plt
 
+logger = logging.getLogger(__name__)
+
+# Minimum interval between intersection plot updates while the slider moves
+SLIDER_THROTTLE_MS = 15
+
+# Formulas offered in the output and x lists; any other formula can be typed in (see expression.py)
+FIGURES_OF_MERIT = ["GM/(2*pi*CGG)", "GM*GM_ID/(2*pi*CGG)", "STH/(4*k*T*GM)", "SFL/GM**2"]
+
+# Redraw only the slider cursor and the intersection lines on slider moves (False: full redraws)
+BLIT_REDRAW = True
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -29,6 +46,23 @@ class MainWindow(QMainWindow):
         self.current_x_data = None
         self.current_y1_data = None
         self.current_y2_data = None
+
+        # Plot and slider lookups run on a background worker; only the latest
+        # request of each kind is computed
+        self.lookup_worker = LookupWorker(self)
+        self.lookup_worker.result_ready.connect(self.on_lookup_ready)
+        self.lookup_worker.failed.connect(self.on_lookup_failed)
+        self.lookup_worker.start()
+        self.plot_token = None
+        self.plot_request = None
+        self.intersection_token = None
+        self.pending_x_value = None
+        self.slider_timer = QTimer(self)
+        self.slider_timer.setSingleShot(True)
+        self.slider_timer.setInterval(SLIDER_THROTTLE_MS)
+        self.slider_timer.timeout.connect(self.request_intersection_plot)
+        # Y1/Y2 precomputed over the slider range on each plot update, see _response_surfaces()
+        self.response_surfaces = None
         
         # Create main widget and layout
         main_widget = QWidget()
@@ -56,6 +90,8 @@ class MainWindow(QMainWindow):
         
         self.canvas1 = FigureCanvas(self.fig1)
         plot1_layout.addWidget(self.canvas1)
+        self.blit1 = BlitManager(self.canvas1, BLIT_REDRAW)
+        self.cursor_line = None
         
         # Create and add the first toolbar
         self.toolbar1 = CustomNavigationToolbar(self.canvas1, self)
@@ -97,6 +133,8 @@ class MainWindow(QMainWindow):
         self.ax4 = self.ax3.twinx()  # Create twin axis
         self.canvas2 = FigureCanvas(self.fig2)
         plot2_layout.addWidget(self.canvas2)
+        self.blit2 = BlitManager(self.canvas2, BLIT_REDRAW)
+        self.intersection_lines = None
         
         # Create and add the second toolbar
         self.toolbar2 = CustomNavigationToolbar(self.canvas2, self)
@@ -142,6 +180,13 @@ class MainWindow(QMainWindow):
             "CSG", "CGD", "CDG", "CGB", "CDD", "CSS", "STH", "SFL","CDD_CDG","CDD_CGB","CDD_CGD","CDD_CGG","CDD_CGS","CDD_CSG","CDD_CSS","CDD_GDS","CDD_GM","CDD_GMB","CDD_ID","CDD_IGD","CDD_IGS","CDD_L","CDD_SFL","CDD_STH","CDD_VDS","CDD_VGS","CDD_VSB","CDD_VT","CDD_W","CDG_CDD","CDG_CGB","CDG_CGD","CDG_CGG","CDG_CGS","CDG_CSG","CDG_CSS","CDG_GDS","CDG_GM","CDG_GMB","CDG_ID","CDG_IGD","CDG_IGS","CDG_L","CDG_SFL","CDG_STH","CDG_VDS","CDG_VGS","CDG_VSB","CDG_VT","CDG_W","CGB_CDD","CGB_CDG","CGB_CGD","CGB_CGG","CGB_CGS","CGB_CSG","CGB_CSS","CGB_GDS","CGB_GM","CGB_GMB","CGB_ID","CGB_IGD","CGB_IGS","CGB_L","CGB_SFL","CGB_STH","CGB_VDS","CGB_VGS","CGB_VSB","CGB_VT","CGB_W","CGD_CDD","CGD_CDG","CGD_CGB","CGD_CGG","CGD_CGS","CGD_CSG","CGD_CSS","CGD_GDS","CGD_GM","CGD_GMB","CGD_ID","CGD_IGD","CGD_IGS","CGD_L","CGD_SFL","CGD_STH","CGD_VDS","CGD_VGS","CGD_VSB","CGD_VT","CGD_W","CGG_CDD","CGG_CDG","CGG_CGB","CGG_CGD","CGG_CGS","CGG_CSG","CGG_CSS","CGG_GDS","CGG_GM","CGG_GMB","CGG_ID","CGG_IGD","CGG_IGS","CGG_L","CGG_SFL","CGG_STH","CGG_VDS","CGG_VGS","CGG_VSB","CGG_VT","CGG_W","CGS_CDD","CGS_CDG","CGS_CGB","CGS_CGD","CGS_CGG","CGS_CSG","CGS_CSS","CGS_GDS","CGS_GM","CGS_GMB","CGS_ID","CGS_IGD","CGS_IGS","CGS_L","CGS_SFL","CGS_STH","CGS_VDS","CGS_VGS","CGS_VSB","CGS_VT","CGS_W","CSG_CDD","CSG_CDG","CSG_CGB","CSG_CGD","CSG_CGG","CSG_CGS","CSG_CSS","CSG_GDS","CSG_GM","CSG_GMB","CSG_ID","CSG_IGD","CSG_IGS","CSG_L","CSG_SFL","CSG_STH","CSG_VDS","CSG_VGS","CSG_VSB","CSG_VT","CSG_W","CSS_CDD","CSS_CDG","CSS_CGB","CSS_CGD","CSS_CGG","CSS_CGS","CSS_CSG","CSS_GDS","CSS_GM","CSS_GMB","CSS_ID","CSS_IGD","CSS_IGS","CSS_L","CSS_SFL","CSS_STH","CSS_VDS","CSS_VGS","CSS_VSB","CSS_VT","CSS_W","GDS_CDD","GDS_CDG","GDS_CGB","GDS_CGD","GDS_CGG","GDS_CGS","GDS_CSG","GDS_CSS","GDS_GM","GDS_GMB","GDS_ID","GDS_IGD","GDS_IGS","GDS_L","GDS_SFL","GDS_STH","GDS_VDS","GDS_VGS","GDS_VSB","GDS_VT","GDS_W","GMB_CDD","GMB_CDG","GMB_CGB","GMB_CGD","GMB_CGG","GMB_CGS","GMB_CSG","GMB_CSS","GMB_GDS","GMB_GM","GMB_ID","GMB_IGD","GMB_IGS","GMB_L","GMB_SFL","GMB_STH","GMB_VDS","GMB_VGS","GMB_VSB","GMB_VT","GMB_W","GM_CDD","GM_CDG","GM_CGB","GM_CGD","GM_CGG","GM_CGS","GM_CSG","GM_CSS","GM_GDS","GM_GMB","GM_ID","GM_IGD","GM_IGS","GM_L","GM_SFL","GM_STH","GM_VDS","GM_VGS","GM_VSB","GM_VT","GM_W","ID_CDD","ID_CDG","ID_CGB","ID_CGD","ID_CGG","ID_CGS","ID_CSG","ID_CSS","ID_GDS","ID_GM","ID_GMB","ID_IGD","ID_IGS","ID_L","ID_SFL","ID_STH","ID_VDS","ID_VGS","ID_VSB","ID_VT","ID_W","IGD_CDD","IGD_CDG","IGD_CGB","IGD_CGD","IGD_CGG","IGD_CGS","IGD_CSG","IGD_CSS","IGD_GDS","IGD_GM","IGD_GMB","IGD_ID","IGD_IGS","IGD_L","IGD_SFL","IGD_STH","IGD_VDS","IGD_VGS","IGD_VSB","IGD_VT","IGD_W","IGS_CDD","IGS_CDG","IGS_CGB","IGS_CGD","IGS_CGG","IGS_CGS","IGS_CSG","IGS_CSS","IGS_GDS","IGS_GM","IGS_GMB","IGS_ID","IGS_IGD","IGS_L","IGS_SFL","IGS_STH","IGS_VDS","IGS_VGS","IGS_VSB","IGS_VT","IGS_W","L_CDD","L_CDG","L_CGB","L_CGD","L_CGG","L_CGS","L_CSG","L_CSS","L_GDS","L_GM","L_GMB","L_ID","L_IGD","L_IGS","L_SFL","L_STH","L_VDS","L_VGS","L_VSB","L_VT","L_W","SFL_CDD","SFL_CDG","SFL_CGB","SFL_CGD","SFL_CGG","SFL_CGS","SFL_CSG","SFL_CSS","SFL_GDS","SFL_GM","SFL_GMB","SFL_ID","SFL_IGD","SFL_IGS","SFL_L","SFL_STH","SFL_VDS","SFL_VGS","SFL_VSB","SFL_VT","SFL_W","STH_CDD","STH_CDG","STH_CGB","STH_CGD","STH_CGG","STH_CGS","STH_CSG","STH_CSS","STH_GDS","STH_GM","STH_GMB","STH_ID","STH_IGD","STH_IGS","STH_L","STH_SFL","STH_VDS","STH_VGS","STH_VSB","STH_VT","STH_W","VDS_CDD","VDS_CDG","VDS_CGB","VDS_CGD","VDS_CGG","VDS_CGS","VDS_CSG","VDS_CSS","VDS_GDS","VDS_GM","VDS_GMB","VDS_ID","VDS_IGD","VDS_IGS","VDS_L","VDS_SFL","VDS_STH","VDS_VGS","VDS_VSB","VDS_VT","VDS_W","VGS_CDD","VGS_CDG","VGS_CGB","VGS_CGD","VGS_CGG","VGS_CGS","VGS_CSG","VGS_CSS","VGS_GDS","VGS_GM","VGS_GMB","VGS_ID","VGS_IGD","VGS_IGS","VGS_L","VGS_SFL","VGS_STH","VGS_VDS","VGS_VSB","VGS_VT","VGS_W","VSB_CDD","VSB_CDG","VSB_CGB","VSB_CGD","VSB_CGG","VSB_CGS","VSB_CSG","VSB_CSS","VSB_GDS","VSB_GM","VSB_GMB","VSB_ID","VSB_IGD","VSB_IGS","VSB_L","VSB_SFL","VSB_STH","VSB_VDS","VSB_VGS","VSB_VT","VSB_W","VT_CDD","VT_CDG","VT_CGB","VT_CGD","VT_CGG","VT_CGS","VT_CSG","VT_CSS","VT_GDS","VT_GM","VT_GMB","VT_ID","VT_IGD","VT_IGS","VT_L","VT_SFL","VT_STH","VT_VDS","VT_VGS","VT_VSB","VT_W","W_CDD","W_CDG","W_CGB","W_CGD","W_CGG","W_CGS","W_CSG","W_CSS","W_GDS","W_GM","W_GMB","W_ID","W_IGD","W_IGS","W_L","W_SFL","W_STH","W_VDS","W_VGS","W_VSB","W_VT"
         ])
         output_layout.addWidget(self.inputx_combo)
+
+        # Outputs and x also accept formulas of the table fields, e.g. GM/(2*pi*CGG)
+        for combo in (self.output1_combo, self.output2_combo, self.inputx_combo):
+            combo.addItems(FIGURES_OF_MERIT)
+            combo.setEditable(True)
+            combo.setInsertPolicy(QComboBox.NoInsert)
+            combo.setToolTip("Pick a name or type a formula such as GM/(2*pi*CGG)")
         output_layout.addWidget(QLabel("scale:"))
         self.inputxscale_combo = QComboBox()
         self.inputxscale_combo.addItems(["linear","log"])
@@ -223,22 +268,26 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(main_widget)
 
     def load_data(self):
-        """Load .mat file containing transistor data."""
-        file_name, _ = QFileDialog.getOpenFileName(self, "Load .mat File", "", "MAT files (*.mat)")
+        """Load .mat file (or native .gmid table) containing transistor data."""
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load .mat File", "", "MAT files (*.mat);;Native tables (*.gmid)")
         if file_name:
             try:
-                data = io.loadmat(file_name)
-                print("Available keys in loaded data:", data.keys())
+                # Open the devices lazily; each field is read when a plot first needs it.
+                # v5/v7 .mat files are converted once and reused from the cache on later loads
+                devices = open_devices(file_name, cache_dir=default_cache_dir())
+                logger.info("Available devices in loaded data: %s", list(devices))
 
-                # Try loading both nch and pch data
-                self.nch_data = data.get('nch', None)
-                self.pch_data = data.get('pch', None)
+                self.nch_data = devices.get('nch')
+                self.pch_data = devices.get('pch')
+                self.response_surfaces = None
+                # Results still computed for the previous file are dropped
+                self.plot_token = self.intersection_token = None
 
                 if self.nch_data is None and self.pch_data is None:
                     raise ValueError("Neither 'nch' nor 'pch' data found in the .mat file.")
                 QMessageBox.information(self, "Data Loaded", "Data loaded successfully!")
             except Exception as e:
-                print(f"Error loading data: {e}")
+                logger.error("Error loading data: %s", e)
                 QMessageBox.critical(self, "Load Error", f"Could not load .mat file: {str(e)}")
            
     def update_slider_value(self):
@@ -252,17 +301,19 @@ class MainWindow(QMainWindow):
             # Update label
             self.x_value_display.setText(f"{x_value:.6f}")
             
-            # Remove old vertical lines from first plot
-            for line in self.ax1.lines:
-                if hasattr(line, 'get_label') and line.get_label() == 'vline':
-                    line.remove()
-            
-            # Draw new vertical line on first plot
-            self.ax1.axvline(x=x_value, linestyle='--', color='black', label='vline')
-            self.canvas1.draw()
+            # Move the vertical line on the first plot, redrawing only the line
+            if self.cursor_line is None:
+                self.cursor_line = self.blit1.add(
+                    self.ax1.axvline(x=x_value, linestyle='--', color='black', label='vline'))
+            else:
+                self.cursor_line.set_xdata([x_value, x_value])
+            self.blit1.update()
             
-            # Update second plot
-            self.update_intersection_plot(x_value)
+            # Update the second plot at most every SLIDER_THROTTLE_MS while the slider
+            # moves; the timer picks up the latest position when it fires
+            self.pending_x_value = x_value
+            if not self.slider_timer.isActive():
+                self.slider_timer.start()
     
     def enable_tooltip(self):
         """
@@ -279,7 +330,7 @@ class MainWindow(QMainWindow):
         self.canvas1.mpl_connect("motion_notify_event", on_hover)
         
     def prepare_lookup1(self):
-        """Prepare and call lookup function with selected inputs."""
+        """Read the selected inputs and compute the first plot on the lookup worker."""
         try:
             x_var = self.inputx_combo.currentText()
             y1_var = self.output1_combo.currentText()
@@ -287,154 +338,164 @@ class MainWindow(QMainWindow):
             x_scale_var=self.inputxscale_combo.currentText()
             y1_scale_var=self.output1scale_combo.currentText()
             y2_scale_var=self.output2scale_combo.currentText()
-            # Print detailed debug information
-            print("------- Lookup Debug -------")
-            print(f"X Variable: {x_var}")
-            print(f"Y1 Variable: {y1_var}")
-            print(f"Y2 Variable: {y2_var}")
+            logger.debug("Lookup: x=%s, y1=%s, y2=%s", x_var, y1_var, y2_var)
         
             # Check if data is loaded
             if self.nch_data is None and self.pch_data is None:
-                print("ERROR: No data loaded!")
+                logger.error("No data loaded")
                 QMessageBox.critical(self, "Data Error", "No .mat file has been loaded")
                 return None
-            
-            # Store which parameter has multiple values and what those values are
-            self.varying_param = None
-            self.varying_values = None
-            
-            
-            # Prepare input parameters
-            input_params = {}
-            input_combos = [
-                (self.input1_combo, self.input1_field),
-                (self.input2_combo, self.input2_field),
-                (self.input3_combo, self.input3_field),
-                (self.input4_combo, self.input4_field)
-            ]
-
-            for combo, field in input_combos:
-                param = combo.currentText()
-                value = field.text()
-                if param and value:
-                    try:
-                        # Try different parsing strategies
-                        if ':' in value:
-                        # Parse colon-separated range
-                            start, step, end = map(float, value.split(':'))
-                            parsed_value = np.arange(start, end, step)
-                        elif ',' in value:
-                            # Comma-separated list
-                            parsed_value = np.array([float(x.strip()) for x in value.split(',')])
-                        else:
-                            # Single value
-                            parsed_value = float(value)
-                    
-                        input_params[param] = parsed_value
-                        print(f"Input Parameter: {param} = {parsed_value}")
-                    except ValueError as ve:
-                        print(f"ERROR parsing {param}: {ve}")
-                        QMessageBox.warning(self, "Input Error", f"Invalid value for {param}: {value}")
-                        return None
-            
-            for combo, field in input_combos:
-                param = combo.currentText()
-                value = field.text()
-                if param and value:
-                    if ':' in value or ',' in value:
-                        self.varying_param = param
-                        if ':' in value:
-                            start, step, end = map(float, value.split(':'))
-                            self.varying_values = np.arange(start, end, step)
-                        else:
-                            self.varying_values = np.array([float(x.strip()) for x in value.split(',')])            
-            
-            # Initialize results
-            x_result = None
-            y1_result = None
-            y2_result = None
-            # Attempt lookup for each output variable
-            try:
-                print("\nAttempting Lookup:")
-                if self.nch_data is not None:
-                    if y1_var != "": y1_result = lookup(self.nch_data, y1_var, **input_params)
-                    if y2_var != "":y2_result = lookup(self.nch_data, y2_var, **input_params)
-                    x_result = lookup(self.nch_data,x_var,**input_params)
-                elif self.pch_data is not None:
-                    if y1_var != "":y1_result = lookup(self.pch_data, y1_var, **input_params)
-                    if y2_var != "":y2_result = lookup(self.pch_data, y2_var, **input_params)
-                    x_result = lookup(self.pch_data,x_var,**input_params)
-                else:
-                    print("Invalid Data loaded")
-                # Print detailed lookup results
-                if y1_result is not None:
-                    print("Y1 Result:")
-                    print(y1_result)
-                if y2_result is not None:
-                    print("\nY2 Result:")
-                    print(y2_result)
-
-                print("\nX Result:")
-                print(x_result)
-
-                # Call plot_array with results
-                if x_result is not None:
-                    self.current_x_data = x_result  # Store the x-axis data                    
-                    if y1_result is not None and y2_result is not None:
-                        plot_array(x_result,y1_result, y2_result,canvas=self.canvas1,ax1=self.ax1,ax2=self.ax2,x_label=x_var,y1_label=y1_var,y2_label=y2_var,x_scale=x_scale_var,y1_scale=y1_scale_var,y2_scale=y2_scale_var)
-                    elif y1_result is not None and y2_result is None:
-                        plot_array(x_result,y1_result,canvas=self.canvas1,ax1=self.ax1,ax2=self.ax2,x_label=x_var,y1_label=y1_var,y2_label=y2_var,x_scale=x_scale_var,y1_scale=y1_scale_var,y2_scale=y2_scale_var)
-                    elif y1_result is None and y2_result is not None:
-                        plot_array(x_result,y2_result,canvas=self.canvas1,ax1=self.ax1,ax2=self.ax2,x_label=x_var,y1_label=y1_var,y2_label=y2_var,x_scale=x_scale_var,y1_scale=y1_scale_var,y2_scale=y2_scale_var)
-                
-                    # Reset slider to 0 and update the vertical line
-                    self.x_slider.setValue(0)
-                    self.update_slider_value()
-                else:
-                    QMessageBox.warning(self, "Lookup Error", "Failed to retrieve data for plotting")
-
-            except Exception as lookup_error:
-                print(f"Lookup Error: {lookup_error}")
-                QMessageBox.critical(self, "Lookup Error", str(lookup_error))
+
+            # Prepare input parameters (same syntax as the batch plot specs)
+            input_params = self._input_params()
+            if input_params is None:
+                return None
+            input_params, varying = input_params
+
+            # The lookups and response surfaces are computed on the worker, on_plot_ready() draws them
+            data = self.nch_data if self.nch_data is not None else self.pch_data
+            self.plot_request = {'x_var': x_var, 'y1_var': y1_var, 'y2_var': y2_var, 'x_scale': x_scale_var,
+                                 'y1_scale': y1_scale_var, 'y2_scale': y2_scale_var, 'varying': varying}
+            self.plot_token = self.lookup_worker.submit(
+                lambda: self._plot_values(data, x_var, y1_var, y2_var, input_params, varying), channel='plot')
     
         except Exception as e:
             QMessageBox.critical(self, "Unexpected Error", f"An unexpected error occurred: {str(e)}")
 
-    
+    @staticmethod
+    def _plot_values(data, x_var, y1_var, y2_var, input_params, varying):
+        """Results of the first plot and the slider response surfaces (runs on the lookup worker)."""
+        # x, y1 and y2 share one parsing and bracketing of the inputs
+        results = lookup_many(data, [var for var in (x_var, y1_var, y2_var) if var != ""], **input_params)
+        logger.debug("Lookup results: %s", {var: np.shape(values) for var, values in results.items()})
+        surfaces = MainWindow._response_surfaces(data, results[x_var], x_var, y1_var, y2_var,
+                                                 input_params, varying)
+        return results, surfaces
+
+    def on_plot_ready(self, result):
+        """Draw the first plot from the worker results and reset the slider."""
+        results, surfaces = result
+        request = self.plot_request
+        x_var, y1_var, y2_var = request['x_var'], request['y1_var'], request['y2_var']
+        x_result = results[x_var]
+        y_results = [results[var] for var in (y1_var, y2_var) if var != ""]
+
+        # Store which parameter has multiple values and what those values are
+        self.varying_param, self.varying_values = request['varying'] or (None, None)
+        self.current_x_data = x_result  # Store the x-axis data
+        # plot_array() clears the axes, the cursor and intersection lines are recreated
+        self.blit1.clear()
+        self.cursor_line = None
+        self.intersection_lines = None
+        if y_results:
+            plot_array(x_result, *y_results, canvas=self.canvas1, ax1=self.ax1, ax2=self.ax2, x_label=x_var,
+                       y1_label=y1_var, y2_label=y2_var, x_scale=request['x_scale'],
+                       y1_scale=request['y1_scale'], y2_scale=request['y2_scale'])
+
+        # Intersection plot values for every slider position
+        self.response_surfaces = surfaces
+
+        # Reset slider to 0 and update the vertical line
+        self.x_slider.setValue(0)
+        self.update_slider_value()
 
     def update_plot1(self):
-        """Update the first plot and store current data"""
+        """Compute the first plot on the lookup worker; on_plot_ready() draws it and resets the slider."""
         if self.nch_data is None and self.pch_data is None:
             QMessageBox.warning(self, "Data Error", "Please load a .mat file first")
             return
-        
-        result = self.prepare_lookup1()
-        if result is not None:
-            self.current_x_data, self.current_y1_data, self.current_y2_data = result
-            
-            # Reset slider to 0 and update both plots
-            self.x_slider.setValue(0)
-            self.update_slider_value()
-    
-    def update_plot2(self):
-        """Update the second plot with current intersection points"""
-        if self.current_x_data is None:
-            QMessageBox.warning(self, "Plot Error", "Please update Plot 1 first")
-            return
-        
-        # Get current slider value and update intersection plot
-        slider_pos = self.x_slider.value() / 10000
-        x_min, x_max = np.min(self.current_x_data), np.max(self.current_x_data)
-        x_value = x_min + slider_pos * (x_max - x_min)
-        self.update_intersection_plot(x_value)
-
-    def update_intersection_plot(self, x_value):
-        """Update the second plot with values across the varying parameter and find intersection points."""
-        print("Debugging intersection plot:")
-        print(f"Varying param: {self.varying_param}")
-        print(f"Varying values: {self.varying_values}")
-        print(f"Current x value: {x_value}")
+        self.prepare_lookup1()
 
+    @staticmethod
+    def _response_surfaces(data, x_data, x_var, y1_var, y2_var, input_params, varying):
+        """
+        Evaluate Y1 and Y2 over the whole slider range for every varying value in
+        one batched lookup each, so slider moves only interpolate between rows.
+        Returns None (per-position lookups) if that is not possible.
+        """
+        if varying is None:
+            return None
+        x_range = (np.min(x_data), np.max(x_data))
+        if not np.all(np.isfinite(x_range)) or x_range[1] <= x_range[0]:
+            return None
+
+        varying_param, varying_values = varying
+        try:
+            return tuple(
+                ResponseSurface.build(data, y_var, x_var, x_range, varying_param,
+                                      varying_values, input_params) if y_var != "" else None
+                for y_var in (y1_var, y2_var))
+        except Exception as e:
+            logger.debug("Response surface not available, using per-position lookups: %s", e)
+            return None
+
+    def show_surface_values(self, x_value):
+        """Update the second plot from the precomputed response surfaces."""
+        y1_surface, y2_surface = self.response_surfaces
+        self._store_intersection(y1_surface(x_value) if y1_surface is not None else None,
+                                 y2_surface(x_value) if y2_surface is not None else None)
+        self.draw_intersection_plot(x_value)
+
+    def request_intersection_plot(self):
+        """
+        Update the second plot for the latest slider position: from the precomputed
+        response surfaces if available, otherwise through the background worker.
+        """
+        x_value = self.pending_x_value
+        logger.debug("Intersection plot: %s varying, x = %s", self.varying_param, x_value)
+        if self.response_surfaces is not None and x_value is not None:
+            self.show_surface_values(x_value)
+            return
+        inputs = self._intersection_inputs()
+        if inputs is None or x_value is None:
+            return
+        self.intersection_token = self.lookup_worker.submit(
+            lambda: (x_value, *self._intersection_values(x_value=x_value, **inputs)), channel='slider')
+
+    def on_lookup_ready(self, token, result):
+        """Show worker results unless a newer request of the same kind has been made since."""
+        if token == self.plot_token:
+            self.on_plot_ready(result)
+        elif token == self.intersection_token:
+            self.on_intersection_ready(result)
+
+    def on_intersection_ready(self, result):
+        x_value, y1_result, y2_result = result
+        self._store_intersection(y1_result, y2_result)
+        self.draw_intersection_plot(x_value)
+
+    def on_lookup_failed(self, token, message):
+        logger.error("Lookup error: %s", message)
+        if token == self.plot_token:
+            QMessageBox.critical(self, "Lookup Error", message)
+        elif token == self.intersection_token:
+            # Errors while dragging go to the status bar instead of a dialog per tick
+            self.statusBar().showMessage(f"Lookup error: {message}", 5000)
+
+    def _input_params(self):
+        """
+        Parse the four input fields with inputs.parse_inputs().
+        Returns (input_params, varying), or None (after a warning) if a value is invalid.
+        """
+        fields = {}
+        for combo, field in ((self.input1_combo, self.input1_field), (self.input2_combo, self.input2_field),
+                             (self.input3_combo, self.input3_field), (self.input4_combo, self.input4_field)):
+            if field.text():
+                fields[combo.currentText()] = field.text()
+        try:
+            input_params, varying = parse_inputs(fields)
+        except ValueError as ve:
+            logger.warning("Could not parse input: %s", ve)
+            QMessageBox.warning(self, "Input Error", str(ve))
+            return None
+        logger.debug("Input parameters: %s", input_params)
+        return input_params, varying
+
+    def _intersection_inputs(self):
+        """
+        Read the selected variables and input fields used by the intersection plot.
+        Returns None (after reporting the problem) if no data is loaded or an input is invalid.
+        """
         try:
             x_var = self.inputx_combo.currentText()
             y1_var = self.output1_combo.currentText()
@@ -442,105 +503,126 @@ class MainWindow(QMainWindow):
 
             # Check if data is loaded
             if self.nch_data is None and self.pch_data is None:
-                print("ERROR: No data loaded!")
+                logger.error("No data loaded")
                 QMessageBox.critical(self, "Data Error", "No .mat file has been loaded")
-                return
+                return None
 
             # Prepare input parameters
-            input_params = {}
-            input_combos = [
-                (self.input1_combo, self.input1_field),
-                (self.input2_combo, self.input2_field),
-                (self.input3_combo, self.input3_field),
-                (self.input4_combo, self.input4_field),
-            ]
-
-            for combo, field in input_combos:
-                param = combo.currentText()
-                if param:  # Ensure the parameter is selected
-                    if isinstance(field, QLineEdit):
-                        value = field.text()
-                    else:
-                        value = field  # Handle non-text fields
-
-                    if value:
-                        try:
-                            # Parse value for different formats
-                            if ':' in value:
-                                start, step, end = map(float, value.split(':'))
-                                parsed_value = np.arange(start, end, step)
-                            elif ',' in value:
-                                parsed_value = np.array([float(x.strip()) for x in value.split(',')])
-                            else:
-                                parsed_value = float(value)
-
-                            input_params[param] = parsed_value
-                            print(f"Input Parameter: {param} = {parsed_value}")
-                        except ValueError as ve:
-                            print(f"ERROR parsing {param}: {ve}")
-                            QMessageBox.warning(self, "Input Error", f"Invalid value for {param}: {value}")
-                            return
-
-            try:
-                print("\nAttempting Lookup:")
-                if self.nch_data is not None:
-                    if y1_var != "":self.current_y1_data = lookup(self.nch_data, y1_var, x_var, x_value, **input_params)
-                    if y2_var != "":self.current_y2_data = lookup(self.nch_data, y2_var, x_var, x_value, **input_params)
-                elif self.pch_data is not None:
-                    if y1_var != "":self.current_y1_data = lookup(self.pch_data, y1_var, x_var, x_value, **input_params)
-                    if y2_var != "":self.current_y2_data = lookup(self.pch_data, y2_var, x_var, x_value, **input_params)
-                else:
-                    print("Invalid Data loaded")
-
-            except Exception as lookup_error:
-                print(f"Lookup Error: {lookup_error}")
-                QMessageBox.critical(self, "Lookup Error", str(lookup_error))
-                return
+            input_params = self._input_params()
+            if input_params is None:
+                return None
+            input_params, _ = input_params
 
         except Exception as e:
             QMessageBox.critical(self, "Unexpected Error", f"An unexpected error occurred: {str(e)}")
-            return
-
+            return None
+
+        data = self.nch_data if self.nch_data is not None else self.pch_data
+        return {'data': data, 'x_var': x_var, 'y1_var': y1_var, 'y2_var': y2_var, 'input_params': input_params}
+
+    @staticmethod
+    def _intersection_values(data, x_var, y1_var, y2_var, x_value, input_params):
+        """Y1 and Y2 across the varying parameter at x_value (safe to run on the lookup worker)."""
+        y1_result = lookup(data, y1_var, x_var, x_value, **input_params) if y1_var != "" else None
+        y2_result = lookup(data, y2_var, x_var, x_value, **input_params) if y2_var != "" else None
+        return y1_result, y2_result
+
+    def _store_intersection(self, y1_result, y2_result):
+        if y1_result is not None:
+            self.current_y1_data = y1_result
+        if y2_result is not None:
+            self.current_y2_data = y2_result
+
+    def draw_intersection_plot(self, x_value):
+        """Draw the current Y1/Y2 intersection values across the varying parameter."""
         if self.varying_param is None or self.varying_values is None:
-            print("No varying parameter found")
+            logger.debug("No varying parameter found")
             return
 
-        # Clear both axes
-        self.ax3.clear()
-        self.ax4.clear()
-
         # Flatten y1_values and y2_values if necessary
         y1_values = np.ravel(self.current_y1_data) if self.current_y1_data is not None else None
         y2_values = np.ravel(self.current_y2_data) if self.current_y2_data is not None else None
 
-        # Debug print for shapes
-        print(f"self.varying_values shape: {self.varying_values.shape}")
-        print(f"y1_values shape: {y1_values.shape if y1_values is not None else 'None'}")
-        print(f"y2_values shape: {y2_values.shape if y2_values is not None else 'None'}")
+        logger.debug("Varying values %s, y1 %s, y2 %s", self.varying_values.shape,
+                     y1_values.shape if y1_values is not None else None,
+                     y2_values.shape if y2_values is not None else None)
 
-        # Plot Y1 on left axis
-        if y1_values is not None:
-            self.ax3.plot(self.varying_values, y1_values, 'r-', label=y1_var)
-            self.ax3.set_ylabel(y1_var, color='r')
-            self.ax3.tick_params(axis='y', labelcolor='r')
-    
-        # Plot Y2 on right axis
-        if y2_values is not None:
-            self.ax4.plot(self.varying_values, y2_values, 'b-', label=y2_var)
-            self.ax4.set_ylabel(y2_var, color='b')
-            self.ax4.tick_params(axis='y', labelcolor='b')
+        title = f'Values at {self.inputx_combo.currentText()} = {x_value:.3f}'
+        if self.intersection_lines is None:
+            self.setup_intersection_plot(title, y1_values, y2_values)
+            return
+
+        # Move the existing lines; a full redraw is only needed when they leave the y range
+        rescale = False
+        for ax, values in ((self.ax3, y1_values), (self.ax4, y2_values)):
+            line = self.intersection_lines.get(ax)
+            if line is None or values is None:
+                continue
+            line.set_ydata(values)
+            finite = values[np.isfinite(values)]
+            low, high = ax.get_ylim()
+            if finite.size and (finite.min() < low or finite.max() > high):
+                ax.relim()
+                ax.autoscale(axis='y')
+                rescale = True
+        self.ax3.title.set_text(title)
+
+        if rescale:
+            self.canvas2.draw()
+        else:
+            self.blit2.update()
+
+    def setup_intersection_plot(self, title, y1_values, y2_values):
+        """
+        Draw the second plot from scratch: axes, labels and the Y1/Y2 lines that
+        draw_intersection_plot() then moves on every slider position.
+        """
+        y1_var = self.output1_combo.currentText()
+        y2_var = self.output2_combo.currentText()
+
+        # Clear both axes
+        self.blit2.clear()
+        self.ax3.clear()
+        self.ax4.clear()
+        self.intersection_lines = {}
+        surfaces = self.response_surfaces or (None, None)
+
+        # Plot Y1 on left axis and Y2 on right axis
+        for ax, values, y_var, color, surface in ((self.ax3, y1_values, y1_var, 'r', surfaces[0]),
+                                                  (self.ax4, y2_values, y2_var, 'b', surfaces[1])):
+            if values is None:
+                continue
+            line, = ax.plot(self.varying_values, values, f'{color}-', label=y_var)
+            self.intersection_lines[ax] = self.blit2.add(line)
+            ax.set_ylabel(y_var, color=color)
+            ax.tick_params(axis='y', labelcolor=color)
+
+            # Every slider position is known in advance, so the y range can cover all of them
+            if surface is not None:
+                ax.update_datalim(np.column_stack([np.resize(self.varying_values, surface.values.size),
+                                                   surface.values.ravel()]))
+                ax.autoscale_view()
 
         # Set x-axis label
         self.ax3.set_xlabel(self.varying_param)
 
         # Add a title showing the x-value
-        self.ax3.set_title(f'Values at {self.inputx_combo.currentText()} = {x_value:.3f}')
+        self.ax3.set_title(title)
+        self.blit2.add(self.ax3.title)
 
         # Add grid (only for left axis to avoid cluttering)
         self.ax3.grid(True, alpha=0.3)
 
         # Draw the canvas
         self.canvas2.draw()
+
+    def closeEvent(self, event):
+        """Stop the lookup worker before the window closes."""
+        self.slider_timer.stop()
+        self.lookup_worker.stop()
+        if lookup_stats.ENABLED:
+            logger.debug("Lookup statistics:\n%s", lookup_stats.report())
+        super().closeEvent(event)
     
 class CustomNavigationToolbar(NavigationToolbar):
     def __init__(self, canvas, parent=None):
@@ -583,6 +665,11 @@ class CustomNavigationToolbar(NavigationToolbar):
         self.canvas.draw()
         
 if __name__ == "__main__":
+    # Pass --debug to log every lookup and collect lookup statistics
+    if '--debug' in sys.argv:
+        lookup_stats.ENABLED = True
+    logging.basicConfig(level=logging.DEBUG if '--debug' in sys.argv else logging.INFO,
+                        format="%(asctime)s %(name)s %(levelname)s: %(message)s")
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from graph import plot_array
+from inputs import parse_inputs
+from lazy_table import open_lazy
+from lookup import lookup_many
+
+logger = logging.getLogger(__name__)
+
+# Headless batch rendering of the GUI's x/Y1/Y2 plots. A JSON spec lists the
+# plots; every plot is looked up and drawn through graph.plot_array() on an
+# Agg canvas (no display needed), and the plots are spread over a process
+# pool. Each worker opens the device file lazily itself, so only the fields
+# its plots use are read. Example spec:
+#
+#   {
+#     "data": "nch_18.mat",
+#     "formats": ["png", "svg"],
+#     "defaults": {"inputs": {"VDS": "0.6"}},
+#     "plots": [
+#       {"name": "gm_id", "x": "VGS", "y1": "GM_ID", "y2": "ID_W", "y2_scale": "log",
+#        "inputs": {"L": "0.2:0.1:0.7"}},
+#       {"name": "ft", "x": "GM_ID", "y1": "GM/(2*pi*CGG)", "y1_scale": "log",
+#        "inputs": {"L": "0.2, 0.5, 1"}}
+#     ]
+#   }
+#
+# Input values use the syntax of the GUI fields (see inputs.py); paths are
+# relative to the spec file.
+
+FORMATS = ('png', 'svg', 'pdf')
+
+# Settings of every plot; a spec's "defaults" and each plot override them
+PLOT_DEFAULTS = {
+    'device': 'nch',
+    'x': 'VGS',
+    'y1': '',
+    'y2': '',
+    'x_scale': '',
+    'y1_scale': '',
+    'y2_scale': '',
+    'inputs': {},
+    'title': '',
+}
+
+# Worker-side state, set once per process by _init_worker
+_SOURCES = None
+_TABLES = {}
+
+def _plot_name(index, plot):
+    """File name stem of a plot: its 'name', or one built from its variables."""
+    name = plot.get('name') or '_'.join(
+        [f"{index:02d}", plot['y1'] or plot['y2'], 'vs', plot['x']])
+    return re.sub(r'[^\w.-]+', '_', name).strip('_')
+
+def load_spec(file_name):
+    """
+    Read a plot spec file and resolve it into render jobs.
+
+    Returns:
+        settings, plots: settings holds 'data', 'output_dir', 'formats', 'dpi'
+        and 'size' with paths made absolute; plots is the list of plot
+        dictionaries with PLOT_DEFAULTS, the spec defaults and a 'name' filled in.
+
+    Raises:
+        ValueError for a missing data file entry, an unknown format or a plot
+        without an output.
+    """
+    with open(file_name) as f:
+        spec = json.load(f)
+    root = os.path.dirname(os.path.abspath(file_name))
+
+    if 'data' not in spec:
+        raise ValueError(f"{file_name}: 'data' (the .mat or .gmid file) is missing")
+    formats = [fmt.lower() for fmt in spec.get('formats', ['png'])]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"{file_name}: unsupported formats {unknown}, use {list(FORMATS)}")
+    settings = {
+        'data': os.path.join(root, spec['data']),
+        'output_dir': os.path.join(root, spec.get('output_dir', 'plots')),
+        'formats': formats,
+        'dpi': spec.get('dpi', 150),
+        'size': tuple(spec.get('size', (5, 4))),
+    }
+
+    defaults = {**PLOT_DEFAULTS, **spec.get('defaults', {})}
+    plots = []
+    names = set()
+    for index, entry in enumerate(spec.get('plots', [])):
+        # Inputs are merged name by name, so a plot only lists the ones it changes
+        plot = {**defaults, **entry, 'inputs': {**defaults['inputs'], **entry.get('inputs', {})}}
+        if not plot['y1'] and not plot['y2']:
+            raise ValueError(f"{file_name}: plot {index} has neither 'y1' nor 'y2'")
+        plot['name'] = _plot_name(index, plot)
+        if plot['name'] in names:
+            raise ValueError(f"{file_name}: plot name '{plot['name']}' is used twice")
+        names.add(plot['name'])
+        plots.append(plot)
+    return settings, plots
+
+def render_plot(table, plot, output_dir, formats=('png',), dpi=150, size=(5, 4)):
+    """
+    Look up and draw one plot the way the GUI draws its first plot, then save it.
+
+    Parameters:
+        table: DeviceTable (or loadmat struct) of the plot's device.
+        plot: Plot dictionary as returned by load_spec().
+        output_dir: Directory for the files (created if needed).
+        formats: File formats, any of FORMATS.
+        dpi, size: Resolution and figure size in inches.
+
+    Returns:
+        List of the written file paths.
+    """
+    input_params, _ = parse_inputs(plot['inputs'])
+    x_var, y1_var, y2_var = plot['x'], plot['y1'], plot['y2']
+
+    # x, y1 and y2 share one parsing and bracketing of the inputs
+    results = lookup_many(table, [var for var in (x_var, y1_var, y2_var) if var], **input_params)
+    arrays = [results[x_var]] + [results[var] for var in (y1_var, y2_var) if var]
+
+    fig = Figure(figsize=size, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax1 = fig.add_subplot(111)
+    ax2 = ax1.twinx()
+    # Unlike the GUI, a single-output chart has no empty right axis
+    ax2.set_visible(len(arrays) > 2)
+    plot_array(*arrays, canvas=canvas, ax1=ax1, ax2=ax2, x_label=x_var, y1_label=y1_var,
+               y2_label=y2_var, x_scale=plot['x_scale'], y1_scale=plot['y1_scale'],
+               y2_scale=plot['y2_scale'], title=plot['title'], draw=False)
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{plot['name']}.{fmt}")
+        fig.savefig(path, format=fmt, dpi=dpi)
+        files.append(path)
+    return files
+
+def _init_worker(sources):
+    global _SOURCES
+    _SOURCES = sources
+    _TABLES.clear()
+
+def _worker_table(device):
+    """Open a device in this worker on first use."""
+    if device not in _TABLES:
+        _TABLES[device] = open_lazy(_SOURCES[device], device)
+    return _TABLES[device]
+
+def _run_task(task):
+    """Render one plot; errors are returned instead of raised so the other plots still render."""
+    plot, options = task
+    try:
+        return plot['name'], render_plot(_worker_table(plot['device']), plot, **options), None
+    except Exception as e:
+        return plot['name'], [], str(e)
+
+def render_spec(file_name, processes=None, cache_dir=None):
+    """
+    Render every plot of a spec file across a pool of worker processes.
+
+    Each device is opened once here (a v5/v7 .mat file is converted to a
+    .gmid file in cache_dir or a temporary directory), and the workers open
+    that file again lazily.
+
+    Parameters:
+        file_name: JSON plot spec (see the top of this module).
+        processes: Number of worker processes (default: os.cpu_count(), at most
+            one per plot). processes=1 renders in the calling process.
+        cache_dir: Directory in which converted .mat devices are kept between runs.
+
+    Returns:
+        written, failed: written maps each plot name to its files, failed maps
+        the names of plots that could not be rendered to the error message.
+    """
+    settings, plots = load_spec(file_name)
+    options = {key: settings[key] for key in ('formats', 'dpi', 'size')}
+    options['output_dir'] = settings['output_dir']
+
+    tables = {device: open_lazy(settings['data'], device, cache_dir=cache_dir)
+              for device in dict.fromkeys(plot['device'] for plot in plots)}
+    processes = min(processes or os.cpu_count() or 1, max(len(plots), 1))
+    tasks = [(plot, options) for plot in plots]
+
+    if processes == 1:
+        _init_worker({})
+        _TABLES.update(tables)
+        try:
+            results = [_run_task(task) for task in tasks]
+        finally:
+            _TABLES.clear()
+    else:
+        sources = {device: table.source or settings['data'] for device, table in tables.items()}
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(sources,)) as pool:
+            results = list(pool.map(_run_task, tasks))
+
+    written, failed = {}, {}
+    for name, files, error in results:
+        if error is None:
+            written[name] = files
+        else:
+            logger.error("Plot %s failed: %s", name, error)
+            failed[name] = error
+    return written, failed
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render the plots of a JSON plot spec without the GUI")
+    parser.add_argument('spec', help="Plot spec file")
+    parser.add_argument('--processes', type=int, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument('--cache-dir', help="Keep converted .mat devices in this directory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    written, failed = render_spec(args.spec, args.processes, args.cache_dir)
+    for name, files in written.items():
+        print(f"{name}: {', '.join(files)}")
+    if failed:
+        print(f"{len(failed)} of {len(written) + len(failed)} plots failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+import numpy as np
+from scipy import interpolate
+import lookup_stats
+
+# Batched curve fitting/evaluation used by the Mode 3 cross-lookup.
+# Curves are stored row-wise: the last axis holds the samples along VGS and any
+# leading axes index the curves (one per L/VDS/VSB combination). After fitting,
+# the valid samples of every curve are packed to the left, sorted by x, and the
+# remaining slots are NaN padding; `counts` holds the number of valid samples.
+
+def _pack(x, y, valid):
+    """Move valid samples to the left of each row, keeping their order."""
+    order = np.argsort(~valid, axis=-1, kind='stable')
+    x = np.take_along_axis(x, order, axis=-1)
+    y = np.take_along_axis(y, order, axis=-1)
+    counts = valid.sum(axis=-1)
+    pad = np.arange(x.shape[-1]) >= counts[..., None]
+    x[pad] = np.nan
+    y[pad] = np.nan
+    return x, y, counts
+
+def _edge_slope(h0, h1, m0, m1):
+    """One-sided three-point end slope with the shape-preserving limits used by scipy's PCHIP."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+    d = np.where(np.sign(d) != np.sign(m0), 0.0, d)
+    clip = (np.sign(m0) != np.sign(m1)) & (np.abs(d) > 3 * np.abs(m0))
+    return np.where(clip, 3 * m0, d)
+
+def _pchip_slopes(x, y, counts):
+    """Fritsch-Butland PCHIP derivatives for all packed curves at once."""
+    n = x.shape[-1]
+    slopes = np.zeros_like(x)
+    if n < 2:
+        return slopes
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = np.diff(x, axis=-1)
+        m = np.diff(y, axis=-1) / h
+
+        # Interior points: weighted harmonic mean, zero at local extrema
+        if n > 2:
+            w1 = 2 * h[..., 1:] + h[..., :-1]
+            w2 = h[..., 1:] + 2 * h[..., :-1]
+            m0 = m[..., :-1]
+            m1 = m[..., 1:]
+            interior = (w1 + w2) / (w1 / m0 + w2 / m1)
+            flat = (np.sign(m0) != np.sign(m1)) | (m0 == 0) | (m1 == 0)
+            slopes[..., 1:-1] = np.where(flat, 0.0, interior)
+
+    # End points; the right end sits at counts - 1 which differs per curve
+    last = np.clip(counts - 1, 1, n - 1)[..., None]
+    take = lambda a, i: np.take_along_axis(a, np.clip(i, 0, a.shape[-1] - 1), axis=-1)
+    h_first, m_first = h[..., :1], m[..., :1]
+    h_last, m_last = take(h, last - 1), take(m, last - 1)
+    if n > 2:
+        left = _edge_slope(h_first, h[..., 1:2], m_first, m[..., 1:2])
+        right = _edge_slope(h_last, take(h, last - 2), m_last, take(m, last - 2))
+    else:
+        left = right = m_first
+    # Two-point curves are straight lines
+    two = counts[..., None] == 2
+    left = np.where(two, m_first, left)
+    right = np.where(two, m_last, right)
+
+    slopes[..., :1] = left
+    np.put_along_axis(slopes, last, right, axis=-1)
+    return slopes
+
+class CurveFit:
+    """
+    Monotone-cubic (or linear) interpolants for a batch of curves.
+
+    Parameters:
+        x, y: Packed curve samples of shape (..., n).
+        counts: Number of valid samples per curve.
+        slopes: PCHIP derivatives (None for linear interpolation).
+    """
+
+    def __init__(self, x, y, counts, slopes=None):
+        self.x = x
+        self.y = y
+        self.counts = counts
+        self.slopes = slopes
+        # Flat offset of every curve, so samples can be gathered with one fancy index
+        n = x.shape[-1]
+        self._offsets = (np.arange(counts.size) * n).reshape(counts.shape + (1,))
+
+    def __call__(self, xq, extrapolate=False):
+        """
+        Evaluate every curve at xq. xq is broadcast against the curve axes with
+        an extra trailing axis for the query points, e.g. shape (m,) or (..., m).
+        Points outside a curve's range are NaN unless extrapolate is True.
+        """
+        return self._interpolate(self._locate(xq, extrapolate), self.y, self.slopes)
+
+    def slope(self, xq, extrapolate=False):
+        """
+        Derivative dy/dx of every curve at xq, with the same broadcasting as
+        calling the fit. Single-sample curves have no derivative (NaN).
+        """
+        return self._interpolate(self._locate(xq, extrapolate), self.y, self.slopes, derivative=True)
+
+    def _locate(self, xq, extrapolate):
+        """Interval, local coordinate and validity of every query point; depends on x only."""
+        xq = np.asarray(xq, dtype=np.float64)
+        batch = self.counts.shape
+        xq = np.broadcast_to(xq, batch + xq.shape[-1:]) if xq.ndim else np.broadcast_to(xq, batch + (1,))
+        n = self.x.shape[-1]
+        counts = self.counts[..., None]
+        if n == 0:
+            return xq.shape, None
+
+        # Interval search for all curves and query points in one comparison pass
+        k = (self.x[..., None, :] <= xq[..., None]).sum(axis=-1) - 1
+        k = np.clip(k, 0, np.maximum(counts - 2, 0))
+        i0 = self._offsets + np.minimum(k, n - 1)
+        i1 = self._offsets + np.minimum(k + 1, n - 1)
+        x = self.x.reshape(-1)
+        x0, x1 = x[i0], x[i1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            h = x1 - x0
+            t = (xq - x0) / h
+
+        x_first = self.x[..., :1]
+        x_last = x[self._offsets + np.maximum(counts - 1, 0)]
+        inside = (xq >= x_first) & (xq <= x_last)
+        usable = counts >= 2
+        mask = usable & (np.ones_like(inside) if extrapolate else inside)
+
+        # Single-sample curves only answer exact matches
+        single = counts == 1
+        if np.any(single):
+            single = single & np.isclose(xq, x_first, rtol=1e-10)
+        return xq.shape, (i0, i1, h, t, mask, single)
+
+    def _interpolate(self, located, y, slopes, derivative=False):
+        """Evaluate the samples y (and PCHIP slopes) of curves over this fit's x, or their derivative, at located points."""
+        shape, located = located
+        output = np.full(shape, np.nan)
+        if located is None:
+            return output
+        i0, i1, h, t, mask, single = located
+        flat = y.reshape(-1)
+        y0, y1 = flat[i0], flat[i1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if slopes is None:
+                values = (y1 - y0) / h if derivative else y0 + (y1 - y0) * t
+            else:
+                slopes = slopes.reshape(-1)
+                d0, d1 = slopes[i0], slopes[i1]
+                t2 = t * t
+                if derivative:
+                    # d/dx of the Hermite basis below
+                    values = ((6 * t2 - 6 * t) * (y0 - y1) / h + (3 * t2 - 4 * t + 1) * d0
+                              + (3 * t2 - 2 * t) * d1)
+                else:
+                    t3 = t2 * t
+                    values = ((2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * h * d0
+                              + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * h * d1)
+
+        output[mask] = values[mask]
+        if np.any(single) and not derivative:
+            output[single] = np.broadcast_to(y[..., :1], shape)[single]
+        return output
+
+class _SharedFit:
+    """
+    Fits of several outputs over the same x samples (the same ratio curves):
+    the query points are located once and only the output samples differ.
+    """
+
+    def __init__(self, fits):
+        self.fit = fits[0]
+        self.fits = fits
+
+    def __call__(self, xq, extrapolate=False):
+        located = self.fit._locate(xq, extrapolate)
+        return np.stack([self.fit._interpolate(located, fit.y, fit.slopes) for fit in self.fits])
+
+    def slope(self, xq, extrapolate=False):
+        located = self.fit._locate(xq, extrapolate)
+        return np.stack([self.fit._interpolate(located, fit.y, fit.slopes, derivative=True) for fit in self.fits])
+
+class _LoopFit:
+    """Per-curve scipy interp1d fallback for methods other than 'pchip' and 'linear'."""
+
+    def __init__(self, x, y, counts, method):
+        self.counts = counts
+        self.x = x
+        self.y = y
+        self.method = method
+
+    def __call__(self, xq, extrapolate=False):
+        xq = np.asarray(xq, dtype=np.float64)
+        batch = self.counts.shape
+        xq = np.broadcast_to(xq, batch + xq.shape[-1:]) if xq.ndim else np.broadcast_to(xq, batch + (1,))
+        output = np.full(xq.shape, np.nan)
+        for index in np.ndindex(*batch):
+            n = self.counts[index]
+            x, y, q = self.x[index][:n], self.y[index][:n], xq[index]
+            if n >= 2:
+                try:
+                    interpolator = interpolate.interp1d(x, y, kind=self.method, bounds_error=False,
+                                                        fill_value='extrapolate' if extrapolate else np.nan)
+                    output[index] = interpolator(q)
+                except ValueError:
+                    pass
+            elif n == 1:
+                exact = np.isclose(q, x[0], rtol=1e-10)
+                output[index][exact] = y[0]
+        return output
+
+    def slope(self, xq, extrapolate=False):
+        raise ValueError(f"Derivatives need METHOD 'pchip' or 'linear', not '{self.method}'")
+
+def fit_curves(x, y, method='pchip'):
+    """
+    Fit interpolants y(x) for a batch of curves sampled along VGS.
+
+    Every finite sample is used, as in the original per-curve loop: curves
+    that peak along VGS (gm/ID, gm/Cgg) are sorted by x and not trimmed.
+
+    Parameters:
+        x, y: Arrays of shape (..., n); the last axis runs along VGS.
+        method: 'pchip', 'linear' or any interp1d kind.
+    """
+    x = np.array(x, dtype=np.float64)
+    y = np.array(np.broadcast_to(y, x.shape), dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+
+    # Sort each curve by x (invalid samples last) and drop repeated x values
+    x, y, counts = _pack(x, y, valid)
+    order = np.argsort(np.where(np.arange(x.shape[-1]) < counts[..., None], x, np.inf), axis=-1, kind='stable')
+    x = np.take_along_axis(x, order, axis=-1)
+    y = np.take_along_axis(y, order, axis=-1)
+    valid = np.arange(x.shape[-1]) < counts[..., None]
+    valid[..., 1:] &= np.diff(x, axis=-1) != 0
+    x, y, counts = _pack(x, y, valid)
+
+    slopes = _pchip_slopes(x, y, counts) if method == 'pchip' else None
+    lookup_stats.count('fit_curves.calls')
+    return _make_fit(x, y, counts, slopes, method)
+
+def _make_fit(x, y, counts, slopes, method):
+    if method in ('pchip', 'linear'):
+        return CurveFit(x, y, counts, slopes)
+    return _LoopFit(x, y, counts, method)
+
+class _StackedFit:
+    """Evaluate fits that cannot be merged into one CurveFit and stack their results."""
+
+    def __init__(self, fits):
+        self.fits = fits
+
+    def __call__(self, xq, extrapolate=False):
+        return np.stack([fit(xq, extrapolate) for fit in self.fits])
+
+    def slope(self, xq, extrapolate=False):
+        return np.stack([fit.slope(xq, extrapolate) for fit in self.fits])
+
+def stack_fits(fits):
+    """
+    Combine fits with equal batch shapes (e.g. the same curves of several
+    process corners, or several outputs over one ratio) along a new leading
+    axis, so they are evaluated together.
+    """
+    if all(isinstance(fit, CurveFit) for fit in fits):
+        first = fits[0]
+        if len(fits) > 1 and all(np.array_equal(fit.counts, first.counts)
+                                 and np.array_equal(fit.x, first.x, equal_nan=True) for fit in fits[1:]):
+            return _SharedFit(fits)
+        slopes = None if fits[0].slopes is None else np.stack([fit.slopes for fit in fits])
+        return CurveFit(np.stack([fit.x for fit in fits]), np.stack([fit.y for fit in fits]),
+                        np.stack([fit.counts for fit in fits]), slopes)
+    return _StackedFit(fits)
+
+class CurveIndex:
+    """
+    Lazily populated interpolants for the (L_idx, VDS_idx, VSB_idx) curves of
+    one x-ratio / y-output pair. Curves are fitted the first time they are
+    requested and reused afterwards; only fitted curves are stored. The owning
+    DeviceTable counts the index against its cache budget and drops it when
+    it is evicted or the table's data changes.
+
+    Parameters:
+        table: DeviceTable the curves are taken from.
+        ratio_var: Name of the x ratio (e.g. 'GM_ID').
+        outvar: Name of the y output (e.g. 'GM_CGG').
+        method: 'pchip', 'linear' or any interp1d kind.
+    """
+
+    def __init__(self, table, ratio_var, outvar, method='pchip'):
+        self.table = table
+        self.ratio_var = ratio_var
+        self.outvar = outvar
+        self.method = method
+        # Fitted curves keyed by flat (L, VDS, VSB) grid index: (x, y, slopes),
+        # holding only the valid samples (slopes is None unless method is 'pchip')
+        self.curves = {}
+        self.nbytes = 0
+
+    def fit(self, L_idx, VDS_idx, VSB_idx):
+        """Return the fitted curves for the given grid indices, fitting any that are missing."""
+        L_idx, VDS_idx, VSB_idx = np.broadcast_arrays(L_idx, VDS_idx, VSB_idx)
+        _, _, nVDS, nVSB = self.table.shape
+        flat = (L_idx * nVDS + VDS_idx) * nVSB + VSB_idx
+        keys, inverse = np.unique(flat, return_inverse=True)
+        missing = [key for key in keys.tolist() if key not in self.curves]
+        lookup_stats.count('curves.reused', len(keys) - len(missing))
+        if missing:
+            lookup_stats.count('curves.fitted', len(missing))
+            l, d, s = np.unravel_index(missing, (self.table.shape[0], nVDS, nVSB))
+            xdata = self.table.output(self.ratio_var)
+            ydata = self.table.output(self.outvar)
+            fit = fit_curves(xdata[l, :, d, s], ydata[l, :, d, s], self.method)
+            slopes = getattr(fit, 'slopes', None)
+            added = 0
+            for i, key in enumerate(missing):
+                n = fit.counts[i]
+                curve = (fit.x[i, :n].copy(), fit.y[i, :n].copy(),
+                         slopes[i, :n].copy() if slopes is not None else None)
+                self.curves[key] = curve
+                added += sum(array.nbytes for array in curve if array is not None)
+            self.nbytes += added
+            self.table._cache_grown(self, added)
+
+        # Pad the requested curves to a common length and expand them to the query shape
+        curves = [self.curves[key] for key in keys.tolist()]
+        counts = np.array([len(x) for x, _, _ in curves], dtype=np.intp)
+        n = int(counts.max()) if counts.size else 0
+        x = np.full((len(curves), n), np.nan)
+        y = np.full((len(curves), n), np.nan)
+        slopes = np.zeros((len(curves), n)) if self.method == 'pchip' else None
+        for i, (cx, cy, cslopes) in enumerate(curves):
+            x[i, :counts[i]] = cx
+            y[i, :counts[i]] = cy
+            if slopes is not None:
+                slopes[i, :counts[i]] = cslopes
+
+        inverse = inverse.reshape(L_idx.shape)
+        return _make_fit(x[inverse], y[inverse], counts[inverse],
+                         slopes[inverse] if slopes is not None else None, self.method)
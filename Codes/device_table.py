@@ -0,0 +1,486 @@
+import weakref
+import numpy as np
+from collections import OrderedDict
+from collections.abc import Mapping
+from scipy import io
+from cross_lookup import CurveIndex
+from expression import compile_expression, is_expression
+import lookup_stats
+
+# Grid axes of the characterization data, in the order used by the 4-D fields
+AXES = ('L', 'VGS', 'VDS', 'VSB')
+
+# Default memory budget for cached ratio grids and fitted Mode 3 curves (bytes)
+RATIO_CACHE_BYTES = 256 * 2**20
+
+# Fields spanning many decades (currents, noise) that compact() stores as log values
+LOG_FIELDS = ('ID', 'IGD', 'IGS', 'STH', 'SFL')
+
+def safe_divide(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.asarray(a)
+        b = np.asarray(b)
+
+        if a.shape != b.shape:
+            if a.shape[0] == 1:
+                a = np.repeat(a, b.shape[0], axis=0)
+            if b.shape[0] == 1:
+                b = np.repeat(b, a.shape[0], axis=0)
+
+        result = np.divide(a, b)
+        if isinstance(result, np.ndarray):
+            result[b == 0] = np.nan
+        elif b == 0:
+            result = np.nan
+    return result
+
+class EncodedField:
+    """
+    Reduced-precision storage of one 4-D field.
+
+    Values are kept as float32, or for fields that span many decades as a
+    float32 signed logarithm, sign(v) * log(|v| / floor), where floor lies
+    below the smallest non-zero magnitude (zeros are stored as 0). Only the
+    indexed elements (e.g. the corners used by an interpolation) are decoded
+    back to float64; np.asarray() decodes the whole field.
+
+    Parameters:
+        data: Encoded float32 array.
+        floor: Reference magnitude of the log encoding (None for plain float32).
+    """
+
+    def __init__(self, data, floor=None):
+        self.data = data
+        self.floor = floor
+        self.shape = data.shape
+        self.ndim = data.ndim
+        self.dtype = np.dtype(np.float64)
+
+    @classmethod
+    def encode(cls, values, log=False):
+        values = np.asarray(values, dtype=np.float64)
+        magnitude = np.abs(values)
+        nonzero = magnitude[np.isfinite(magnitude) & (magnitude > 0)]
+        if not log or nonzero.size == 0:
+            return cls(np.ascontiguousarray(values, dtype=np.float32))
+        floor = float(nonzero.min()) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            encoded = np.where(magnitude > 0, np.sign(values) * np.log(magnitude / floor), values)
+        return cls(np.ascontiguousarray(encoded, dtype=np.float32), floor)
+
+    @property
+    def log(self):
+        return self.floor is not None
+
+    def decode(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.floor is None:
+            return values
+        return np.where(values == 0, values, np.sign(values) * self.floor * np.exp(np.abs(values)))
+
+    def __getitem__(self, index):
+        return self.decode(self.data[index])
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.decode(self.data)
+        return values if dtype is None else values.astype(dtype)
+
+    def reshape(self, shape):
+        return EncodedField(self.data.reshape(shape), self.floor)
+
+    @property
+    def size(self):
+        return self.data.size
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+class LazyFields(Mapping):
+    """
+    Field store that materializes each 4-D field the first time it is used.
+
+    Parameters:
+        names: Field names available from the source.
+        loader: Callable returning the array of a field given its name.
+        max_bytes: Memory ceiling for materialized fields (None for no limit).
+            Least recently used fields are released once it is exceeded and
+            loaded again on their next use.
+    """
+
+    def __init__(self, names, loader, max_bytes=None):
+        self._names = list(names)
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self.shape = None
+        self._loaded = OrderedDict()
+        # Fields set explicitly (DeviceTable.set_field) are never released
+        self._pinned = {}
+
+    def __getitem__(self, name):
+        if name in self._pinned:
+            return self._pinned[name]
+        if name in self._loaded:
+            self._loaded.move_to_end(name)
+            return self._loaded[name]
+        if name not in self._names:
+            raise KeyError(name)
+
+        value = np.ascontiguousarray(self._loader(name), dtype=np.float64)
+        if self.shape is not None:
+            value = value.reshape(self.shape)
+        self._loaded[name] = value
+        if self.max_bytes is not None:
+            while len(self._loaded) > 1 and self.nbytes > self.max_bytes:
+                self._loaded.popitem(last=False)
+        return value
+
+    def __setitem__(self, name, value):
+        self._pinned[name] = value
+        self._loaded.pop(name, None)
+
+    def __iter__(self):
+        yield from self._names
+        yield from (name for name in self._pinned if name not in self._names)
+
+    def __len__(self):
+        return len(self._names) + sum(name not in self._names for name in self._pinned)
+
+    def __contains__(self, name):
+        return name in self._pinned or name in self._names
+
+    @property
+    def loaded(self):
+        """Names of the fields currently held in memory."""
+        return tuple(self._pinned) + tuple(self._loaded)
+
+    @property
+    def nbytes(self):
+        return sum(value.nbytes for value in self._loaded.values())
+
+    def release(self):
+        """Drop every materialized (non-pinned) field."""
+        self._loaded.clear()
+
+class DeviceTable:
+    """
+    Transistor characterization data compiled once from a .mat struct.
+
+    The grid axes are stored as contiguous float64 vectors and every 4-D
+    field (ID, GM, GDS, CGG, ...) as a C-contiguous float64 array of shape
+    (len(L), len(VGS), len(VDS), len(VSB)), so lookup() and lookup_vgs()
+    can use the table directly without unpacking the struct on every call.
+
+    Parameters:
+        L, VGS, VDS, VSB: Grid axis vectors.
+        W: Device width used for the simulation.
+        fields: Dictionary of 4-D arrays keyed by field name, or a LazyFields
+            store that loads them on first use.
+        meta: Optional dictionary of the remaining (non-grid) struct entries.
+        cache_bytes: Memory budget for derived ratio grids (GM_ID, GM_CGG, ...)
+            and fitted Mode 3 curves. Least recently used grids and curve
+            indexes are evicted once the budget is exceeded.
+    """
+
+    def __init__(self, L, VGS, VDS, VSB, W, fields, meta=None, cache_bytes=RATIO_CACHE_BYTES):
+        self.L = np.ascontiguousarray(L, dtype=np.float64).ravel()
+        self.VGS = np.ascontiguousarray(VGS, dtype=np.float64).ravel()
+        self.VDS = np.ascontiguousarray(VDS, dtype=np.float64).ravel()
+        self.VSB = np.ascontiguousarray(VSB, dtype=np.float64).ravel()
+        self.W = float(W)
+        self.meta = dict(meta) if meta is not None else {}
+        # Path of the native file the fields are memory-mapped from, if any;
+        # cleared by set_field() since the table then differs from the file
+        self.source = None
+        # Maximum relative error per field for tables built with compact()
+        self.accuracy = {}
+        # Compact tables also keep their cached ratio grids in float32
+        self.compacted = False
+
+        self.shape = (len(self.L), len(self.VGS), len(self.VDS), len(self.VSB))
+        if isinstance(fields, LazyFields):
+            # Fields are materialized (and shaped) on first use
+            fields.shape = self.shape
+            self.fields = fields
+        else:
+            self.fields = {}
+            for name, value in fields.items():
+                if not isinstance(value, EncodedField):
+                    value = np.ascontiguousarray(value, dtype=np.float64)
+                if value.size != np.prod(self.shape):
+                    raise ValueError(f"Field '{name}' has shape {value.shape}, expected {self.shape}")
+                self.fields[name] = value.reshape(self.shape)
+
+        # Precomputed metadata used for defaults and range checks
+        self.axes = dict(zip(AXES, (self.L, self.VGS, self.VDS, self.VSB)))
+        self.ranges = {name: (values[0], values[-1]) for name, values in self.axes.items()}
+        self.defaults = {
+            'L': np.min(self.L),
+            'VGS': self.VGS,
+            'VDS': np.max(self.VDS) / 2,
+            'VSB': 0,
+        }
+
+        # LRU cache of derived ratio grids keyed by (numerator, denominator)
+        # and of fitted Mode 3 curves keyed by ('curves', x-ratio, y-output, method)
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_used = 0
+
+        # Precomputed VGS(ratio, L, VDS, VSB) grids, see lookup_vgs.precompute_inverse()
+        self.inverse = {}
+
+    @classmethod
+    def from_struct(cls, data, **kwargs):
+        """Build a table from a struct returned by scipy.io.loadmat (e.g. data['nch'])."""
+        names = data.dtype.names
+        axes = {}
+        for name in AXES:
+            if name in names:
+                axes[name] = np.asarray(data[name][0, 0], dtype=np.float64).flatten()
+            elif name == 'VSB':
+                axes[name] = np.array([0.0])
+            else:
+                raise KeyError(f"Axis '{name}' not found in data")
+        W = float(np.asarray(data['W'][0, 0]).flatten()[0])
+
+        grid_size = np.prod([len(values) for values in axes.values()])
+        fields = {}
+        meta = {}
+        for name in names:
+            if name in AXES or name == 'W':
+                continue
+            value = data[name][0, 0]
+            if isinstance(value, np.ndarray) and value.dtype.kind in 'fiu' and value.size == grid_size:
+                fields[name] = value
+            else:
+                meta[name] = value
+
+        return cls(axes['L'], axes['VGS'], axes['VDS'], axes['VSB'], W, fields, meta, **kwargs)
+
+    @classmethod
+    def from_mat(cls, file_name, device='nch', **kwargs):
+        """Load one device struct ('nch' or 'pch') from a .mat file."""
+        data = io.loadmat(file_name, variable_names=[device])
+        if device not in data:
+            raise KeyError(f"'{device}' data not found in {file_name}")
+        return cls.from_struct(data[device], **kwargs)
+
+    @property
+    def names(self):
+        """Names of the 4-D fields held by the table."""
+        return tuple(self.fields)
+
+    def __contains__(self, name):
+        return name in self.fields or name in self.axes or name == 'W'
+
+    def field(self, name):
+        """
+        Return the 4-D array for a field. Axis names and 'W' are returned as
+        read-only broadcast views so they can be used like any other field.
+        """
+        if name in self.fields:
+            return self.fields[name]
+        if name in self.axes:
+            index = AXES.index(name)
+            shape = [1, 1, 1, 1]
+            shape[index] = self.shape[index]
+            return np.broadcast_to(self.axes[name].reshape(shape), self.shape)
+        if name == 'W':
+            return np.broadcast_to(np.float64(self.W), self.shape)
+        raise KeyError(f"Field '{name}' not found in table")
+
+    def ratio(self, numerator, denominator):
+        """
+        Return the 4-D grid of numerator/denominator (e.g. 'GM', 'ID' for GM_ID).
+        Results are memoized in a bounded LRU cache; the returned array is
+        read-only. Compact tables return (and cache) a float32 EncodedField.
+        """
+        def compute():
+            if denominator == 'W':
+                return np.asarray(self.field(numerator)) / self.W
+            if numerator == 'W':
+                return self.W / np.asarray(self.field(denominator))
+            return safe_divide(self.field(numerator), self.field(denominator))
+        return self._memoized((numerator, denominator), compute)
+
+    def derived(self, text):
+        """
+        Return the 4-D grid of a formula of fields such as 'GM/(2*pi*CGG)'
+        (see expression.py). Results share the LRU cache of the ratio grids;
+        the returned array is read-only.
+        """
+        expression = compile_expression(text)
+        return self._memoized(('=', expression.key), lambda: expression.evaluate(self))
+
+    def _memoized(self, key, compute):
+        """Return the cached grid for key, computing and caching it on a miss."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            lookup_stats.count('ratio_cache.hits')
+            return cached
+        lookup_stats.count('ratio_cache.misses')
+
+        result = compute()
+        if self.compacted:
+            # Cached in the storage precision of the fields it was computed from
+            result = EncodedField.encode(result)
+            result.data.flags.writeable = False
+        else:
+            result.flags.writeable = False
+        if result.nbytes <= self.cache_bytes:
+            self._evict(result.nbytes)
+            self._cache[key] = result
+            self._cache_used += result.nbytes
+        return result
+
+    def _evict(self, nbytes, keep=None):
+        """Evict least recently used cache entries (except keep) until nbytes more fit within budget."""
+        for key in list(self._cache):
+            if self._cache_used + nbytes <= self.cache_bytes:
+                break
+            if key != keep:
+                self._cache_used -= self._cache.pop(key).nbytes
+
+    def curve_index(self, ratio_var, outvar, method='pchip'):
+        """Return the (lazily fitted) Mode 3 interpolants of outvar versus ratio_var."""
+        key = ('curves', ratio_var, outvar, method)
+        index = self._cache.get(key)
+        if index is None:
+            lookup_stats.count('curve_index.builds')
+            index = self._cache[key] = CurveIndex(self, ratio_var, outvar, method)
+        else:
+            self._cache.move_to_end(key)
+        return index
+
+    def _cache_grown(self, index, nbytes):
+        """Account for nbytes of curves newly fitted by a cached CurveIndex, evicting other entries if needed."""
+        key = ('curves', index.ratio_var, index.outvar, index.method)
+        if self._cache.get(key) is not index:
+            # Evicted while fitting (by the ratio grids it needed); nothing to account
+            return
+        self._evict(nbytes, keep=key)
+        self._cache_used += nbytes
+
+    def set_field(self, name, value):
+        """Add or replace a 4-D field and invalidate everything derived from the table."""
+        value = np.ascontiguousarray(value, dtype=np.float64)
+        if value.size != np.prod(self.shape):
+            raise ValueError(f"Field '{name}' has shape {value.shape}, expected {self.shape}")
+        self.fields[name] = value.reshape(self.shape)
+        # The table no longer matches its file, so it must not be reopened from it
+        self.source = None
+        self.inverse.clear()
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Drop all cached ratio grids and fitted curves."""
+        self._cache.clear()
+        self._cache_used = 0
+
+    def output(self, outvar):
+        """Return the 4-D grid for an output name such as 'ID' or 'GM_ID', or a formula such as 'GM/(2*pi*CGG)'."""
+        if is_expression(outvar):
+            return self.derived(outvar)
+        if '_' in outvar:
+            numerator, denominator = outvar.split('_')
+            return self.ratio(numerator, denominator)
+        return self.field(outvar)
+
+    def compact(self, log_fields=LOG_FIELDS, cache_bytes=None):
+        """
+        Return a copy of the table with its fields stored in float32.
+
+        Fields named in log_fields (currents, noise) are stored as float32
+        signed logarithms, which keeps the relative error uniform across the
+        many decades they span. Cached ratio and formula grids are kept in
+        float32 as well. Values are decoded to float64 only at interpolation
+        time. The maximum relative error of every field versus this table is
+        recorded in the copy's accuracy attribute.
+        """
+        fields = {}
+        accuracy = {}
+        for name in self.fields:
+            original = np.asarray(self.fields[name], dtype=np.float64)
+            fields[name] = EncodedField.encode(original, name in log_fields)
+
+            decoded = np.asarray(fields[name])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                error = np.abs(decoded - original) / np.abs(original)
+            error = error[np.isfinite(error)]
+            accuracy[name] = {
+                'encoding': 'log-float32' if fields[name].log else 'float32',
+                'max_rel_error': float(np.max(error)) if error.size else 0.0,
+            }
+
+        table = DeviceTable(self.L, self.VGS, self.VDS, self.VSB, self.W, fields, self.meta,
+                            cache_bytes=self.cache_bytes if cache_bytes is None else cache_bytes)
+        table.accuracy = accuracy
+        table.compacted = True
+        return table
+
+    def accuracy_report(self):
+        """
+        Text table of the storage encoding and maximum relative error of every
+        field, followed by the memory held by the fields and the caches.
+        """
+        if not self.accuracy:
+            lines = ["All fields are stored in float64."]
+        else:
+            lines = [f"{'Field':<8}{'Encoding':<14}{'Max rel. error':>16}"]
+            for name, entry in self.accuracy.items():
+                lines.append(f"{name:<8}{entry['encoding']:<14}{entry['max_rel_error']:>16.3e}")
+            lines.append("Cached ratio and formula grids are stored in float32.")
+        lines.append(f"Memory: {self.field_nbytes / 2**20:.1f} MiB fields, "
+                     f"{self.cache_nbytes / 2**20:.1f} MiB cached grids and curves")
+        return "\n".join(lines)
+
+    @property
+    def field_nbytes(self):
+        """Memory held by the stored fields (for lazy tables, only the fields currently loaded)."""
+        if isinstance(self.fields, LazyFields):
+            return self.fields.nbytes
+        return sum(self.fields[name].nbytes for name in self.fields)
+
+    @property
+    def cache_nbytes(self):
+        """Memory held by cached ratio/formula grids, fitted Mode 3 curves and inverse grids."""
+        inverse = sum(grid.nbytes for _, grid in self.inverse.values())
+        return self._cache_used + inverse
+
+    @property
+    def nbytes(self):
+        """Memory held by the table: its stored fields plus its caches."""
+        return self.field_nbytes + self.cache_nbytes
+
+    def __repr__(self):
+        return f"DeviceTable(shape={self.shape}, W={self.W}, fields={list(self.fields)})"
+
+# Tables compiled by as_table(), keyed by id() of their loadmat struct. An
+# entry is dropped when its struct is garbage collected.
+_COMPILED = {}
+
+def as_table(data):
+    """
+    Return data unchanged if it is already a DeviceTable, otherwise compile it.
+
+    The table compiled from a loadmat struct is kept for as long as the struct
+    is alive, so repeated lookups on the same struct share one table and with
+    it the ratio cache, curve fits and inverse grids. Changes made to the
+    struct's arrays after its first lookup are therefore not seen; compile a
+    DeviceTable explicitly (DeviceTable.from_struct) to control this.
+    """
+    if isinstance(data, DeviceTable):
+        return data
+    key = id(data)
+    table = _COMPILED.get(key)
+    if table is None:
+        table = DeviceTable.from_struct(data)
+        try:
+            weakref.finalize(data, _COMPILED.pop, key, None)
+        except TypeError:
+            # Objects without weak reference support are compiled on every call
+            return table
+        _COMPILED[key] = table
+    return table
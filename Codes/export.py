@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import numpy as np
+
+# Streaming export of gridded results (e.g. sweep.iter_sweep()) block by
+# block, so only one block is held in memory at a time:
+#
+#   .csv                long format: one row per grid point with the axis
+#                       values and one column per output
+#   .parquet            the same columns, one row group per block (needs pyarrow)
+#   .h5 / .hdf5         one dataset per output with the grid shape; the axis
+#                       vectors are stored as dimension scales (needs h5py)
+#
+# A result is described by coords, a dictionary with 'outputs' (output names)
+# followed by the axis vectors in grid order, as returned by run_sweep(). Each
+# block comes with the tuple of slices locating it in the full grid.
+
+# Rows formatted per write in CSV files
+CSV_ROWS = 1 << 16
+
+def _axes(coords):
+    return {key: np.atleast_1d(np.asarray(values, dtype=np.float64))
+            for key, values in coords.items() if key != 'outputs'}
+
+def _block_columns(axes, index, block):
+    """Axis and output columns (long format) of one block."""
+    vectors = [values[s] for values, s in zip(axes.values(), index)]
+    grids = np.meshgrid(*vectors, indexing='ij')
+    return [grid.ravel() for grid in grids] + [values.ravel() for values in block]
+
+class CSVWriter:
+    """
+    Long-format CSV: a header, then one row per grid point.
+
+    Parameters:
+        path: File to write.
+        coords: Output names and axis vectors of the result.
+        float_format: printf format of every value.
+    """
+
+    def __init__(self, path, coords, float_format='%.10g'):
+        self.axes = _axes(coords)
+        self.outputs = list(coords['outputs'])
+        self.file = open(path, 'w', newline='')
+        self.file.write(','.join(list(self.axes) + [_csv_name(name) for name in self.outputs]) + '\n')
+        self.row_format = ','.join([float_format] * (len(self.axes) + len(self.outputs))) + '\n'
+
+    def write(self, index, block):
+        table = np.column_stack(_block_columns(self.axes, index, block))
+        # One formatting operation per batch of rows instead of one per row
+        for start in range(0, len(table), CSV_ROWS):
+            rows = table[start:start + CSV_ROWS]
+            self.file.write((self.row_format * len(rows)) % tuple(rows.ravel().tolist()))
+
+    def close(self):
+        self.file.close()
+
+def _csv_name(name):
+    """Quote output names that contain commas or quotes (e.g. some formulas)."""
+    if ',' in name or '"' in name:
+        return '"' + name.replace('"', '""') + '"'
+    return name
+
+class ParquetWriter:
+    """
+    Parquet file with the long-format columns of CSVWriter, one row group per
+    block. The axis vectors and output names are also stored in the file
+    metadata under the key 'gmid'.
+
+    Parameters:
+        path: File to write.
+        coords: Output names and axis vectors of the result.
+        compression: Parquet compression codec.
+    """
+
+    def __init__(self, path, coords, compression='snappy'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet files requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.axes = _axes(coords)
+        self.outputs = list(coords['outputs'])
+        metadata = {'axes': {key: values.tolist() for key, values in self.axes.items()},
+                    'outputs': self.outputs}
+        self.schema = pa.schema([pa.field(name, pa.float64()) for name in list(self.axes) + self.outputs],
+                                metadata={'gmid': json.dumps(metadata)})
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, index, block):
+        columns = [self.pa.array(column) for column in _block_columns(self.axes, index, block)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+class HDF5Writer:
+    """
+    HDF5 file with one dataset per output, shaped like the grid, and the axis
+    vectors as datasets attached to them as dimension scales. Output names
+    that are not valid dataset names (formulas) are stored with the
+    characters replaced and the original name in the 'output' attribute.
+
+    Parameters:
+        path: File to write.
+        coords: Output names and axis vectors of the result.
+        compression: h5py compression filter (None for none).
+    """
+
+    def __init__(self, path, coords, compression='gzip'):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("Writing HDF5 files requires h5py (pip install h5py)")
+        self.file = h5py.File(path, 'w')
+        axes = _axes(coords)
+        self.outputs = list(coords['outputs'])
+        self.file.attrs['outputs'] = json.dumps(self.outputs)
+        self.file.attrs['axes'] = json.dumps(list(axes))
+
+        scales = []
+        for key, values in axes.items():
+            scale = self.file.create_dataset(key, data=values)
+            scale.make_scale(key)
+            scales.append(scale)
+
+        shape = tuple(len(values) for values in axes.values())
+        self.datasets = []
+        for name in self.outputs:
+            dataset = self.file.create_dataset(self._dataset_name(name), shape=shape, dtype='f8',
+                                               chunks=True, compression=compression, fillvalue=np.nan)
+            dataset.attrs['output'] = name
+            for dim, (key, scale) in enumerate(zip(axes, scales)):
+                dataset.dims[dim].attach_scale(scale)
+                dataset.dims[dim].label = key
+            self.datasets.append(dataset)
+
+    def _dataset_name(self, name):
+        dataset_name = re.sub(r'[^\w.+-]+', '_', name).strip('_') or 'output'
+        while dataset_name in self.file:
+            dataset_name += '_'
+        return dataset_name
+
+    def write(self, index, block):
+        for dataset, values in zip(self.datasets, block):
+            dataset[index] = values
+
+    def close(self):
+        self.file.close()
+
+WRITERS = {
+    '.csv': CSVWriter,
+    '.parquet': ParquetWriter,
+    '.h5': HDF5Writer,
+    '.hdf5': HDF5Writer,
+}
+
+def split_result(result, chunk_size=1):
+    """Chunks of an in-memory result (e.g. from run_sweep()) along its first axis, for export_sweep()."""
+    rows = result.shape[1]
+    for start in range(0, rows, chunk_size):
+        stop = min(start + chunk_size, rows)
+        yield (slice(start, stop),) + (slice(None),) * (result.ndim - 2), result[:, start:stop]
+
+def export_sweep(path, coords, chunks, format=None, **options):
+    """
+    Stream a gridded result into a CSV, Parquet or HDF5 file block by block.
+
+    Parameters:
+        path: Output file.
+        coords: 'outputs' and the axis vectors in grid order, as returned by
+            run_sweep() or iter_sweep(). Inputs held fixed can be added as
+            single-value axes so the file records them as constant columns.
+        chunks: Iterable of (index, block) pairs as yielded by iter_sweep():
+            index is a tuple of slices into the grid and block has shape
+            (len(outputs),) + the shape of the sliced grid. An array with the
+            full result (outputs, *grid) is accepted as well.
+        format: '.csv', '.parquet', '.h5' or '.hdf5'; taken from the file
+            extension if None.
+        options: Writer options (float_format for CSV, compression for
+            Parquet and HDF5).
+
+    Returns:
+        Number of grid points written.
+
+    Example:
+        coords, chunks = iter_sweep(nch, {'outputs': ['GM_ID', 'ID_W'], 'L': L})
+        export_sweep('sweep.csv', coords, chunks)
+    """
+    format = (format or os.path.splitext(path)[1]).lower()
+    if not format.startswith('.'):
+        format = '.' + format
+    if format not in WRITERS:
+        raise ValueError(f"Unsupported export format '{format}', use one of {sorted(WRITERS)}")
+    if isinstance(chunks, np.ndarray):
+        chunks = split_result(chunks)
+
+    n_outputs = len(coords['outputs'])
+    points = 0
+    writer = WRITERS[format](path, coords, **options)
+    try:
+        for index, block in chunks:
+            block = np.asarray(block, dtype=np.float64)
+            if block.shape[0] != n_outputs:
+                raise ValueError(f"Block has {block.shape[0]} outputs, expected {n_outputs}")
+            writer.write(index, block)
+            points += block[0].size
+    finally:
+        writer.close()
+    return points
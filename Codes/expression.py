@@ -0,0 +1,206 @@
+import ast
+from functools import lru_cache
+import numpy as np
+
+# Derived outputs written as formulas of table fields, e.g. 'GM/(2*pi*CGG)'
+# (transit frequency), 'GM*GM_ID/(2*pi*CGG)' or 'STH/(4*k*T*GM)' (thermal
+# noise coefficient). An expression is compiled once into a list of numpy
+# operations over the 4-D fields: identical subexpressions are evaluated
+# once, and temporaries are reused as output buffers as soon as they are no
+# longer needed, so a formula costs about one full-grid array per nesting
+# level instead of one per operation. DeviceTable.output() memoizes the
+# result of every expression together with the ratio grids.
+
+# Names with a fixed meaning inside expressions
+CONSTANTS = {
+    'pi': np.pi,
+    'k': 1.380649e-23,       # Boltzmann constant (J/K)
+    'q': 1.602176634e-19,    # Elementary charge (C)
+}
+
+# Temperature (K) used for T when the table has no TEMP entry
+DEFAULT_TEMPERATURE = 300.0
+
+FUNCTIONS = {
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'abs': np.abs,
+}
+
+def _divide(a, b, out=None):
+    """Division with NaN where the denominator is zero, as for ratio outputs like GM_ID."""
+    zero = np.asarray(b) == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.divide(a, b, out=out)
+    if np.any(zero):
+        if np.ndim(result) == 0:
+            return np.nan
+        result[np.broadcast_to(zero, result.shape)] = np.nan
+    return result
+
+def _power(a, b, out=None):
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return np.power(a, b, out=out)
+
+OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _divide,
+    ast.Pow: _power,
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+# Operand order does not change the result, so a*b and b*a share one evaluation
+COMMUTATIVE = (ast.Add, ast.Mult)
+
+def is_expression(outvar):
+    """True for formulas such as 'GM/(2*pi*CGG)', False for plain names such as 'ID' or 'GM_ID'."""
+    return isinstance(outvar, str) and not outvar.isidentifier()
+
+def temperature(table):
+    """Temperature (K) of the characterization: the TEMP entry of the table if present."""
+    value = getattr(table, 'meta', {}).get('TEMP')
+    if value is None:
+        return DEFAULT_TEMPERATURE
+    return float(np.ravel(value)[0])
+
+class Expression:
+    """
+    A formula compiled into a sequence of array operations.
+
+    Parameters:
+        text: The formula, e.g. 'GM/(2*pi*CGG)'. It may use table fields,
+            ratio names (GM_ID), axes (L, VGS, VDS, VSB), W, numbers, the
+            constants pi, k and q, the temperature T, the operators
+            + - * / ** and the functions in FUNCTIONS.
+
+    Raises:
+        ValueError if the text is not a valid formula.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        try:
+            tree = ast.parse(text.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{text}': {e.msg}") from None
+
+        # Slots hold the operands: ('name', name), ('constant', value) or ('step', index)
+        self.slots = []
+        self.steps = []
+        self._keys = {}
+        self._slot_keys = []
+        self.result = self._compile(tree.body)
+        # Canonical form of the formula, equal for texts that differ only in spacing or operand order
+        self.key = self._slot_keys[self.result]
+        self.names = tuple(sorted({source[1] for source in self.slots if source[0] == 'name'}))
+
+        # Step after which each slot is no longer needed, so its buffer can be reused
+        self.last_use = {}
+        for index, (_, operands, _) in enumerate(self.steps):
+            for slot in operands:
+                self.last_use[slot] = index
+
+    def _add(self, key, source):
+        slot = self._keys.get(key)
+        if slot is None:
+            slot = self._keys[key] = len(self.slots)
+            self.slots.append(source)
+            self._slot_keys.append(key)
+        return slot
+
+    def _compile(self, node):
+        """Append the operations of node and return the slot of its value."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return self._add(repr(float(node.value)), ('constant', float(node.value)))
+
+        if isinstance(node, ast.Name):
+            if node.id in CONSTANTS:
+                return self._add(node.id, ('constant', CONSTANTS[node.id]))
+            if node.id == 'T':
+                return self._add('T', ('temperature',))
+            return self._add(node.id, ('name', node.id))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            operands = [self._compile(node.left), self._compile(node.right)]
+            keys = [self._slot_keys[slot] for slot in operands]
+            if isinstance(node.op, COMMUTATIVE):
+                keys.sort()
+            return self._step(f"{type(node.op).__name__}({','.join(keys)})", OPERATORS[type(node.op)], operands)
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            operand = self._compile(node.operand)
+            return self._step(f"{type(node.op).__name__}({self._slot_keys[operand]})",
+                              OPERATORS[type(node.op)], [operand])
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS \
+                and len(node.args) == 1 and not node.keywords:
+            operand = self._compile(node.args[0])
+            return self._step(f"{node.func.id}({self._slot_keys[operand]})", FUNCTIONS[node.func.id], [operand])
+
+        raise ValueError(f"Unsupported syntax in expression '{self.text}': {ast.unparse(node)}")
+
+    def _step(self, key, function, operands):
+        if key in self._keys:
+            return self._keys[key]
+        slot = self._add(key, ('step', len(self.steps)))
+        self.steps.append((function, operands, slot))
+        return slot
+
+    def evaluate(self, table):
+        """
+        Evaluate the formula over the 4-D fields of table.
+
+        Names are resolved with table.output(), so ratio names use the
+        table's cached ratio grids.
+        """
+        values = [None] * len(self.slots)
+        for slot, source in enumerate(self.slots):
+            if source[0] == 'constant':
+                values[slot] = source[1]
+            elif source[0] == 'temperature':
+                values[slot] = temperature(table)
+            elif source[0] == 'name':
+                values[slot] = np.asarray(table.output(source[1]), dtype=np.float64)
+
+        # Arrays computed by an earlier step belong to the evaluation and may be overwritten
+        owned = set()
+        for index, (function, operands, slot) in enumerate(self.steps):
+            args = [values[operand] for operand in operands]
+            shape = np.broadcast_shapes(*[np.shape(arg) for arg in args])
+            out = None
+            for operand in operands:
+                if operand in owned and self.last_use[operand] == index and np.shape(values[operand]) == shape:
+                    out = values[operand]
+                    break
+            values[slot] = function(*args, out=out) if out is not None else function(*args)
+            if np.ndim(values[slot]):
+                owned.add(slot)
+
+            # Release operands that are not needed any more
+            for operand in operands:
+                if operand in owned and self.last_use[operand] == index and operand != slot:
+                    owned.discard(operand)
+                    values[operand] = None
+
+        result = values[self.result]
+        if np.ndim(result) == 0:
+            # Formulas without fields are constant over the grid
+            return np.full(table.shape, float(result))
+        if self.result not in owned:
+            # A single name (e.g. '(GM)'): copy instead of handing out the field itself
+            result = np.array(result, dtype=np.float64)
+        return result
+
+    def __repr__(self):
+        return f"Expression({self.text!r}, steps={len(self.steps)})"
+
+@lru_cache(maxsize=256)
+def compile_expression(text):
+    """Parse text once; compiled expressions are shared by all tables."""
+    return Expression(text)
@@ -1,8 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.metrics import mean_squared_error
 
-def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label="", y2_label="", x_scale="", y1_scale="", y2_scale=""):
+def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label="", y2_label="", x_scale="", y1_scale="", y2_scale="", title="", draw=True):
     """
     Generate a plot with dynamically colored axis labels matching the graphs .
 
@@ -11,6 +10,8 @@ def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label=""
         canvas, ax1, ax2: Canvas and axes for embedding in GUI.
         x_label, y1_label, y2_label: Labels for x-axis, left y-axis (y1), and right y-axis (y2).
         x_scale, y1_scale, y2_scale: Scales for the respective axes.
+        title: Optional title above the plot.
+        draw: Redraw the canvas; False when the caller only saves the figure.
     """
     arrays = [np.squeeze(np.array(arr)) for arr in arrays]
     x = arrays[0]
@@ -21,6 +22,8 @@ def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label=""
     if canvas and ax1 and ax2:
         ax1.clear()
         ax2.clear()
+        # clear() moves the label of the twin axis back to the left
+        ax2.yaxis.set_label_position('right')
 
     # Set axis scales
     if x_scale == "log":
@@ -44,6 +47,8 @@ def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label=""
     # X-axis settings
     ax1.set_xlabel(x_label)
     ax1.tick_params(axis='x')
+    if title:
+        ax1.set_title(title)
 
     # Adjust layout for readability
     if y2 is None:
@@ -54,12 +59,73 @@ def plot_array(*arrays, canvas=None, ax1=None, ax2=None, x_label="", y1_label=""
 
     # Redraw canvas
     if canvas:
-        canvas.draw()
+        if draw:
+            canvas.draw()
     else:
         plt.show()
 
+class BlitManager:
+    """
+    Redraw a few moving artists on a canvas without re-rendering the whole figure.
+
+    Every full draw of the canvas (new plot, resize, zoom, pan) stores the figure
+    without the managed artists as a background image. update() then restores that
+    background and draws only the managed artists, which costs a fraction of a
+    full draw. Managed artists are still drawn on full draws and saved figures.
+
+    Parameters:
+        canvas: Matplotlib canvas to manage.
+        enabled: If False, or if the canvas cannot blit, update() does a full redraw.
+    """
+
+    def __init__(self, canvas, enabled=True):
+        self.canvas = canvas
+        self.enabled = enabled and canvas.supports_blit
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add(self, artist):
+        """Manage artist (a Line2D, Text, ... of this canvas) and return it."""
+        artist.set_animated(self.enabled)
+        self.artists.append(artist)
+        return artist
+
+    def clear(self):
+        """Stop managing all artists, e.g. before their axes are cleared."""
+        for artist in self.artists:
+            artist.set_animated(False)
+        self.artists = []
+
+    def _on_draw(self, event):
+        if not self.enabled:
+            return
+        # Saving renders at another size or format, keep the on-screen background
+        if event.canvas is self.canvas and not self.canvas.is_saving():
+            self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        for artist in self.artists:
+            artist.draw(event.renderer)
+
+    def update(self):
+        """Show the current state of the managed artists."""
+        if not self.enabled:
+            self.canvas.draw_idle()
+        elif self.background is None:
+            # The draw event stores the background and draws the artists
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            for artist in self.artists:
+                self.canvas.figure.draw_artist(artist)
+            self.canvas.blit(self.canvas.figure.bbox)
+
 ### Ignore the best plot function
 def best_plot(x, y):
+    # Only this function needs scikit-learn, so plot_array() works without it
+    try:
+        from sklearn.metrics import mean_squared_error
+    except ImportError:
+        raise ImportError("best_plot requires scikit-learn (pip install scikit-learn)")
     
     x = np.array(x).flatten()
     y = np.array(y).flatten()
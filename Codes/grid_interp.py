@@ -0,0 +1,227 @@
+import numpy as np
+
+# Values this close (relative to the grid spacing) to a grid point snap onto it,
+# so that e.g. np.arange(0.2, 0.5, 0.1) hits the simulated points exactly.
+SNAP_TOLERANCE = 1e-9
+
+def bracket(grid, values, bounds_error=True, name='value'):
+    """
+    Find the bracketing grid indices and linear weights for each value.
+
+    Each value is represented as (1 - w) * grid[lo] + w * grid[hi]. When a
+    value sits on a grid point, hi == lo and w == 0, so neighbouring points
+    (which may hold NaNs) never contribute.
+
+    Parameters:
+        grid: Ascending grid axis.
+        values: Query values (any shape).
+        bounds_error: Raise ValueError for values outside the grid; otherwise
+            they are clamped to the nearest end point.
+        name: Axis name used in the error message.
+
+    Returns:
+        lo, hi, w: Arrays with the shape of values.
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(grid)
+
+    if bounds_error and values.size:
+        if np.any(values < grid[0]) or np.any(values > grid[-1]):
+            raise ValueError(f"One of the requested {name} values is out of bounds "
+                             f"({grid[0]:g} to {grid[-1]:g})")
+    values = np.minimum(np.maximum(values, grid[0]), grid[-1])
+
+    if n == 1:
+        zeros = np.zeros(values.shape, dtype=np.intp)
+        return zeros, zeros, np.zeros(values.shape)
+
+    lo = np.minimum(np.maximum(np.searchsorted(grid, values, side='right') - 1, 0), n - 2)
+    w = (values - grid[lo]) / (grid[lo + 1] - grid[lo])
+
+    # Snap values that land (numerically) on a grid point
+    upper = w > 1 - SNAP_TOLERANCE
+    lo = lo + upper
+    w = np.where(upper | (w < SNAP_TOLERANCE), 0.0, w)
+    hi = lo + (w > 0)
+    return lo, hi, w
+
+def slope_bracket(grid, values):
+    """
+    Grid cell used for the derivative at each value.
+
+    Inside a cell the linear interpolant has the constant slope
+    (f[hi] - f[lo]) * inv_width. At a grid point the cell above is used (the
+    cell below at the last point); values outside the grid use the end cells.
+
+    Returns:
+        lo, hi, inv_width: Arrays with the shape of values; inv_width is 0 for
+        a single-point grid.
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(grid)
+    if n == 1:
+        zeros = np.zeros(values.shape, dtype=np.intp)
+        return zeros, zeros, np.zeros(values.shape)
+    lo = np.minimum(np.maximum(np.searchsorted(grid, values, side='right') - 1, 0), n - 2)
+    return lo, lo + 1, 1 / (grid[lo + 1] - grid[lo])
+
+def _outside(grid, values):
+    return (values < grid[0]) | (values > grid[-1])
+
+def _take(data, index, axis):
+    """np.take through indexing, so encoded (float32) fields only decode the taken elements."""
+    return data[(slice(None),) * axis + (index,)]
+
+def _contract(data, lo, hi, w, axis):
+    """Two-tap linear interpolation along one axis."""
+    shape = [1] * np.ndim(data)
+    shape[axis] = len(w)
+    w = w.reshape(shape)
+    return _take(data, lo, axis) * (1 - w) + _take(data, hi, axis) * w
+
+def _differentiate(data, lo, hi, inv_width, axis):
+    """Slope of the linear interpolant along one axis."""
+    shape = [1] * np.ndim(data)
+    shape[axis] = len(inv_width)
+    return (_take(data, hi, axis) - _take(data, lo, axis)) * inv_width.reshape(shape)
+
+def grid_brackets(axes, queries, names=None):
+    """
+    Bracket the query vectors of interp_grid() once, so several tables on the
+    same grid can be interpolated at the same queries without repeating the search.
+
+    Returns:
+        One (lo, hi, w) tuple per axis, to pass as interp_grid(..., brackets=...).
+    """
+    queries = [np.atleast_1d(np.asarray(q, dtype=np.float64)).ravel() for q in queries]
+    names = names or [f"dimension {i}" for i in range(len(axes))]
+    return [bracket(grid, q, name=name) for grid, q, name in zip(axes, queries, names)]
+
+def interp_grid(axes, data, queries, names=None, brackets=None):
+    """
+    Tensor-product linear interpolation on the outer product of query vectors.
+
+    Instead of building the full list of query points, each axis is bracketed
+    once and the table is contracted with the two-tap weights of that axis, so
+    index work is proportional to the sum of the query lengths.
+
+    Parameters:
+        axes: Grid vectors of the trailing len(axes) dimensions of data.
+        data: Table to interpolate; any leading dimensions are kept as they are.
+        queries: One 1-D vector of query values per axis.
+        names: Optional axis names used in out-of-bounds errors.
+        brackets: Result of grid_brackets() for these queries (computed if None).
+
+    Returns:
+        Array of shape data.shape[:-len(axes)] + tuple(len(q) for q in queries).
+    """
+    if brackets is None:
+        brackets = grid_brackets(axes, queries, names)
+    first = np.ndim(data) - len(axes)
+
+    # Contract the axes that shrink the table the most first
+    order = sorted(range(len(axes)), key=lambda i: len(brackets[i][2]) / len(axes[i]))
+    output = data
+    for i in order:
+        output = _contract(output, *brackets[i], first + i)
+    return np.asarray(output, dtype=np.float64)
+
+def interp_grid_gradient(axes, data, queries, names=None, brackets=None):
+    """
+    interp_grid() together with its partial derivatives along every axis.
+
+    The derivative along an axis starts from the table already contracted
+    along the axes handled before it, so the value and all derivatives share
+    one pass over the table.
+
+    Returns:
+        value, gradient: gradient holds one array per axis, each with the
+        shape of value.
+    """
+    queries = [np.atleast_1d(np.asarray(q, dtype=np.float64)).ravel() for q in queries]
+    if brackets is None:
+        brackets = grid_brackets(axes, queries, names)
+    slopes = [slope_bracket(grid, q) for grid, q in zip(axes, queries)]
+    first = np.ndim(data) - len(axes)
+
+    order = sorted(range(len(axes)), key=lambda i: len(brackets[i][2]) / len(axes[i]))
+    output = data
+    gradient = [None] * len(axes)
+    for i in order:
+        axis = first + i
+        for j, partial in enumerate(gradient):
+            if partial is not None:
+                gradient[j] = _contract(partial, *brackets[i], axis)
+        gradient[i] = _differentiate(output, *slopes[i], axis)
+        output = _contract(output, *brackets[i], axis)
+    return np.asarray(output, dtype=np.float64), [np.asarray(g, dtype=np.float64) for g in gradient]
+
+def point_brackets(axes, points, names=None, bounds_error=True):
+    """
+    Bracket the points of interp_points() once, for several tables on the same grid.
+
+    Returns:
+        One (lo, hi, w) tuple per axis, to pass as interp_points(..., brackets=...).
+    """
+    points = np.broadcast_arrays(*[np.asarray(p, dtype=np.float64) for p in points])
+    names = names or [f"dimension {i}" for i in range(len(axes))]
+    return [bracket(grid, p, bounds_error, name) for grid, p, name in zip(axes, points, names)]
+
+def interp_points(axes, data, points, names=None, bounds_error=True, brackets=None):
+    """
+    Element-wise linear interpolation at scattered points.
+
+    The query arrays are broadcast against each other and each resulting point
+    is evaluated on its own, so N points cost O(N) instead of the O(N^k)
+    outer product built by interp_grid().
+
+    Parameters:
+        axes: Grid vectors of the trailing len(axes) dimensions of data.
+        data: Table to interpolate; any leading dimensions are kept as they are.
+        points: One array of coordinates per axis (broadcastable).
+        names: Optional axis names used in out-of-bounds errors.
+        bounds_error: Raise ValueError for points outside the grid; otherwise
+            they are clamped to the grid edges.
+        brackets: Result of point_brackets() for these points (computed if None).
+
+    Returns:
+        Array of shape data.shape[:-len(axes)] + broadcast shape of the points.
+    """
+    if brackets is None:
+        brackets = point_brackets(axes, points, names, bounds_error)
+    return _corner_sum(data, [((lo, 1 - w), (hi, w)) for lo, hi, w in brackets])
+
+def interp_points_gradient(axes, data, points, names=None, bounds_error=True):
+    """
+    interp_points() together with its partial derivatives along every axis.
+
+    Returns:
+        value, gradient: gradient holds one array per axis, each with the
+        shape of value. Points clamped to the grid (bounds_error=False) have
+        zero derivative along the clamped axis.
+    """
+    points = np.broadcast_arrays(*[np.asarray(p, dtype=np.float64) for p in points])
+    brackets = point_brackets(axes, points, names, bounds_error)
+    taps = [((lo, 1 - w), (hi, w)) for lo, hi, w in brackets]
+
+    gradient = []
+    for i, (grid, p) in enumerate(zip(axes, points)):
+        lo, hi, inv_width = slope_bracket(grid, p)
+        inv_width = np.where(_outside(np.asarray(grid), p), 0.0, inv_width)
+        gradient.append(_corner_sum(data, taps[:i] + [((lo, -inv_width), (hi, inv_width))] + taps[i + 1:]))
+    return _corner_sum(data, taps), gradient
+
+def _corner_sum(data, taps):
+    """Sum over the 2^k corners of the cell that holds each point; taps are ((lo, weight), (hi, weight)) per axis."""
+    output = 0.0
+    for corner in np.ndindex(*([2] * len(taps))):
+        index = []
+        weight = 1.0
+        for side, axis_taps in zip(corner, taps):
+            tap_index, tap_weight = axis_taps[side]
+            index.append(tap_index)
+            weight = weight * tap_weight
+        output = output + data[(Ellipsis, *index)] * weight
+    return np.asarray(output, dtype=np.float64)
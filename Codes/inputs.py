@@ -0,0 +1,58 @@
+import numpy as np
+
+# Parsing of the input fields shared by the GUI and the batch plot specs: a
+# value is a single number, a comma-separated list or a start:step:end range.
+
+def parse_value(value):
+    """
+    Parse an input value written as in the GUI input fields.
+
+    Parameters:
+        value: 'start:step:end' (np.arange, end excluded), a comma-separated
+            list such as '0.2, 0.5, 1', a single number, or an already
+            numeric value (number or list).
+
+    Returns:
+        A float for single values, otherwise a 1-D array.
+
+    Raises:
+        ValueError if the text is not a number, list or range.
+    """
+    if not isinstance(value, str):
+        value = np.asarray(value, dtype=np.float64)
+        return float(value) if value.ndim == 0 else value.ravel()
+    if ':' in value:
+        start, step, end = map(float, value.split(':'))
+        return np.arange(start, end, step)
+    if ',' in value:
+        return np.array([float(x.strip()) for x in value.split(',')])
+    return float(value)
+
+def parse_inputs(fields):
+    """
+    Parse the input fields of a plot.
+
+    Parameters:
+        fields: Dictionary of input name to value (GUI text or number), e.g.
+            {'L': '0.2:0.1:0.7', 'VDS': '0.6'}. Empty names or values are skipped.
+
+    Returns:
+        input_params, varying: input_params maps each name to its parsed value;
+        varying is (name, values) of the last input given as a range or list,
+        or None if every input is a single value.
+
+    Raises:
+        ValueError naming the input that cannot be parsed.
+    """
+    input_params = {}
+    varying = None
+    for param, value in fields.items():
+        if not param or value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        try:
+            input_params[param] = parse_value(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {param}: {value}") from None
+        if np.ndim(input_params[param]):
+            varying = (param, input_params[param])
+    return input_params, varying
@@ -0,0 +1,130 @@
+import hashlib
+import numpy as np
+import os
+import tempfile
+from scipy import io
+from scipy.io.matlab import matfile_version
+from device_table import AXES, DeviceTable, LazyFields
+from table_store import convert_mat, read_header
+
+# Lazy table loading: axis vectors and field names are read when a table is
+# opened, while the 4-D fields are only read when a lookup first uses them.
+#
+#   .gmid files         each field is read straight from its offset in the file
+#   v7.3 .mat (HDF5)    each field is read from its own dataset (needs h5py)
+#   v5/v7 .mat          MATLAB stores the struct as one (usually compressed)
+#                       variable that cannot be read field by field, so each
+#                       device is parsed once and spilled to a .gmid file,
+#                       which is then read lazily as above
+
+DEVICES = ('nch', 'pch')
+
+def default_cache_dir():
+    """Per-user directory for .gmid files converted from v5/v7 .mat files ($XDG_CACHE_HOME/gmid)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'gmid')
+
+def _open_native(file_name, max_bytes=None):
+    header = read_header(file_name)
+    shape = tuple(header['shape'])
+    count = int(np.prod(shape))
+
+    def load(name):
+        return np.fromfile(file_name, dtype=header['dtype'], count=count, offset=header['fields'][name])
+
+    fields = LazyFields(header['fields'], load, max_bytes)
+    axes = [np.asarray(header['axes'][key], dtype=np.float64) for key in AXES]
+    table = DeviceTable(*axes, header['W'], fields, header.get('meta'))
+    table.source = os.path.abspath(file_name)
+    return table
+
+def _open_hdf5(file_name, device, max_bytes=None):
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("Reading v7.3 .mat files lazily requires h5py (pip install h5py)")
+
+    f = h5py.File(file_name, 'r')
+    if device not in f:
+        raise KeyError(f"'{device}' data not found in {file_name}")
+    group = f[device]
+
+    # MATLAB writes arrays column-major, so HDF5 dimensions are reversed
+    axes = {}
+    for key in AXES:
+        if key in group:
+            axes[key] = np.asarray(group[key][()], dtype=np.float64).ravel()
+        elif key == 'VSB':
+            axes[key] = np.array([0.0])
+        else:
+            raise KeyError(f"Axis '{key}' not found in data")
+    W = float(np.asarray(group['W'][()]).ravel()[0])
+    grid_size = np.prod([len(values) for values in axes.values()])
+    names = [name for name in group if name not in AXES and name != 'W'
+             and isinstance(group[name], h5py.Dataset) and group[name].size == grid_size
+             and group[name].dtype.kind == 'f']
+
+    def load(name):
+        return group[name][()].T
+
+    fields = LazyFields(names, load, max_bytes)
+    table = DeviceTable(axes['L'], axes['VGS'], axes['VDS'], axes['VSB'], W, fields)
+    # Keep the file open for as long as the table is alive
+    table._file = f
+    return table
+
+def _open_v5(file_name, device, max_bytes=None, cache_dir=None):
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    spill_dir = None
+    if cache_dir is None:
+        spill_dir = tempfile.TemporaryDirectory(prefix='gmid_')
+        cache_dir = spill_dir.name
+    os.makedirs(cache_dir, exist_ok=True)
+    # .mat files of the same name in different directories get separate spill files
+    digest = hashlib.sha1(os.path.abspath(file_name).encode()).hexdigest()[:8]
+    spill = os.path.join(cache_dir, f"{stem}_{digest}_{device}.gmid")
+
+    # A spill file in cache_dir is reused as long as it is newer than the .mat file
+    if not (os.path.exists(spill) and os.path.getmtime(spill) >= os.path.getmtime(file_name)):
+        convert_mat(file_name, spill, device)
+    table = _open_native(spill, max_bytes)
+    if spill_dir is not None:
+        # The temporary spill file is removed together with the table
+        table._spill_dir = spill_dir
+    return table
+
+def open_lazy(file_name, device='nch', max_bytes=None, cache_dir=None):
+    """
+    Open one device of a .mat or .gmid file without reading its 4-D fields.
+
+    Parameters:
+        file_name: Path of the .mat or native .gmid file.
+        device: Struct to open ('nch' or 'pch'); ignored for .gmid files.
+        max_bytes: Memory ceiling for the fields held in memory (None for no
+            limit). Least recently used fields are released and re-read later.
+        cache_dir: For v5/v7 .mat files, directory in which the parsed device
+            is kept as a .gmid file so later opens skip the .mat parse (see
+            default_cache_dir()). A temporary file, removed with the table,
+            is used when not given, so the parse is repeated on every open.
+    """
+    if file_name.endswith('.gmid'):
+        return _open_native(file_name, max_bytes)
+    major, _ = matfile_version(file_name)
+    if major == 2:
+        return _open_hdf5(file_name, device, max_bytes)
+    return _open_v5(file_name, device, max_bytes, cache_dir)
+
+def list_devices(file_name):
+    """Names of the device structs ('nch', 'pch') stored in a .mat or .gmid file."""
+    if file_name.endswith('.gmid'):
+        return [read_header(file_name).get('device') or 'nch']
+    major, _ = matfile_version(file_name)
+    if major == 2:
+        import h5py
+        with h5py.File(file_name, 'r') as f:
+            return [name for name in DEVICES if name in f]
+    return [name for name, _, _ in io.whosmat(file_name) if name in DEVICES]
+
+def open_devices(file_name, max_bytes=None, cache_dir=None):
+    """Open every device of a file lazily. Returns a dictionary such as {'nch': table, 'pch': table}."""
+    return {device: open_lazy(file_name, device, max_bytes, cache_dir) for device in list_devices(file_name)}
@@ -1,50 +1,30 @@
+import itertools
+import logging
 import numpy as np
 from scipy import interpolate
 from scipy import io
+from device_table import AXES, DeviceTable, as_table, safe_divide
+from expression import is_expression
+from cross_lookup import stack_fits
+from grid_interp import (bracket, grid_brackets, interp_grid, interp_grid_gradient, interp_points,
+                         interp_points_gradient, point_brackets, slope_bracket)
+from table_set import TableSet
+import lookup_stats
 
-def safe_divide(a, b):
-    with np.errstate(divide='ignore', invalid='ignore'):
-        a = np.asarray(a)
-        b = np.asarray(b)
-        
-        if a.shape != b.shape:
-            if a.shape[0] == 1:
-                a = np.repeat(a, b.shape[0], axis=0)
-            if b.shape[0] == 1:
-                b = np.repeat(b, a.shape[0], axis=0)
-        
-        result = np.divide(a, b)
-        if isinstance(result, np.ndarray):
-            result[b == 0] = np.nan
-        elif b == 0:
-            result = np.nan
-    return result
+logger = logging.getLogger(__name__)
 
-def lookup(nch_data, outvar, *args, **kwargs):
-    # Debug flag
-    DEBUG = True
-    
-    # Extract base arrays
-    try:
-        L_values = nch_data['L'][0, 0].flatten()
-        VGS_values = nch_data['VGS'][0, 0].flatten()
-        VDS_values = nch_data['VDS'][0, 0].flatten()
-        VSB_values = np.array([0]) if 'VSB' not in nch_data.dtype.names else nch_data['VSB'][0, 0].flatten()
-        W = float(nch_data['W'][0, 0].flatten()[0])
-    except Exception as e:
-        print(f"Error extracting values: {e}")
-        return None
-
-    # Default parameters
+def _parse_args(table, args, kwargs):
+    """Merge the name/value pairs in args into kwargs and fill in the default parameters."""
     params = {
-        'L': np.min(L_values),
-        'VGS': VGS_values,
-        'VDS': np.max(VDS_values)/2,
-        'VSB': 0,
+        **table.defaults,
         'METHOD': 'pchip',
-        'WARNING': 'on'
+        'WARNING': 'on',
+        'SNAP': 'off',
+        'POINTWISE': 'off',
+        'GRAD': 'off'
     }
-    
+    kwargs = dict(kwargs)
+
     # Process args into kwargs
     i = 0
     while i < len(args):
@@ -53,30 +33,190 @@ def lookup(nch_data, outvar, *args, **kwargs):
             i += 2
         else:
             i += 1
-    
+
     # Update params with kwargs and ensure arrays
     for key, value in kwargs.items():
         if key in params:
             params[key] = np.atleast_1d(value)
+    return params, kwargs
 
-    # Determine mode
-    out_ratio = '_' in outvar
-    var_ratio = len(args) > 0 and isinstance(args[0], str) and '_' in args[0]
-    mode = 3 if (out_ratio and var_ratio) else (2 if out_ratio else 1)
-
-    if DEBUG: print(f"Mode: {mode}")
-
-    # Process output variable
-    if out_ratio:
-        numerator, denominator = outvar.split('_')
-        if denominator == 'W':
-            ydata = nch_data[numerator][0, 0] / W
-        elif numerator == 'W':
-            ydata = W / nch_data[denominator][0, 0]
+def _enabled(params, key):
+    """True if the on/off option key is switched on."""
+    return str(np.atleast_1d(params[key])[0]).lower() in ('on', 'true')
+
+def _derived(name):
+    """True for ratio names (GM_ID) and formulas (GM/(2*pi*CGG)), which lookup() treats alike."""
+    return '_' in name or is_expression(name)
+
+def _mode(outvar, args):
+    out_ratio = _derived(outvar)
+    var_ratio = len(args) > 0 and isinstance(args[0], str) and _derived(args[0])
+    return 3 if (out_ratio and var_ratio) else (2 if out_ratio else 1)
+
+def _cross_brackets(table, params, kwargs, grad=False):
+    """
+    Bracketing grid curves of a Mode 3 lookup.
+
+    Returns:
+        L_idx, VDS_idx, VSB_idx, weights: Arrays of shape (number of sweep
+        values, number of corners) indexing the curves to blend.
+        With grad=True, also a dictionary with the derivatives of the weights
+        with respect to L, VDS and VSB.
+    """
+    # Determine which parameter is being swept
+    sweep_param = None
+    sweep_values = None
+    for param in ['L', 'VDS', 'VGS', 'VSB']:
+        if param in kwargs and len(np.atleast_1d(kwargs[param])) > 1:
+            sweep_param = param
+            sweep_values = np.atleast_1d(kwargs[param])
+            break
+
+    if sweep_param is None:
+        sweep_param = 'L'
+        sweep_values = np.array([params['L'][0] if isinstance(params['L'], np.ndarray) else params['L']])
+
+    snap = _enabled(params, 'SNAP')
+
+    # Bracketing grid curves, weights and weight derivatives in L, VDS and VSB for every sweep value
+    corners = []
+    for key, grid in (('L', table.L), ('VDS', table.VDS), ('VSB', table.VSB)):
+        values = sweep_values if key == sweep_param else np.atleast_1d(params[key])[:1]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), (len(sweep_values),))
+        if snap:
+            # Legacy behaviour: use the nearest simulated curve only
+            nearest = np.abs(grid[None, :] - values[:, None]).argmin(axis=1)
+            corners.append(((nearest, np.ones(len(values)), np.zeros(len(values))),))
+        elif grad:
+            # Keep both curves of the cell the slope is taken across, even for values on a curve
+            lo, hi, w = bracket(grid, values, bounds_error=False, name=key)
+            cell_lo, cell_hi, inv_width = slope_bracket(grid, values)
+            inv_width = np.where((values < grid[0]) | (values > grid[-1]), 0.0, inv_width)
+            upper = lo != cell_lo
+            corners.append(((cell_lo, np.where(upper, 0.0, 1 - w), -inv_width),
+                            (cell_hi, np.where(upper, 1.0, w), inv_width)))
         else:
-            ydata = safe_divide(nch_data[numerator][0, 0], nch_data[denominator][0, 0])
-    else:
-        ydata = nch_data[outvar][0, 0]
+            lo, hi, w = bracket(grid, values, bounds_error=False, name=key)
+            corners.append(((lo, 1 - w, None), (hi, w, None)))
+
+    L_idx, VDS_idx, VSB_idx, weights = [], [], [], []
+    slopes = {'L': [], 'VDS': [], 'VSB': []}
+    for (l, wl, sl), (d, wd, sd), (b, wb, sb) in itertools.product(*corners):
+        L_idx.append(l)
+        VDS_idx.append(d)
+        VSB_idx.append(b)
+        weights.append(wl * wd * wb)
+        if grad:
+            slopes['L'].append(sl * wd * wb)
+            slopes['VDS'].append(wl * sd * wb)
+            slopes['VSB'].append(wl * wd * sb)
+    result = [np.stack(a, axis=1) for a in (L_idx, VDS_idx, VSB_idx, weights)]
+    if grad:
+        result.append({key: np.stack(a, axis=1) for key, a in slopes.items()})
+    return result
+
+def _blend(values, weights):
+    """Blend the bracketing curves; corners with zero weight are skipped."""
+    weights = weights[..., None]
+    return np.where(weights != 0, values * weights, 0.0).sum(axis=-2)
+
+def _cross_lookup(fit, xdesired, ratio_var, brackets):
+    """
+    Blend a Mode 3 fit at xdesired; with weight derivatives in brackets, also
+    return the partial derivatives with respect to the ratio and L, VDS, VSB.
+    """
+    weights = brackets[3]
+    values = fit(xdesired)
+    output = _blend(values, weights)
+    if len(brackets) == 4:
+        return output, None
+
+    # d/d(ratio) blends the curve slopes; d/dL etc. blend the curves with the weight derivatives
+    gradient = {ratio_var: _blend(fit.slope(xdesired), weights)}
+    for key, slopes in brackets[4].items():
+        gradient[key] = _blend(values, slopes)
+    return output, gradient
+
+def _shaped(shape, output, gradient):
+    """Apply the result shaping of lookup() to the value and, if present, to every partial derivative."""
+    if gradient is None:
+        return shape(output)
+    return shape(output), {key: shape(partial) for key, partial in gradient.items()}
+
+def _shape_grid(output):
+    """Arrange a (L, VGS, VDS, VSB) grid result the way lookup() returns it."""
+    output = np.squeeze(output)
+
+    if output.ndim > 1:
+        output = np.transpose(output)
+    if output.ndim == 1:
+        output = output.reshape(-1, 1)
+
+    # Ensure output is always at least 1D array
+    return np.atleast_1d(output)
+
+def _lookup_corners(tables, outvar, args, kwargs):
+    """lookup() across a TableSet; every result gains a leading corner axis."""
+    params, kwargs = _parse_args(tables, args, kwargs)
+    grad = _enabled(params, 'GRAD')
+
+    if _mode(outvar, args) == 3:
+        xdesired = np.atleast_1d(args[1])
+        method = str(np.atleast_1d(params['METHOD'])[0])
+        brackets = _cross_brackets(tables, params, kwargs, grad)
+        fit = tables.fit(args[0], outvar, method, *brackets[:3])
+        output, gradient = _cross_lookup(fit, xdesired, args[0], brackets)
+        return _shaped(lambda values: np.stack([np.atleast_1d(corner.squeeze()) for corner in values]),
+                       output, gradient)
+
+    points = (tables.L, tables.VGS, tables.VDS, tables.VSB)
+    queries = [params[key] for key in AXES]
+    if _enabled(params, 'POINTWISE'):
+        def shape(values):
+            return values.reshape(len(tables), -1) if values.ndim == 1 else values
+
+        if grad:
+            output, gradient = tables.interpolate(interp_points_gradient, points, outvar, queries, names=AXES)
+            return _shaped(shape, output, dict(zip(AXES, gradient)))
+        return shape(tables.interpolate(interp_points, points, outvar, queries, names=AXES))
+
+    def shape(values):
+        return np.stack([_shape_grid(corner) for corner in values])
+
+    if grad:
+        output, gradient = tables.interpolate(interp_grid_gradient, points, outvar, queries, names=AXES)
+        return _shaped(shape, output, dict(zip(AXES, gradient)))
+    return shape(tables.interpolate(interp_grid, points, outvar, queries, names=AXES))
+
+def lookup(nch_data, outvar, *args, **kwargs):
+    # Determine mode
+    mode = _mode(outvar, args)
+    logger.debug("Mode: %d", mode)
+
+    with lookup_stats.timer(f"lookup.mode{mode}") as timer:
+        output = _lookup(nch_data, outvar, mode, args, kwargs)
+        values = output[0] if isinstance(output, tuple) else output
+        timer.points = np.size(values) if values is not None else 0
+    return output
+
+def _lookup(nch_data, outvar, mode, args, kwargs):
+    # Process corners are evaluated together
+    if isinstance(nch_data, TableSet):
+        return _lookup_corners(nch_data, outvar, args, kwargs)
+    
+    # Compile the struct into a DeviceTable (no-op if a table is passed in)
+    try:
+        table = as_table(nch_data)
+        L_values = table.L
+        VGS_values = table.VGS
+        VDS_values = table.VDS
+        VSB_values = table.VSB
+    except Exception as e:
+        logger.error("Error extracting values: %s", e)
+        return None
+
+    params, kwargs = _parse_args(table, args, kwargs)
+    grad = _enabled(params, 'GRAD')
 
     # Mode 3: Cross-lookup
     if mode == 3:
@@ -84,143 +224,256 @@ def lookup(nch_data, outvar, *args, **kwargs):
             # Parse arguments
             ratio_var = args[0]
             xdesired = np.atleast_1d(args[1])
-            
-            # Determine which parameter is being swept
-            sweep_param = None
-            sweep_values = None
-            for param in ['L', 'VDS', 'VGS', 'VSB']:
-                if param in kwargs and len(np.atleast_1d(kwargs[param])) > 1:
-                    sweep_param = param
-                    sweep_values = np.atleast_1d(kwargs[param])
-                    break
-            
-            if sweep_param is None:
-                sweep_param = 'L'
-                sweep_values = np.array([params['L'][0] if isinstance(params['L'], np.ndarray) else params['L']])
-            
-            # Initialize output array with proper shape
-            output = np.full((len(sweep_values), len(xdesired)), np.nan)
-            
-            # Process input ratio
-            num, den = ratio_var.split('_')
-            if den == 'W':
-                xdata = nch_data[num][0, 0] / W
-            elif num == 'W':
-                xdata = W / nch_data[den][0, 0]
-            else:
-                xdata = safe_divide(nch_data[num][0, 0], nch_data[den][0, 0])
-
-            # For each sweep value
-            for idx, sweep_val in enumerate(sweep_values):
-                # Update params for current sweep value
-                current_params = params.copy()
-                current_params[sweep_param] = sweep_val
-                
-                # Get parameter values, handling both scalar and array cases
-                L = current_params['L'][0] if isinstance(current_params['L'], np.ndarray) else current_params['L']
-                VDS = current_params['VDS'][0] if isinstance(current_params['VDS'], np.ndarray) else current_params['VDS']
-                VSB = current_params['VSB'][0] if isinstance(current_params['VSB'], np.ndarray) else current_params['VSB']
-                
-                L_idx = np.abs(L_values - L).argmin()
-                VDS_idx = np.abs(VDS_values - VDS).argmin()
-                VSB_idx = np.abs(VSB_values - VSB).argmin()
-                
-                # Extract curves
-                x_curves = []
-                y_curves = []
-                
-                for vgs_idx in range(len(VGS_values)):
-                    x = xdata[L_idx, vgs_idx, VDS_idx, VSB_idx]
-                    y = ydata[L_idx, vgs_idx, VDS_idx, VSB_idx]
-                    
-                    if np.isfinite(x) and np.isfinite(y):
-                        x_curves.append(x)
-                        y_curves.append(y)
-                
-                if len(x_curves) > 0:
-                    x_curves = np.array(x_curves)
-                    y_curves = np.array(y_curves)
-                    
-                    # Sort and process curves
-                    sort_idx = np.argsort(x_curves)
-                    x_curves = x_curves[sort_idx]
-                    y_curves = y_curves[sort_idx]
-                    
-                    # Special case handling
-                    if num == 'GM' and den == 'ID':
-                        peaks = np.where(np.diff(x_curves) < 0)[0]
-                        if len(peaks) > 0:
-                            max_idx = peaks[0]
-                            x_curves = x_curves[max_idx:]
-                            y_curves = y_curves[max_idx:]
-                    elif num == 'GM' and (den == 'CGG' or den == 'CGS'):
-                        peaks = np.where(np.diff(x_curves) < 0)[0]
-                        if len(peaks) > 0:
-                            max_idx = peaks[0]
-                            x_curves = x_curves[:max_idx+1]
-                            y_curves = y_curves[:max_idx+1]
-                    
-                    # Remove duplicates
-                    unique_mask = np.concatenate(([True], np.diff(x_curves) != 0))
-                    x_curves = x_curves[unique_mask]
-                    y_curves = y_curves[unique_mask]
-                    
-                    if len(x_curves) >= 2:
-                        try:
-                            if params['METHOD'] == 'pchip':
-                                interpolator = interpolate.PchipInterpolator(x_curves, y_curves, extrapolate=False)
-                            else:
-                                interpolator = interpolate.interp1d(x_curves, y_curves,
-                                                                  kind=params['METHOD'],
-                                                                  bounds_error=False,
-                                                                  fill_value=np.nan)
-                            
-                            mask = (xdesired >= np.min(x_curves)) & (xdesired <= np.max(x_curves))
-                            output[idx, mask] = interpolator(xdesired[mask])
-                            
-                        except Exception as e:
-                            if DEBUG: print(f"Interpolation error: {e}")
-                    elif len(x_curves) == 1:
-                        exact_matches = np.isclose(xdesired, x_curves[0], rtol=1e-10)
-                        output[idx, exact_matches] = y_curves[0]
-            
+            method = str(np.atleast_1d(params['METHOD'])[0])
+            brackets = _cross_brackets(table, params, kwargs, grad)
+
+            # Fetch (or fit once) the curves along VGS and interpolate them in one batched pass
+            fit = table.curve_index(ratio_var, outvar, method).fit(*brackets[:3])
+            output, gradient = _cross_lookup(fit, xdesired, ratio_var, brackets)
+
             # Ensure output is always at least 1D array
-            squeezed = output.squeeze()
-            return np.atleast_1d(squeezed)
+            return _shaped(lambda values: np.atleast_1d(values.squeeze()), output, gradient)
 
         except Exception as e:
-            if DEBUG: print(f"Mode 3 error: {e}")
+            logger.debug("Mode 3 error: %s", e)
             raise
 
     # Modes 1 and 2
     else:
+        ydata = table.output(outvar)
         points = (L_values, VGS_values, VDS_values, VSB_values)
-        
-        for key in ['L', 'VGS', 'VDS', 'VSB']:
-            params[key] = np.atleast_1d(params[key])
-            
-        xi = np.array(np.meshgrid(params['L'], params['VGS'], params['VDS'], params['VSB'],
-                                 indexing='ij')).reshape(4, -1).T
-
-        output = interpolate.interpn(points, ydata, xi, method='linear')
-        output = output.reshape(len(params['L']), len(params['VGS']), 
-                              len(params['VDS']), len(params['VSB']))
-        output = np.squeeze(output)
-        
-        if output.ndim > 1:
-            output = np.transpose(output)
-        if output.ndim == 1:
-            output = output.reshape(-1, 1)
-            
-        # Ensure output is always at least 1D array
-        return np.atleast_1d(output)
+        queries = [params[key] for key in AXES]
+        if _enabled(params, 'POINTWISE'):
+            # Zipped query: element i uses the i-th L, VGS, VDS and VSB value
+            if grad:
+                output, gradient = interp_points_gradient(points, ydata, queries, names=AXES)
+                return _shaped(np.atleast_1d, output, dict(zip(AXES, gradient)))
+            output = interp_points(points, ydata, queries, names=AXES)
+            return np.atleast_1d(output)
+
+        if grad:
+            # Partial derivatives share the contractions of the value
+            output, gradient = interp_grid_gradient(points, ydata, queries, names=AXES)
+            return _shaped(_shape_grid, output, dict(zip(AXES, gradient)))
+        output = interp_grid(points, ydata, queries, names=AXES)
+        return _shape_grid(output)
     
+def lookup_many(nch_data, outvars, *args, **kwargs):
+    """
+    Look up several outputs at the same inputs in one pass.
+
+    Equivalent to calling lookup(nch_data, outvar, *args, **kwargs) for every
+    outvar, but the arguments are parsed once, every input axis is bracketed
+    once for all Mode 1/2 outputs, and the Mode 3 outputs share their
+    bracketing curves and are interpolated together.
+
+    Parameters:
+        nch_data: DeviceTable, loadmat struct or TableSet.
+        outvars: Output names, e.g. ['GM_ID', 'ID_W', 'GM_GDS'].
+        args, kwargs: Inputs and options as for lookup().
+
+    Returns:
+        Dictionary of lookup() results keyed by output name, in the order of outvars.
+        With 'GRAD', 'on' every entry is a (value, gradient) pair as from lookup().
+
+    Example:
+        result = lookup_many(nch, ['GM_ID', 'ID_W'], 'VDS', VDS, 'L', 0.6)
+        result['GM_ID'], result['ID_W']
+    """
+    outvars = [outvars] if isinstance(outvars, str) else list(dict.fromkeys(outvars))
+    with lookup_stats.timer("lookup_many") as timer:
+        output = _lookup_many(nch_data, outvars, args, kwargs)
+        timer.points = sum(np.size(values[0] if isinstance(values, tuple) else values)
+                           for values in output.values())
+    return output
+
+def _lookup_many(nch_data, outvars, args, kwargs):
+    corners = isinstance(nch_data, TableSet)
+    table = nch_data if corners else as_table(nch_data)
+    params, kwargs = _parse_args(table, args, kwargs)
+    if _enabled(params, 'GRAD'):
+        # Derivatives are evaluated output by output
+        return {outvar: _lookup(nch_data, outvar, _mode(outvar, args), args, kwargs) for outvar in outvars}
+    output = {}
+
+    # Mode 3: one set of bracketing curves, all outputs fitted and evaluated together
+    cross = [outvar for outvar in outvars if _mode(outvar, args) == 3]
+    if cross:
+        ratio_var = args[0]
+        xdesired = np.atleast_1d(args[1])
+        method = str(np.atleast_1d(params['METHOD'])[0])
+        L_idx, VDS_idx, VSB_idx, weights = _cross_brackets(table, params, kwargs)
+        if corners:
+            fits = [table.fit(ratio_var, outvar, method, L_idx, VDS_idx, VSB_idx) for outvar in cross]
+        else:
+            fits = [table.curve_index(ratio_var, outvar, method).fit(L_idx, VDS_idx, VSB_idx)
+                    for outvar in cross]
+        blended = _blend(stack_fits(fits)(xdesired), weights)
+        for outvar, values in zip(cross, blended):
+            if corners:
+                output[outvar] = np.stack([np.atleast_1d(corner.squeeze()) for corner in values])
+            else:
+                output[outvar] = np.atleast_1d(values.squeeze())
+
+    # Modes 1 and 2: one bracketing of the inputs for every output
+    direct = [outvar for outvar in outvars if outvar not in output]
+    if direct:
+        points = (table.L, table.VGS, table.VDS, table.VSB)
+        queries = [params[key] for key in AXES]
+        if _enabled(params, 'POINTWISE'):
+            brackets = point_brackets(points, queries, names=AXES)
+            for outvar in direct:
+                if corners:
+                    values = table.interpolate(interp_points, points, outvar, queries, brackets=brackets)
+                    output[outvar] = values.reshape(len(table), -1) if values.ndim == 1 else values
+                else:
+                    values = interp_points(points, table.output(outvar), queries, brackets=brackets)
+                    output[outvar] = np.atleast_1d(values)
+        else:
+            brackets = grid_brackets(points, queries, names=AXES)
+            for outvar in direct:
+                if corners:
+                    values = table.interpolate(interp_grid, points, outvar, queries, brackets=brackets)
+                    output[outvar] = np.stack([_shape_grid(corner) for corner in values])
+                else:
+                    values = interp_grid(points, table.output(outvar), queries, brackets=brackets)
+                    output[outvar] = _shape_grid(values)
+
+    return {outvar: output[outvar] for outvar in outvars}
+
+class LookupPlan:
+    """
+    A lookup() call with everything but one input resolved in advance.
+
+    Calling the plan with values of the varying input returns the same result
+    as the equivalent lookup() call. The plan holds on to data derived from the
+    table, so prepare it again after the table is modified.
+    """
+
+    def __init__(self, outvar, xvar, mode, evaluate):
+        self.outvar = outvar
+        self.xvar = xvar
+        self.mode = mode
+        self._evaluate = evaluate
+
+    def __call__(self, values):
+        with lookup_stats.timer(f"plan.mode{self.mode}") as timer:
+            output = self._evaluate(np.atleast_1d(np.asarray(values, dtype=np.float64)))
+            timer.points = output.size
+        return output
+
+    def __repr__(self):
+        return f"LookupPlan({self.outvar!r}, xvar={self.xvar!r}, mode={self.mode})"
+
+def _blend_axis(data, lo, hi, w, axis):
+    """Two-tap blend along one axis; taps with zero weight never contribute."""
+    shape = [1] * data.ndim
+    shape[axis] = len(w)
+    w = w.reshape(shape)
+    low = np.take(data, lo, axis=axis)
+    high = np.take(data, hi, axis=axis)
+    return np.where(w < 1, low * (1 - w), 0.0) + np.where(w > 0, high * w, 0.0)
+
+def prepare_lookup(nch_data, outvar, xvar='VGS', fixed=None, **options):
+    """
+    Compile a repeated lookup() call into a plan that only takes the varying input.
+
+    Argument parsing, mode selection, field and ratio resolution and the
+    bracketing of every fixed input are done once here; each plan call then
+    only brackets the new values and blends a handful of precomputed taps.
+
+    Parameters:
+        nch_data: DeviceTable or loadmat struct.
+        outvar: Output name as for lookup(), e.g. 'GM_ID' or 'GM_CGG'.
+        xvar: The input that varies between calls: an axis ('L', 'VGS', 'VDS',
+            'VSB') or, for a cross lookup, the ratio (e.g. 'GM_ID').
+        fixed: Dictionary of the other inputs, e.g. {'L': 0.5, 'VDS': 0.6}.
+            Missing axes use the lookup() defaults. A cross lookup that varies
+            an axis needs the ratio target here, e.g. {'GM_ID': 15}.
+        options: lookup() options such as METHOD='linear' or SNAP='on'.
+
+    Returns:
+        A LookupPlan; plan(values) is equivalent to lookup() with
+        xvar=values and the fixed inputs.
+
+    Example:
+        plan = prepare_lookup(nch, 'GM_CGG', xvar='GM_ID', fixed={'L': 0.5})
+        plan(15)    # same as lookup(nch, 'GM_CGG', 'GM_ID', 15, 'L', 0.5)
+    """
+    table = as_table(nch_data)
+    fixed = dict(fixed or {})
+    if xvar in fixed:
+        raise ValueError(f"'{xvar}' is the varying input and cannot also be fixed")
+    ratios = [key for key in fixed if _derived(key)]
+    ratio_var = xvar if _derived(xvar) else (ratios[0] if ratios else None)
+    mode = 3 if (_derived(outvar) and ratio_var is not None) else (2 if _derived(outvar) else 1)
+    if mode != 3 and xvar not in AXES:
+        raise ValueError(f"xvar must be one of {AXES} for a {outvar} lookup")
+
+    params, kwargs = _parse_args(table, (), {**fixed, **options})
+    if _enabled(params, 'GRAD'):
+        raise ValueError("GRAD is not available for prepared lookups; call lookup() with 'GRAD', 'on'")
+    snap = _enabled(params, 'SNAP')
+    method = str(np.atleast_1d(params['METHOD'])[0])
+
+    if mode == 3 and xvar == ratio_var:
+        # Varying ratio: the bracketing curves are fitted once
+        L_idx, VDS_idx, VSB_idx, weights = _cross_brackets(table, params, kwargs)
+        # Drop the bracketing curves that never contribute (e.g. fixed inputs on the grid)
+        used = np.any(weights > 0, axis=0)
+        L_idx, VDS_idx, VSB_idx, weights = [a[:, used] for a in (L_idx, VDS_idx, VSB_idx, weights)]
+        fit = table.curve_index(ratio_var, outvar, method).fit(L_idx, VDS_idx, VSB_idx)
+
+        def evaluate(values):
+            return np.atleast_1d(_blend(fit(values), weights).squeeze())
+
+    elif mode == 3:
+        # Varying axis: evaluate the cross lookup on every grid value of that
+        # axis once, then blend the two grid values bracketing each query
+        if xvar not in ('L', 'VDS', 'VSB'):
+            raise ValueError("A cross lookup can vary 'L', 'VDS', 'VSB' or its ratio")
+        grid = table.axes[xvar]
+        target = np.atleast_1d(fixed[ratio_var])
+        params[xvar] = kwargs[xvar] = grid
+        L_idx, VDS_idx, VSB_idx, weights = _cross_brackets(table, params, kwargs)
+        fit = table.curve_index(ratio_var, outvar, method).fit(L_idx, VDS_idx, VSB_idx)
+        on_grid = _blend(fit(target), weights)
+
+        def evaluate(values):
+            if snap:
+                nearest = np.abs(grid[None, :] - values[:, None]).argmin(axis=1)
+                output = on_grid[nearest]
+            else:
+                lo, hi, w = bracket(grid, values, bounds_error=False, name=xvar)
+                output = _blend_axis(on_grid, lo, hi, w, 0)
+            return np.atleast_1d(output.squeeze())
+
+    else:
+        # Modes 1 and 2: contract every fixed axis now, keep the varying one on its grid
+        axis = AXES.index(xvar)
+        points = (table.L, table.VGS, table.VDS, table.VSB)
+        queries = [points[i] if i == axis else params[key] for i, key in enumerate(AXES)]
+        reduced = interp_grid(points, table.output(outvar), queries, names=AXES)
+        grid = points[axis]
+        shape = [-1 if i == axis else 1 for i in range(4)]
+
+        def evaluate(values):
+            lo, hi, w = bracket(grid, values, name=xvar)
+            w = w.reshape(shape)
+            output = np.take(reduced, lo, axis=axis) * (1 - w) + np.take(reduced, hi, axis=axis) * w
+            return _shape_grid(output)
+
+    return LookupPlan(outvar, xvar, mode, evaluate)
+
 if __name__ == "__main__":
+    # Collect the statistics printed at the end
+    lookup_stats.ENABLED = True
+
     # Load the .mat data file
     data = io.loadmat('nch_18.mat')
-    nch_data = data['nch']
+    nch_data = DeviceTable.from_struct(data['nch'])
     
-    print("Available fields in data:", nch_data.dtype.names)
+    print("Available fields in data:", nch_data.names)
     
     # Test Case 1: Lookup 'ID' with specified L range and a fixed VGS
     print("\n--- Test Case 1: Lookup 'ID' ---")
@@ -301,6 +554,10 @@ if __name__ == "__main__":
     result13 = result13a.diagonal()
     print("Result:\n", result13)
 
+    # The same points evaluated element-wise, without building the 2-D grid
+    result13b = lookup(nch_data, 'ID', 'VGS', np.arange(0, 1.1, 0.1), 'VDS', np.arange(0, 1.1, 0.1), 'POINTWISE', 'on')
+    print("Pointwise result:\n", result13b)
+
     # Additional test cases
     print("\n--- Additional Test Cases ---")
     result14 = lookup(nch_data, 'GM_ID', 'L', np.arange(0.8, 1.4, 0.2))
@@ -327,3 +584,7 @@ if __name__ == "__main__":
     print("Inputs: GM_ID=0.973, L=[0.4, 0.5]")
     result20 = lookup(nch_data, 'ID_W', 'GM_ID', 0.973, 'L', [0.4, 0.5])
     print("Result:\n", result20)
+
+    # Calls, evaluated points and time per mode for the cases above
+    print("\n--- Lookup statistics ---")
+    print(lookup_stats.report())
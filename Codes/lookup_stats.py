@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Lightweight instrumentation of the lookup functions.
+#
+# Timers accumulate calls, evaluated points and wall time per operation
+# ('lookup.mode1', 'lookup_vgs.mode2', 'plan.mode3', ...). Counters track
+# events such as ratio cache hits and fitted Mode 3 curves. Recording is off
+# by default; set ENABLED = True (or GMID_STATS=1 in the environment) to
+# collect them. Updates are guarded by a lock, so lookups running on other
+# threads (e.g. the GUI's LookupWorker) are counted safely.
+#
+#   import lookup_stats
+#   lookup_stats.ENABLED = True
+#   lookup_stats.reset_stats()
+#   ... run lookups ...
+#   print(lookup_stats.report())
+
+ENABLED = os.environ.get('GMID_STATS', '0').lower() not in ('', '0', 'false', 'off')
+
+_timers = defaultdict(lambda: {'calls': 0, 'points': 0, 'seconds': 0.0})
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+def record(name, seconds, points=0):
+    """Add one call of an operation that took `seconds` and produced `points` values."""
+    if not ENABLED:
+        return
+    with _lock:
+        entry = _timers[name]
+        entry['calls'] += 1
+        entry['points'] += int(points)
+        entry['seconds'] += seconds
+
+def count(name, n=1):
+    """Increment an event counter, e.g. count('ratio_cache.hits')."""
+    if ENABLED:
+        with _lock:
+            _counters[name] += n
+
+class timer:
+    """
+    Context manager that records the wall time of a block.
+
+    Example:
+        with timer('lookup.mode1') as t:
+            output = ...
+            t.points = output.size
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.points = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter() if ENABLED else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start, self.points)
+        return False
+
+def get_stats():
+    """
+    Snapshot of all statistics.
+
+    Returns:
+        Dictionary with 'timers' ({name: {'calls', 'points', 'seconds'}}) and
+        'counters' ({name: value}).
+    """
+    with _lock:
+        return {
+            'timers': {name: dict(entry) for name, entry in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+def reset_stats():
+    """Clear all timers and counters."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+def report():
+    """Human-readable summary of get_stats()."""
+    stats = get_stats()
+    lines = [f"{'Operation':<22}{'Calls':>10}{'Points':>12}{'Total ms':>12}{'us/call':>10}"]
+    for name, entry in sorted(stats['timers'].items()):
+        per_call = entry['seconds'] / entry['calls'] * 1e6 if entry['calls'] else 0.0
+        lines.append(f"{name:<22}{entry['calls']:>10}{entry['points']:>12}"
+                     f"{entry['seconds'] * 1e3:>12.2f}{per_call:>10.1f}")
+    if stats['counters']:
+        lines.append("")
+        lines.append(f"{'Counter':<34}{'Value':>10}")
+        for name, value in sorted(stats['counters'].items()):
+            lines.append(f"{name:<34}{value:>10}")
+    return "\n".join(lines)
@@ -1,20 +1,40 @@
+import logging
 import numpy as np
 from scipy.interpolate import PchipInterpolator, interp1d
 from lookup import lookup
+from device_table import DeviceTable, as_table
+from cross_lookup import fit_curves
+from grid_interp import interp_points, interp_points_gradient, slope_bracket
+from table_set import TableSet
+import lookup_stats
 
-# Note: Please ignore the "Mode" in the output while using the lookup_vgs function. It refers to the mode used by the lookup function when it is called.
+logger = logging.getLogger(__name__)
 
 def lookup_vgs(nch_data, **kwargs):
+    mode = 2 if ('VGB' in kwargs or 'VDB' in kwargs) else 1
+    with lookup_stats.timer(f"lookup_vgs.mode{mode}") as timer:
+        output = _lookup_vgs(nch_data, **kwargs)
+        timer.points = np.size(output[0] if isinstance(output, tuple) else output)
+    return output
+
+def _lookup_vgs(nch_data, **kwargs):
     debug = kwargs.pop('debug', False)
+    grad = str(kwargs.pop('GRAD', 'off')).lower() in ('on', 'true')
+
+    # Process corners are inverted together, one result row per corner
+    if isinstance(nch_data, TableSet):
+        if grad:
+            raise ValueError("GRAD is only available for a single table")
+        return lookup_vgs_batch(nch_data, **kwargs)
+    use_inverse = str(kwargs.pop('INVERSE', 'off')).lower() in ('on', 'true')
     
     try:
-        L_values = nch_data['L'][0, 0].flatten()
-        VGS_values = nch_data['VGS'][0, 0].flatten()
-        VDS_values = nch_data['VDS'][0, 0].flatten()
-        if 'VSB' in nch_data.dtype.names:
-            VSB_values = nch_data['VSB'][0, 0].flatten()
-        else:
-            VSB_values = np.array([0])
+        # Compile once so the lookup() calls below reuse the same table
+        nch_data = as_table(nch_data)
+        L_values = nch_data.L
+        VGS_values = nch_data.VGS
+        VDS_values = nch_data.VDS
+        VSB_values = nch_data.VSB
             
         if debug:
             print("\nValue ranges:")
@@ -24,8 +44,8 @@ def lookup_vgs(nch_data, **kwargs):
             print(f"VSB: {np.min(VSB_values):.3f} to {np.max(VSB_values):.3f}")
             
     except Exception as e:
-        print(f"Error extracting values: {e}")
-        print("Available fields in data:", nch_data.dtype.names)
+        logger.error("Error extracting values: %s", e)
+        logger.error("Available fields in data: %s", nch_data.dtype.names)
         return np.array([])
 
     defaults = {
@@ -52,12 +72,17 @@ def lookup_vgs(nch_data, **kwargs):
     elif not np.isnan(params['VGB']) and not np.isnan(params['VDB']):
         mode = 2
     else:
-        print('Invalid syntax or usage mode! Please check the documentation.')
+        logger.error('Invalid syntax or usage mode! Please check the documentation.')
         return np.array([])
     
     if debug:
         print(f"\nOperating in mode {mode}")
 
+    if grad and mode == 2:
+        raise ValueError("GRAD is only available in mode 1 (L, VDS and VSB given)")
+    if grad and params['METHOD'].lower() not in ('pchip', 'linear'):
+        raise ValueError(f"GRAD needs METHOD 'pchip' or 'linear', not '{params['METHOD']}'")
+
     # Check whether GM_ID or ID_W was passed
     has_gm_id = isinstance(params['GM_ID'], (np.ndarray, list)) or not np.isnan(params['GM_ID'])
     has_id_w = isinstance(params['ID_W'], (np.ndarray, list)) or not np.isnan(params['ID_W'])
@@ -69,19 +94,38 @@ def lookup_vgs(nch_data, **kwargs):
         ratio_string = 'GM_ID'
         ratio_data = np.atleast_1d(params['GM_ID'])
     else:
-        print('Invalid syntax or usage mode! Please check the documentation.')
+        logger.error('Invalid syntax or usage mode! Please check the documentation.')
         return np.array([])
 
+    if use_inverse and mode == 2:
+        raise ValueError("INVERSE is only available in mode 1 (L, VDS and VSB given)")
+
     if mode == 1:
+        # Direct interpolation of the precomputed inverse grid when asked for
+        inverse, usable = None, None
+        if use_inverse:
+            inverse, usable = _lookup_inverse(nch_data, ratio_string, ratio_data,
+                                              params['L'], params['VDS'], params['VSB'])
+        if inverse is not None and np.all(usable):
+            if debug:
+                print("\nUsing precomputed inverse grid")
+            if grad:
+                return _inverse_gradient(nch_data, ratio_string, ratio_data,
+                                         params['L'], params['VDS'], params['VSB'])
+            return np.array(inverse)
+
         VGS = VGS_values
         ratio = lookup(nch_data, ratio_string, 
                       VGS=VGS, 
                       VDS=params['VDS'], 
                       VSB=params['VSB'], 
-                      L=params['L'])
+                      L=params['L'],
+                      GRAD='on' if grad else 'off')
+        if grad and ratio is not None:
+            ratio, ratio_gradient = ratio
         
         if ratio is None:
-            print("Error: lookup function returned None")
+            logger.error("lookup function returned None")
             return np.array([])
             
     else:  # mode 2
@@ -107,7 +151,7 @@ def lookup_vgs(nch_data, **kwargs):
             print(f"Total valid points: {np.sum(valid_points)} / {len(VGS)}")
         
         if np.sum(valid_points) == 0:
-            print("Error: No valid operating points found within device limits")
+            logger.error("No valid operating points found within device limits")
             return np.array([])
         
         # Apply filtering
@@ -125,15 +169,16 @@ def lookup_vgs(nch_data, **kwargs):
             print(f"VSB: {np.min(VSB):.3f} to {np.max(VSB):.3f}")
             print(f"L: {params['L']}")
         
-        # Get ratio values for valid points
+        # Get ratio values for valid points (evaluated element-wise)
         ratio = lookup(nch_data, ratio_string,
                       VGS=VGS,
                       VDS=VDS,
                       VSB=VSB,
-                      L=L_array)
+                      L=L_array,
+                      POINTWISE='on')
                       
         if ratio is None:
-            print("Error: lookup function returned None")
+            logger.error("lookup function returned None")
             return np.array([])
 
         if debug:
@@ -143,11 +188,6 @@ def lookup_vgs(nch_data, **kwargs):
             if np.sum(np.isfinite(ratio)) > 0:
                 print(f"Range: {np.nanmin(ratio):.3e} to {np.nanmax(ratio):.3e}")
         
-        # Extract diagonal elements for mode 2
-        if len(ratio.shape) == 4:
-            idx = np.arange(len(VGS))
-            ratio = ratio[idx, idx, idx, idx]
-        
         valid_idx = np.isfinite(ratio)
         ratio = ratio[valid_idx]
         VGS = VGS[valid_idx]
@@ -160,7 +200,7 @@ def lookup_vgs(nch_data, **kwargs):
                 print(f"VGS range: {np.min(VGS):.3f} to {np.max(VGS):.3f}")
         
         if len(ratio) == 0:
-            print("Error: No valid ratio values after filtering")
+            logger.error("No valid ratio values after filtering")
             return np.array([])
 
     # Ensure ratio is 2D
@@ -182,7 +222,7 @@ def lookup_vgs(nch_data, **kwargs):
             print(f"VGS range: {np.min(VGS_range):.3f} to {np.max(VGS_range):.3f}")
 
     if len(ratio_range) < 2:
-        print("Error: Not enough valid points for interpolation")
+        logger.error("Not enough valid points for interpolation")
         return np.array([])
 
     # Sort arrays to ensure monotonic interpolation
@@ -202,7 +242,10 @@ def lookup_vgs(nch_data, **kwargs):
             print(f"Slope: {slope:.6f}")
             print(f"Delta ratio: {delta_ratio:.3e}")
             print(f"Extrapolated result: {result:.6f}")
-            
+
+        if grad:
+            result = np.array([result])
+            return result, _vgs_gradient(VGS_values, ratio_gradient, ratio_string, result, np.array([slope]))
         return np.array([result])
 
     # Normal interpolation for other cases
@@ -216,17 +259,229 @@ def lookup_vgs(nch_data, **kwargs):
         result = interpolator(ratio_data)
         if debug:
             print(f"\nInterpolation result: {result}")
+        if grad:
+            if params['METHOD'].lower() == 'pchip':
+                dvgs_dratio = interpolator.derivative()(ratio_data)
+            else:
+                lo, hi, inv_width = slope_bracket(ratio_range, ratio_data)
+                dvgs_dratio = (VGS_range[hi] - VGS_range[lo]) * inv_width
+            return np.array(result), _vgs_gradient(VGS_values, ratio_gradient, ratio_string, result, dvgs_dratio)
         return np.array(result)
     except Exception as e:
-        print(f"Interpolation error: {e}")
+        logger.error("Interpolation error: %s", e)
         return np.array([])
 
+def _vgs_gradient(VGS, ratio_gradient, ratio_string, result, dvgs_dratio):
+    """
+    Partial derivatives of the VGS that solves ratio(VGS, L, VDS, VSB) = target.
+
+    By the implicit function theorem dVGS/dX = -(dratio/dX) * dVGS/dtarget,
+    with dratio/dX from lookup() interpolated along VGS at the solution.
+    """
+    gradient = {ratio_string: np.asarray(dvgs_dratio, dtype=np.float64)}
+    for key in ('L', 'VDS', 'VSB'):
+        partial = np.interp(result, VGS, np.ravel(ratio_gradient[key]))
+        gradient[key] = -partial * gradient[ratio_string]
+    return gradient
+
+def _inverse_gradient(table, ratio_string, target, L, VDS, VSB):
+    """VGS and its partial derivatives from a precomputed inverse grid."""
+    targets, grid = table.inverse[ratio_string]
+    values, gradient = interp_points_gradient((table.L, targets, table.VDS, table.VSB), grid,
+                                              (L, target, VDS, VSB), bounds_error=False)
+    return values, dict(zip(('L', ratio_string, 'VDS', 'VSB'), gradient))
+
+def _in_range(values, grid):
+    return (values >= np.min(grid)) & (values <= np.max(grid))
+
+def _invert(fit, target, ratio_string):
+    """Evaluate fitted ratio-to-VGS curves at target, extrapolating like lookup_vgs."""
+    result = fit(target, extrapolate=True)
+
+    if ratio_string == 'ID_W':
+        # Linear extrapolation above the largest simulated current density
+        last = np.maximum(fit.counts - 1, 1)[..., None]
+        x0, x1 = [np.take_along_axis(fit.x, i, axis=-1) for i in (last - 1, last)]
+        y0, y1 = [np.take_along_axis(fit.y, i, axis=-1) for i in (last - 1, last)]
+        above = (fit.counts[..., None] >= 2) & (target > x1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            extrapolated = y1 + (y1 - y0) / (x1 - x0) * (target - x1)
+        result = np.where(above, extrapolated, result)
+    return result
+
+def precompute_inverse(nch_data, ratio_string, targets, method='pchip'):
+    """
+    Build the inverse grid VGS(ratio, L, VDS, VSB) once and store it on the table.
+
+    Every simulated ratio-vs-VGS curve is inverted at the given target axis.
+    Mode 1 VGS lookups called with INVERSE='on' (lookup_vgs and
+    lookup_vgs_batch) then become a direct multilinear interpolation of this
+    grid; other calls, and points outside the grid, use the exact inversion.
+
+    The grid is exact at the simulated L, VDS and VSB values and the target
+    axis, but in between it interpolates VGS linearly instead of inverting
+    the interpolated curve. On nch_18.mat with a gm/ID step of 0.1 this
+    differs from the exact inversion by up to about 0.5 mV; a coarser target
+    axis or table grid gives larger errors.
+
+    Parameters:
+        nch_data: DeviceTable to extend.
+        ratio_string: 'GM_ID' or 'ID_W'.
+        targets: Ascending target axis, e.g. np.arange(3, 30.1, 0.1) for GM_ID
+            or np.logspace(-9, -3, 200) for ID_W.
+        method: Interpolation method used for the inversion.
+
+    Returns:
+        Array of shape (len(L), len(targets), len(VDS), len(VSB)).
+    """
+    table = as_table(nch_data)
+    targets = np.ascontiguousarray(targets, dtype=np.float64).ravel()
+    numerator, denominator = ratio_string.split('_')
+
+    # Curves along VGS for every (L, VDS, VSB) grid point
+    curves = np.moveaxis(table.ratio(numerator, denominator), 1, -1)
+    fit = fit_curves(curves, np.broadcast_to(table.VGS, curves.shape), method)
+    grid = np.ascontiguousarray(np.moveaxis(_invert(fit, targets, ratio_string), -1, 1))
+
+    table.inverse[ratio_string] = (targets, grid)
+    return grid
+
+def _lookup_inverse(table, ratio_string, target, L, VDS, VSB):
+    """
+    Interpolate a precomputed inverse grid. Returns (VGS, usable) where usable
+    marks the points covered by the grid; None if no grid was precomputed.
+    """
+    if ratio_string not in table.inverse:
+        return None, None
+    lookup_stats.count('inverse_grid.lookups')
+    targets, grid = table.inverse[ratio_string]
+    usable = (_in_range(target, targets) & _in_range(L, table.L)
+              & _in_range(VDS, table.VDS) & _in_range(VSB, table.VSB))
+    values = interp_points((table.L, targets, table.VDS, table.VSB), grid,
+                           (L, target, VDS, VSB), bounds_error=False)
+    return values, usable & np.isfinite(values)
+
+def _batch_params(table, kwargs):
+    """Default parameters and ratio name ('GM_ID' or 'ID_W') of a batched VGS lookup."""
+    params = {
+        'L': np.min(table.L),
+        'VDS': np.max(table.VDS) / 2,
+        'VSB': 0,
+        'VDB': None,
+        'VGB': None,
+        'GM_ID': None,
+        'ID_W': None,
+        'METHOD': 'pchip',
+        'INVERSE': 'off',
+        **kwargs
+    }
+
+    if params['ID_W'] is not None:
+        ratio_string = 'ID_W'
+    elif params['GM_ID'] is not None:
+        ratio_string = 'GM_ID'
+    else:
+        raise ValueError("Either GM_ID or ID_W must be given")
+
+    if (params['VDB'] is None) != (params['VGB'] is None):
+        raise ValueError("VDB and VGB must be given together")
+    if str(params['INVERSE']).lower() in ('on', 'true') and params['VDB'] is not None:
+        raise ValueError("INVERSE is only available in mode 1 (L, VDS and VSB given)")
+    return params, ratio_string
+
+def _batch_invert(table, ratio_grid, ratio_string, params):
+    """
+    Invert ratio_grid for every broadcast design point in params.
+
+    ratio_grid has the table shape (L, VGS, VDS, VSB).
+    """
+
+    if params['VDB'] is None:
+        # Mode 1: interpolate every ratio-vs-VGS curve in L, VDS and VSB
+        target, L, VDS, VSB = np.broadcast_arrays(*[np.asarray(params[key], dtype=np.float64)
+                                                    for key in (ratio_string, 'L', 'VDS', 'VSB')])
+        shape = target.shape
+        target, L, VDS, VSB = [a.ravel() for a in (target, L, VDS, VSB)]
+        inside = _in_range(L, table.L) & _in_range(VDS, table.VDS) & _in_range(VSB, table.VSB)
+
+        # With INVERSE='on', points covered by the precomputed inverse grid skip the inversion
+        inverse, use_inverse = None, None
+        if str(params['INVERSE']).lower() in ('on', 'true'):
+            inverse, use_inverse = _lookup_inverse(table, ratio_string, target, L, VDS, VSB)
+        if inverse is not None and np.all(use_inverse | ~inside):
+            result = np.where(inside, inverse, np.nan)
+            return result.reshape(shape)
+
+        curves = interp_points((table.L, table.VDS, table.VSB), np.moveaxis(ratio_grid, -3, 0),
+                               (L, VDS, VSB), bounds_error=False)
+        curves = np.moveaxis(curves, 0, -1)
+        VGS = np.broadcast_to(table.VGS, curves.shape)
+    else:
+        # Mode 2: sweep the unknown VSB for every (VGB, VDB) point
+        target, L, VDB, VGB = np.broadcast_arrays(*[np.asarray(params[key], dtype=np.float64)
+                                                    for key in (ratio_string, 'L', 'VDB', 'VGB')])
+        shape = target.shape
+        target, L, VDB, VGB = [a.ravel()[:, None] for a in (target, L, VDB, VGB)]
+        target = target[:, 0]
+        inside = _in_range(L[:, 0], table.L)
+
+        step = table.VGS[1] - table.VGS[0]
+        VSB = np.arange(np.min(table.VSB), np.max(table.VSB) + step, step)[None, :]
+        VGS = VGB - VSB
+        VDS = VDB - VSB
+        valid = _in_range(VSB, table.VSB) & _in_range(VGS, table.VGS) & _in_range(VDS, table.VDS)
+
+        curves = interp_points((table.L, table.VGS, table.VDS, table.VSB), ratio_grid,
+                               (L, VGS, VDS, VSB), bounds_error=False)
+        curves = np.where(valid, curves, np.nan)
+        inverse = None
+
+    fit = fit_curves(curves, VGS, str(params['METHOD']).lower())
+    result = _invert(fit, target[:, None], ratio_string)[..., 0]
+    if inverse is not None:
+        result = np.where(use_inverse, inverse, result)
+
+    result[..., ~inside] = np.nan
+    return result.reshape(shape)
+
+def lookup_vgs_batch(nch_data, **kwargs):
+    """
+    Vectorized lookup_vgs for many design points in one call.
+
+    The GM_ID or ID_W targets and the inputs L, VDS, VSB (mode 1) or L, VDB,
+    VGB (mode 2) may be scalars or arrays. They are broadcast against each
+    other and all ratio-to-VGS inversions are done in a single batched pass.
+
+    Passing a TableSet inverts every corner in the same pass and adds a
+    leading corner axis to the result.
+
+    INVERSE='on' (mode 1) interpolates the grid built by precompute_inverse()
+    instead of inverting, see there for its error.
+
+    Returns:
+        VGS array with the broadcast shape of the inputs. Points whose inputs
+        fall outside the table, or that cannot be inverted, are NaN.
+    """
+    table = nch_data if isinstance(nch_data, TableSet) else as_table(nch_data)
+    params, ratio_string = _batch_params(table, kwargs)
+    numerator, denominator = ratio_string.split('_')
+    mode = 1 if params['VDB'] is None else 2
+    with lookup_stats.timer(f"lookup_vgs_batch.mode{mode}") as timer:
+        if isinstance(table, TableSet):
+            # One inversion per corner, each from its own table's ratio grid
+            output = np.stack([_batch_invert(corner, corner.ratio(numerator, denominator), ratio_string, params)
+                               for corner in table.tables])
+        else:
+            output = _batch_invert(table, table.ratio(numerator, denominator), ratio_string, params)
+        timer.points = output.size
+    return output
+
 if __name__ == "__main__":
     from scipy.io import loadmat
     
     # Load the MATLAB data
     data = loadmat('nch_18.mat')
-    nch_data = data['nch']
+    nch_data = DeviceTable.from_struct(data['nch'])
   
     print("\nTest Case 1:")
     result1 = lookup_vgs(nch_data, GM_ID=10, VDS=0.6, VSB=0.1, L=0.18)
@@ -246,3 +501,12 @@ if __name__ == "__main__":
     
     result5 = lookup_vgs(nch_data, GM_ID= 12, VDB=0.6, VGB=1, L=1.8)
     print("Result 5:", result5)
+
+    # Batched version: all combinations of GM_ID and L in one call
+    result6 = lookup_vgs_batch(nch_data, GM_ID=np.arange(10, 15, 1)[:, None], VDS=0.6, VSB=0.1, L=[0.18, 0.3, 0.5])
+    print("Result 6:", result6)
+
+    # Precompute VGS(GM_ID) once; mode 1 lookups with INVERSE='on' interpolate it directly
+    precompute_inverse(nch_data, 'GM_ID', np.arange(3, 30.05, 0.1))
+    result7 = lookup_vgs(nch_data, GM_ID=10, VDS=0.6, VSB=0.1, L=0.18, INVERSE='on')
+    print("Result 7:", result7)
@@ -0,0 +1,81 @@
+import threading
+from PyQt5.QtCore import QMutex, QMutexLocker, QThread, QWaitCondition, pyqtSignal
+
+class LookupWorker(QThread):
+    """
+    Background thread that runs lookup jobs for the GUI, latest request first.
+
+    Requests are coalesced per channel: a job submitted while another job of
+    the same channel is waiting replaces it, so each channel (e.g. plot
+    updates and slider moves) has at most one waiting job. Waiting jobs run
+    in the order they were submitted. Each submit() returns a token; results
+    are emitted with that token, and jobs that were superseded on their
+    channel before finishing are not emitted at all.
+
+    Jobs run one at a time while holding `lock`. Code on other threads that
+    uses the same tables (and their caches) should take the lock as well.
+
+    Signals:
+        result_ready(token, result): The job returned result.
+        failed(token, message): The job raised an exception.
+    """
+    result_ready = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self._mutex = QMutex()
+        self._condition = QWaitCondition()
+        # channel -> (token, job) of the waiting jobs, in submission order
+        self._pending = {}
+        # channel -> token of its latest job
+        self._latest = {}
+        self._token = 0
+        self._stopping = False
+
+    def submit(self, job, channel=None):
+        """
+        Queue job (a callable without arguments) in place of any waiting job
+        of the same channel; returns its token.
+        """
+        with QMutexLocker(self._mutex):
+            self._token += 1
+            self._pending.pop(channel, None)
+            self._pending[channel] = (self._token, job)
+            self._latest[channel] = self._token
+            self._condition.wakeOne()
+            return self._token
+
+    def is_current(self, token):
+        """True if no newer job has been submitted on the channel of token since."""
+        with QMutexLocker(self._mutex):
+            return token in self._latest.values()
+
+    def run(self):
+        while True:
+            with QMutexLocker(self._mutex):
+                while not self._pending and not self._stopping:
+                    self._condition.wait(self._mutex)
+                if self._stopping:
+                    return
+                token, job = self._pending.pop(next(iter(self._pending)))
+
+            try:
+                with self.lock:
+                    result = job()
+            except Exception as e:
+                self.failed.emit(token, str(e))
+                continue
+
+            # Drop results that a newer request has already made stale
+            if self.is_current(token):
+                self.result_ready.emit(token, result)
+
+    def stop(self):
+        """Finish the running job, discard any waiting one and end the thread."""
+        with QMutexLocker(self._mutex):
+            self._stopping = True
+            self._pending.clear()
+            self._condition.wakeOne()
+        self.wait()
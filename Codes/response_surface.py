@@ -0,0 +1,73 @@
+import numpy as np
+from device_table import as_table
+from grid_interp import bracket
+from lookup import _mode, lookup
+
+# Number of x samples of a response surface; the GUI slider has 10000 steps,
+# so rows are at most 10 slider steps apart
+SURFACE_POINTS = 1001
+
+class ResponseSurface:
+    """
+    One output precomputed on a dense x grid for every value of the varying
+    parameter, so the intersection plot for any slider position is a linear
+    interpolation between two rows instead of a new lookup.
+
+    Parameters:
+        x: Ascending x grid (the slider range).
+        values: Array of shape (len(x), number of varying values).
+    """
+
+    def __init__(self, x, values):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @classmethod
+    def build(cls, data, outvar, x_var, x_range, varying_param, varying_values, input_params,
+              points=SURFACE_POINTS):
+        """
+        Evaluate outvar across x_range and the varying values in one batched lookup.
+
+        Parameters:
+            data: DeviceTable or loadmat struct.
+            outvar, x_var: Output and x variable of the plot, as passed to lookup().
+            x_range: (x_min, x_max) covered by the slider.
+            varying_param, varying_values: The input swept in the intersection plot.
+            input_params: The remaining lookup() inputs (including the varying one).
+            points: Number of x samples.
+
+        Raises:
+            ValueError if the lookup result cannot be arranged as (x, varying values),
+            e.g. when more than one input is swept.
+        """
+        table = as_table(data)
+        x = np.linspace(x_range[0], x_range[1], points)
+        if x_var in table.axes:
+            # Include the simulated grid points so piecewise-linear results are reproduced exactly
+            grid = table.axes[x_var]
+            x = np.union1d(x, grid[(grid >= x_range[0]) & (grid <= x_range[1])])
+        varying_values = np.atleast_1d(varying_values)
+        shape = (len(x), len(varying_values))
+
+        if _mode(outvar, (x_var,)) == 3:
+            # Cross lookup: every x value on every curve of the sweep in one call
+            values = lookup(table, outvar, x_var, x, **input_params)
+            if np.size(values) != np.prod(shape):
+                raise ValueError(f"Unexpected {outvar} result shape {np.shape(values)}")
+            values = np.reshape(values, shape[::-1]).T
+        else:
+            # Direct lookup: evaluate the (x, varying value) pairs element-wise
+            kwargs = {**input_params, x_var: x[:, None], varying_param: varying_values[None, :]}
+            values = lookup(table, outvar, POINTWISE='on', **kwargs)
+            if np.shape(values) != shape:
+                raise ValueError(f"Unexpected {outvar} result shape {np.shape(values)}")
+        return cls(x, values)
+
+    def __call__(self, x_value):
+        """Values across the varying parameter at x_value."""
+        lo, hi, w = bracket(self.x, np.atleast_1d(x_value), bounds_error=False)
+        low, high = self.values[lo[0]], self.values[hi[0]]
+        w = w[0]
+        if w == 0:
+            return low.copy()
+        return low * (1 - w) + high * w
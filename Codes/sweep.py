@@ -0,0 +1,207 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from device_table import AXES, DeviceTable, as_table
+from expression import compile_expression, is_expression, temperature
+from grid_interp import interp_grid
+from table_store import load_table
+
+# Target number of result values per block of iter_sweep()
+CHUNK_POINTS = 1 << 20
+
+# Worker-side state, set once per process by _init_worker
+_TABLE = None
+_RESULT = None
+_AXES = None
+_HANDLES = []
+
+def _sweep_axes(table, spec):
+    """Input grids of the sweep; missing axes use the lookup() defaults."""
+    return {key: np.atleast_1d(np.asarray(spec.get(key, table.defaults[key]), dtype=np.float64))
+            for key in AXES}
+
+def _needed_fields(table, outputs):
+    names = set()
+    for outvar in outputs:
+        # Formulas need every field they name, ratio names both of their fields
+        parts = compile_expression(outvar).names if is_expression(outvar) else (outvar,)
+        for part in parts:
+            names.update(name for name in part.split('_') if name in table.fields)
+    return sorted(names)
+
+def share_table(table, names=None):
+    """
+    Copy the axes and the requested fields of a table into one shared memory block.
+
+    Returns:
+        shm, descriptor: The SharedMemory object (owned by the caller, who must
+        close and unlink it) and a small picklable description of its layout.
+    """
+    names = list(table.fields) if names is None else list(names)
+    arrays = [(key, table.axes[key]) for key in AXES] + \
+             [(name, np.asarray(table.fields[name], dtype=np.float64)) for name in names]
+    layout = []
+    offset = 0
+    for key, array in arrays:
+        # Keep every array 64-byte aligned
+        offset = -(-offset // 64) * 64
+        layout.append((key, offset, array.shape))
+        offset += array.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (key, start, shape), (_, array) in zip(layout, arrays):
+        np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=start)[...] = array
+    descriptor = {'name': shm.name, 'layout': layout, 'W': table.W, 'fields': names,
+                  'TEMP': temperature(table)}
+    return shm, descriptor
+
+def attach_table(descriptor):
+    """
+    Rebuild a DeviceTable whose arrays are views into an existing shared memory
+    block, or memory-map it again if the descriptor points to a native file.
+    """
+    if 'path' in descriptor:
+        return load_table(descriptor['path']), None
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    views = {key: np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=start)
+             for key, start, shape in descriptor['layout']}
+    fields = {name: views[name] for name in descriptor['fields']}
+    table = DeviceTable(*(views[key] for key in AXES), descriptor['W'], fields,
+                        {'TEMP': descriptor['TEMP']} if 'TEMP' in descriptor else None)
+    return table, shm
+
+def _evaluate(table, outvar, axes, start, stop):
+    """Evaluate one output over the block of lengths axes['L'][start:stop]."""
+    queries = [axes['L'][start:stop], axes['VGS'], axes['VDS'], axes['VSB']]
+    return interp_grid((table.L, table.VGS, table.VDS, table.VSB), table.output(outvar), queries, names=AXES)
+
+def _init_worker(table_descriptor, result_name, result_shape, axes):
+    global _TABLE, _RESULT, _AXES
+    _TABLE, table_shm = attach_table(table_descriptor)
+    result_shm = shared_memory.SharedMemory(name=result_name)
+    _RESULT = np.ndarray(result_shape, dtype=np.float64, buffer=result_shm.buf)
+    _AXES = axes
+    _HANDLES[:] = [table_shm, result_shm]
+
+def _run_task(task):
+    """Write one block of the sweep straight into the shared result array."""
+    out_index, outvar, start, stop = task
+    _RESULT[out_index, start:stop] = _evaluate(_TABLE, outvar, _AXES, start, stop)
+    return task
+
+def run_sweep(nch_data, spec, processes=None, chunk_size=None):
+    """
+    Evaluate a declarative lookup campaign across a pool of worker processes.
+
+    The table is placed in shared memory once (or, for tables opened with
+    table_store.load_table and not changed since, memory-mapped by each
+    worker from the same file)
+    and every worker writes its block straight into a shared result array, so
+    neither the table nor the results are pickled per task.
+
+    Parameters:
+        nch_data: DeviceTable or loadmat struct.
+        spec: Dictionary with 'outputs' (list of Mode 1/2 outputs such as
+            'ID', 'GM_ID', 'GM/(2*pi*CGG)') and optional 'L', 'VGS', 'VDS', 'VSB'
+            input vectors. Missing inputs use the lookup() defaults.
+        processes: Number of worker processes (default: os.cpu_count()).
+            processes=1 runs in the calling process.
+        chunk_size: Number of L values per task (default: spread evenly).
+
+    Returns:
+        result, coords: result has shape (len(outputs), len(L), len(VGS),
+        len(VDS), len(VSB)); coords maps 'outputs' and each axis name to the
+        corresponding labels.
+    """
+    table = as_table(nch_data)
+    outputs = list(spec['outputs'])
+    axes = _sweep_axes(table, spec)
+    shape = (len(outputs),) + tuple(len(axes[key]) for key in AXES)
+    coords = {'outputs': outputs, **axes}
+
+    processes = processes or os.cpu_count() or 1
+    n_L = shape[1]
+    if chunk_size is None:
+        chunk_size = max(1, -(-n_L * len(outputs) // (4 * processes)))
+    tasks = [(i, outvar, start, min(start + chunk_size, n_L))
+             for i, outvar in enumerate(outputs) for start in range(0, n_L, chunk_size)]
+
+    if processes == 1:
+        result = np.empty(shape)
+        for out_index, outvar, start, stop in tasks:
+            result[out_index, start:stop] = _evaluate(table, outvar, axes, start, stop)
+        return result, coords
+
+    # An unmodified table opened from a native file is reopened by each worker;
+    # any other table (including ones changed by set_field) is shared
+    if table.source is not None:
+        table_shm, descriptor = None, {'path': table.source}
+    else:
+        table_shm, descriptor = share_table(table, _needed_fields(table, outputs))
+    result_shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(descriptor, result_shm.name, shape, axes)) as pool:
+            for _ in pool.map(_run_task, tasks):
+                pass
+        result = np.ndarray(shape, dtype=np.float64, buffer=result_shm.buf).copy()
+    finally:
+        for shm in (table_shm, result_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+    return result, coords
+
+def iter_sweep(nch_data, spec, chunk_size=None):
+    """
+    Evaluate a sweep like run_sweep(), but yield the result block by block
+    along L, so sweeps of any size can be streamed (e.g. to export.py) in
+    bounded memory.
+
+    Parameters:
+        nch_data: DeviceTable or loadmat struct.
+        spec: Sweep specification as for run_sweep().
+        chunk_size: Number of L values per block (default: about CHUNK_POINTS
+            result values per block).
+
+    Returns:
+        coords, chunks: coords as returned by run_sweep(); chunks is a generator
+        of (index, block) pairs, where index is the tuple of slices of the block
+        in the full (L, VGS, VDS, VSB) grid and block has shape
+        (len(outputs), stop - start, len(VGS), len(VDS), len(VSB)).
+    """
+    table = as_table(nch_data)
+    outputs = list(spec['outputs'])
+    axes = _sweep_axes(table, spec)
+    coords = {'outputs': outputs, **axes}
+
+    n_L = len(axes['L'])
+    if chunk_size is None:
+        row = len(outputs) * len(axes['VGS']) * len(axes['VDS']) * len(axes['VSB'])
+        chunk_size = max(1, CHUNK_POINTS // max(row, 1))
+
+    def chunks():
+        for start in range(0, n_L, chunk_size):
+            stop = min(start + chunk_size, n_L)
+            block = np.stack([_evaluate(table, outvar, axes, start, stop) for outvar in outputs])
+            yield (slice(start, stop),) + (slice(None),) * 3, block
+
+    return coords, chunks()
+
+if __name__ == "__main__":
+    from scipy import io
+
+    data = io.loadmat('nch_18.mat')
+    nch_data = DeviceTable.from_struct(data['nch'])
+
+    spec = {
+        'outputs': ['GM_ID', 'GM_GDS', 'GM_CGG', 'ID_W'],
+        'L': np.arange(0.2, 1.0, 0.05),
+        'VDS': np.arange(0.2, 1.0, 0.1),
+        'VSB': [0, 0.2],
+    }
+    result, coords = run_sweep(nch_data, spec)
+    print("Result shape:", result.shape)
+    for name, values in zip(coords['outputs'], result):
+        print(f"{name}: {np.nanmin(values):.3e} to {np.nanmax(values):.3e}")
@@ -0,0 +1,100 @@
+import numpy as np
+import os
+from device_table import AXES, DeviceTable, as_table
+from cross_lookup import stack_fits
+
+class TableSet:
+    """
+    Several characterizations of the same device (process corners such as
+    TT/FF/SS, temperatures, ...) stacked along a leading corner axis.
+
+    All corners must share the L, VGS, VDS and VSB grids. lookup() and
+    lookup_vgs_batch() accept a TableSet in place of a single table and return
+    one result per corner along the first axis. The inputs are parsed and
+    bracketed once for all corners; each corner is then interpolated from its
+    own table, so the grids, caches and storage precision of the tables are
+    used as they are.
+
+    Parameters:
+        tables: DeviceTables or loadmat structs, one per corner.
+        names: Corner labels (default 'corner0', 'corner1', ...).
+    """
+
+    def __init__(self, tables, names=None):
+        self.tables = [as_table(table) for table in tables]
+        if not self.tables:
+            raise ValueError("A TableSet needs at least one table")
+        self.names = list(names) if names is not None else [f"corner{i}" for i in range(len(self.tables))]
+        if len(self.names) != len(self.tables):
+            raise ValueError("One name is needed per table")
+
+        first = self.tables[0]
+        for name, table in zip(self.names[1:], self.tables[1:]):
+            for key in AXES:
+                if not np.array_equal(table.axes[key], first.axes[key]):
+                    raise ValueError(f"Corner '{name}' uses a different {key} grid")
+
+        self.L, self.VGS, self.VDS, self.VSB = first.L, first.VGS, first.VDS, first.VSB
+        self.axes = first.axes
+        self.ranges = first.ranges
+        self.defaults = first.defaults
+        self.shape = (len(self.tables),) + first.shape
+
+    @classmethod
+    def from_mat(cls, files, device='nch', **kwargs):
+        """
+        Load one device from several .mat files.
+
+        Parameters:
+            files: List of file names (labelled by file name) or a dictionary
+                such as {'TT': 'nch_tt.mat', 'SS': 'nch_ss.mat'}.
+            device: Struct to load ('nch' or 'pch').
+        """
+        if isinstance(files, dict):
+            names, files = list(files), list(files.values())
+        else:
+            names = [os.path.splitext(os.path.basename(name))[0] for name in files]
+        return cls([DeviceTable.from_mat(name, device, **kwargs) for name in files], names)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __getitem__(self, name):
+        """Table of one corner, by label or position."""
+        if isinstance(name, str):
+            return self.tables[self.names.index(name)]
+        return self.tables[name]
+
+    @property
+    def fields(self):
+        """Field names present in every corner."""
+        return tuple(name for name in self.tables[0].names if all(name in table.fields for table in self.tables))
+
+    def interpolate(self, interp, axes, outvar, queries, **kwargs):
+        """
+        Apply a grid_interp function (interp_grid, interp_points or their
+        gradient variants) to an output of every corner.
+
+        Returns:
+            The per-corner results stacked along a leading axis; for the
+            gradient variants a (value, gradient) pair stacked the same way.
+        """
+        results = [interp(axes, table.output(outvar), queries, **kwargs) for table in self.tables]
+        if isinstance(results[0], tuple):
+            value = np.stack([value for value, _ in results])
+            gradient = [np.stack(partials) for partials in zip(*(gradient for _, gradient in results))]
+            return value, gradient
+        return np.stack(results)
+
+    def fit(self, ratio_var, outvar, method, L_idx, VDS_idx, VSB_idx):
+        """Mode 3 curves of every corner at the given grid indices, stacked along a leading axis."""
+        return stack_fits([table.curve_index(ratio_var, outvar, method).fit(L_idx, VDS_idx, VSB_idx)
+                           for table in self.tables])
+
+    def clear_cache(self):
+        """Drop the cached grids and curves of every corner."""
+        for table in self.tables:
+            table.clear_cache()
+
+    def __repr__(self):
+        return f"TableSet(corners={self.names}, shape={self.shape[1:]})"
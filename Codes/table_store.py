@@ -0,0 +1,106 @@
+import json
+import numpy as np
+import os
+import sys
+from scipy import io
+from device_table import AXES, DeviceTable
+
+# Native table file layout:
+#   MAGIC (8 bytes) | header length (uint64, little endian) | JSON header | padding
+#   followed by one raw little-endian float64 array per field, each starting on
+#   a page boundary so it can be memory-mapped on its own.
+MAGIC = b'GMIDTBL1'
+ALIGNMENT = 4096
+DTYPE = '<f8'
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _json_value(value):
+    """Best-effort conversion of non-grid struct entries (INFO, TEMP, ...) for the header."""
+    value = np.squeeze(np.asarray(value))
+    if value.dtype.kind in 'US':
+        return str(value)
+    if value.dtype.kind in 'fiu' and value.size <= 64:
+        return value.tolist()
+    return None
+
+def write_table(table, file_name, device=None):
+    """Write a DeviceTable (optionally tagged as 'nch' or 'pch') to the native memory-mappable format."""
+    names = list(table.fields)
+    meta = {key: _json_value(value) for key, value in table.meta.items()}
+    header = {
+        'version': 1,
+        'device': device,
+        'dtype': DTYPE,
+        'shape': list(table.shape),
+        'W': table.W,
+        'axes': {key: table.axes[key].tolist() for key in AXES},
+        'fields': {},
+        'meta': {key: value for key, value in meta.items() if value is not None},
+    }
+
+    # Offsets depend on the header size, so lay them out until the header fits
+    nbytes = int(np.prod(table.shape)) * 8
+    start = ALIGNMENT
+    while True:
+        header['fields'] = {name: start + i * _align(nbytes) for i, name in enumerate(names)}
+        encoded = json.dumps(header).encode('utf-8')
+        if len(MAGIC) + 8 + len(encoded) <= start:
+            break
+        start = _align(len(MAGIC) + 8 + len(encoded))
+
+    with open(file_name, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(encoded)).tobytes())
+        f.write(encoded)
+        for name in names:
+            f.seek(header['fields'][name])
+            f.write(np.ascontiguousarray(table.fields[name], dtype=DTYPE).tobytes())
+
+def read_header(file_name):
+    """Read the JSON header of a native table file."""
+    with open(file_name, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_name} is not a native table file")
+        length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        return json.loads(f.read(length).decode('utf-8'))
+
+def load_table(file_name, **kwargs):
+    """
+    Open a native table file as a DeviceTable whose fields are read-only
+    memory maps, so only the pages touched by a query are read from disk.
+    """
+    header = read_header(file_name)
+    shape = tuple(header['shape'])
+    fields = {name: np.memmap(file_name, dtype=header['dtype'], mode='r', offset=offset, shape=shape)
+              for name, offset in header['fields'].items()}
+    axes = [np.asarray(header['axes'][key], dtype=np.float64) for key in AXES]
+    table = DeviceTable(*axes, header['W'], fields, header.get('meta'), **kwargs)
+    table.source = os.path.abspath(file_name)
+    return table
+
+def convert_mat(mat_file, out_file=None, device='nch'):
+    """
+    Convert one device struct of a .mat file to the native format.
+
+    Returns:
+        Path of the written file (defaults to <mat name>_<device>.gmid).
+    """
+    if out_file is None:
+        out_file = f"{os.path.splitext(mat_file)[0]}_{device}.gmid"
+    data = io.loadmat(mat_file, variable_names=[device])
+    if device not in data:
+        raise KeyError(f"'{device}' data not found in {mat_file}")
+    write_table(DeviceTable.from_struct(data[device]), out_file, device)
+    return out_file
+
+if __name__ == "__main__":
+    # Usage: python table_store.py nch_18.mat [nch] [pch]
+    if len(sys.argv) < 2:
+        print("Usage: python table_store.py <file.mat> [device ...]")
+        sys.exit(1)
+    mat_file = sys.argv[1]
+    devices = sys.argv[2:] or [name for name, _, _ in io.whosmat(mat_file) if name in ('nch', 'pch')]
+    for device in devices:
+        print(f"{device}: written to {convert_mat(mat_file, device=device)}")
@@ -2,22 +2,37 @@ import numpy as np
 from scipy import io
 from lookup import lookup
 from lookup_vgs import lookup_vgs
+from device_table import DeviceTable
+from export import export_sweep
+from sweep import iter_sweep
 
 if __name__ == "__main__":
     # Load the .mat data file
     data = io.loadmat('nch_18.mat')
-    nch_data = data['nch']
-    
-    #To save the data in a CSV File, use the np.savetxt function
-    ex1 = lookup(nch_data, 'GM_CGG', 'GM_GDS', 50.9738, 'L', np.arange(0.5, 1.7, 0.1))
+    nch_data = DeviceTable.from_struct(data['nch'])
+
+    # export_sweep writes one row per operating point, with the inputs as labeled
+    # columns; fixed inputs are single-value axes, so they appear as constant columns
+    L = np.arange(0.5, 1.7, 0.1)
+    ex1 = lookup(nch_data, 'GM_CGG', 'GM_GDS', 50.9738, 'L', L)
     print("Example 1:\n", ex1)
-    np.savetxt("ex1.csv", ex1,  delimiter= ",")
-    
+    export_sweep("ex1.csv", {'outputs': ['GM_CGG'], 'GM_GDS': [50.9738], 'L': L}, ex1.reshape(1, 1, -1))
+
     ex2 = lookup_vgs(nch_data, ID_W=1e-4, VDB=0.6, VGB=1, L=0.3)
     print("Example 2:", ex2)
-    np.savetxt("ex2.csv", ex2,  delimiter= ",")
-    
-    ex3 = lookup(nch_data, 'GM_GDS', 'L', np.arange(0.8, 1.4, 0.2))
-    ex3 = np.transpose(ex3)
-    print("Example 3:\n", ex3)
-    np.savetxt("ex3.csv", ex3,  delimiter= ",")
+    # lookup_vgs returns an empty array when the lookup fails (the error is logged)
+    if np.size(ex2) == 0:
+        print("Example 2: lookup_vgs(ID_W=1e-4, VDB=0.6, VGB=1, L=0.3) failed, ex2.csv not written")
+    else:
+        export_sweep("ex2.csv", {'outputs': ['VGS'], 'ID_W': [1e-4], 'VDB': [0.6], 'VGB': [1], 'L': [0.3]},
+                     np.reshape(ex2, (1, 1, 1, 1, 1)))
+
+    # Sweeps are evaluated and written block by block, so their size is not limited by memory
+    coords, chunks = iter_sweep(nch_data, {'outputs': ['GM_GDS'], 'L': np.arange(0.8, 1.4, 0.2)})
+    print("Example 3:", export_sweep("ex3.csv", coords, chunks), "points")
+
+    # Every simulated L, VGS and VDS; .parquet (pyarrow) and .h5 (h5py, with the
+    # axis vectors as coordinates) are written the same way
+    coords, chunks = iter_sweep(nch_data, {'outputs': ['GM_ID', 'ID_W', 'GM_GDS', 'GM/(2*pi*CGG)'],
+                                           'L': nch_data.L, 'VDS': nch_data.VDS})
+    print("Example 4:", export_sweep("sweep.csv", coords, chunks), "points")
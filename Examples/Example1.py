@@ -1,22 +1,22 @@
 import numpy as np
 from scipy import io
-from lookup import lookup
+from lookup import lookup, lookup_many
 from lookup_vgs import lookup_vgs
+from device_table import DeviceTable
 import matplotlib.pyplot as plt
 
 if __name__ == "__main__":
     # Load the .mat data file
     data = io.loadmat('nch_18.mat')
-    nch_data = data['nch']
+    nch_data = DeviceTable.from_struct(data['nch'])
     
     # Get data values
-    VGS_values = nch_data['VGS'][0, 0].flatten()
+    VGS_values = nch_data.VGS
     VDS = np.arange(0.6, 1.5,0.3)
-    gm_ID = lookup(nch_data, 'GM_ID', 'VDS', VDS, 'L', 0.6)
-    gm_ID = np.transpose(gm_ID)    
-    
-    JD = lookup(nch_data, 'ID_W', 'VDS', VDS, 'L', 0.6)
-    JD = np.transpose(JD)
+    # Both outputs at the same bias points in one call
+    result = lookup_many(nch_data, ['GM_ID', 'ID_W'], 'VDS', VDS, 'L', 0.6)
+    gm_ID = np.transpose(result['GM_ID'])
+    JD = np.transpose(result['ID_W'])
 
     # Create a figure with two subplots side by side
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
@@ -1,17 +1,21 @@
 import numpy as np
 from scipy import io
-from lookup import lookup
+from lookup import lookup, lookup_many
 from lookup_vgs import lookup_vgs
+from device_table import DeviceTable
 import matplotlib.pyplot as plt
 
 if __name__ == "__main__":
     # Load the .mat data file
     data = io.loadmat('pch_18.mat')
-    pch_data = data['pch']
+    pch_data = DeviceTable.from_struct(data['pch'])
     
     # Get data values and transpose
-    gm_ID = lookup(pch_data, 'GM_ID', 'L', [0.6, 0.7, 0.8, 0.9])
-    noise_coefficient = lookup(pch_data, 'STH_GM', 'L',[0.6, 0.7, 0.8, 0.9] ) / (4 * 1.3806488e-23 * 300)
+    # Thermal noise coefficient gamma = STH / (4kT gm) at T = 300 K. The TEMP
+    # entry of the .mat file is not used since its unit is not recorded.
+    result = lookup_many(pch_data, ['GM_ID', 'STH_GM'], 'L', [0.6, 0.7, 0.8, 0.9])
+    gm_ID = result['GM_ID']
+    noise_coefficient = result['STH_GM'] / (4 * 1.3806488e-23 * 300)
 
     # Create a figure
     plt.figure(figsize=(12, 5))    
@@ -0,0 +1,16 @@
+"""
+Performance benchmarks for the lookup functions.
+
+The modules in Codes/ import each other by bare name, so the Codes directory
+is put on the import path here.
+
+    python -m benchmarks.run --grid medium --output results.json
+    python -m benchmarks.run --compare results.json
+    python -m benchmarks.synthetic nch_18.mat
+"""
+import os
+import sys
+
+CODES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Codes')
+if CODES not in sys.path:
+    sys.path.insert(0, CODES)
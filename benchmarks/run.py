@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import timeit
+import numpy as np
+import benchmarks  # noqa: F401  (puts Codes/ on the import path)
+from benchmarks.synthetic import GRIDS, make_table
+from device_table import DeviceTable
+from lookup import lookup, lookup_many, prepare_lookup
+from lookup_vgs import lookup_vgs, lookup_vgs_batch
+
+# Relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 1.10
+
+def _slider(table, x_var='GM_ID', y1_var='GM_CGG', y2_var='GM_GDS', ticks=100):
+    """
+    One slider tick of the GUI: the intersection plot looks up both outputs at
+    the current x value across the varying parameter (L), as in
+    MainWindow.update_intersection_plot.
+    """
+    lengths = np.arange(table.L[0], table.L[-1], (table.L[-1] - table.L[0]) / 20)
+    x_values = itertools.cycle(np.linspace(8, 20, ticks))
+
+    def tick():
+        x_value = next(x_values)
+        lookup(table, y1_var, x_var, x_value, L=lengths)
+        lookup(table, y2_var, x_var, x_value, L=lengths)
+    return tick
+
+def _cold(table, fn):
+    """Run fn on a table without cached ratios or fitted curves."""
+    def call():
+        table.clear_cache()
+        fn()
+    return call
+
+def cases(table):
+    """Benchmark name and zero-argument callable for every measured path."""
+    rng = np.random.default_rng(0)
+    L = np.linspace(table.L[0], table.L[-1], 8)
+    VGS = np.linspace(table.VGS[0], table.VGS[-1], 60)
+    VDS = np.linspace(table.VDS[0], table.VDS[-1], 40)
+    L_mid = float(table.L[len(table.L) // 2])
+    points = [rng.uniform(grid[0], grid[-1], 1000) for grid in (table.L, table.VGS, table.VDS)]
+    gm_id = np.arange(5, 20, 0.1)
+    plan = prepare_lookup(table, 'GM_CGG', xvar='GM_ID', fixed={'L': L_mid, 'VDS': 0.6})
+
+    mode3 = lambda: lookup(table, 'GM_CGG', 'GM_ID', gm_id, 'L', L)
+    return [
+        ('lookup.mode1.grid', lambda: lookup(table, 'ID', 'VGS', VGS, 'L', L)),
+        ('lookup.mode1.pointwise', lambda: lookup(table, 'ID', 'L', points[0], 'VGS', points[1],
+                                                  'VDS', points[2], 'POINTWISE', 'on')),
+        ('lookup.mode2.default', lambda: lookup(table, 'GM_ID', 'L', L)),
+        ('lookup.mode2.grid', lambda: lookup(table, 'GM_GDS', 'VGS', VGS, 'VDS', VDS, 'L', L_mid)),
+        ('lookup.mode3.cold', _cold(table, mode3)),
+        ('lookup.mode3.warm', mode3),
+        ('lookup.expression.cold', _cold(table, lambda: lookup(table, 'GM*GM_ID/(2*pi*CGG)',
+                                                               'VGS', VGS, 'L', L))),
+        ('lookup.mode1.grad', lambda: lookup(table, 'GM_ID', 'VGS', VGS, 'L', L, 'GRAD', 'on')),
+        ('lookup.mode3.grad', lambda: lookup(table, 'GM_CGG', 'GM_ID', gm_id, 'L', L, 'GRAD', 'on')),
+        ('lookup_many.mode1', lambda: lookup_many(table, ['GM_ID', 'ID_W', 'GM_GDS', 'GM_CGG'],
+                                                  'VGS', VGS, 'L', L)),
+        ('lookup_many.mode3', lambda: lookup_many(table, ['GM_CGG', 'GM_GDS', 'GDS_W', 'CGG_W'],
+                                                  'GM_ID', gm_id, 'L', L)),
+        ('lookup_vgs.mode1', lambda: lookup_vgs(table, GM_ID=12, L=L_mid, VDS=0.6, VSB=0.1)),
+        ('lookup_vgs.mode2', lambda: lookup_vgs(table, GM_ID=12, L=L_mid, VDB=0.6, VGB=1.0)),
+        ('lookup_vgs_batch.mode1', lambda: lookup_vgs_batch(table, GM_ID=gm_id[:, None], L=L, VDS=0.6)),
+        ('prepare_lookup.call', lambda: plan(15.0)),
+        ('gui.slider_tick', _slider(table)),
+    ]
+
+def measure(fn, repeats=5, min_time=0.2):
+    """
+    Time fn and return per-call statistics in microseconds.
+
+    The number of calls per repeat is chosen so that a repeat lasts at least
+    min_time / repeats seconds; the minimum over repeats is the most stable
+    figure, the median shows the typical cost.
+    """
+    fn()
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time / repeats:
+            break
+        number *= 2
+    per_call = np.array(timer.repeat(repeat=repeats, number=number)) / number * 1e6
+    return {'min_us': float(per_call.min()), 'median_us': float(np.median(per_call)),
+            'calls': number, 'repeats': repeats}
+
+def run(table, pattern=None, repeats=5, min_time=0.2, stream=sys.stdout):
+    """Run every benchmark whose name contains pattern and return the results dictionary."""
+    results = {}
+    for name, fn in cases(table):
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(fn, repeats, min_time)
+        if stream is not None:
+            print(f"{name:<26}{results[name]['min_us']:>12.1f} us", file=stream)
+    return {
+        'grid': list(table.shape),
+        'fields': list(table.names),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two result dictionaries.
+
+    Returns:
+        Report lines and the names of the benchmarks that got slower than
+        the threshold ratio.
+    """
+    lines = [f"{'Benchmark':<26}{'old us':>12}{'new us':>12}{'ratio':>8}"]
+    regressions = []
+    for name, entry in new['results'].items():
+        if name not in old['results']:
+            continue
+        before, after = old['results'][name]['min_us'], entry['min_us']
+        ratio = after / before if before else float('inf')
+        flag = ""
+        if ratio > threshold:
+            flag = "  slower"
+            regressions.append(name)
+        lines.append(f"{name:<26}{before:>12.1f}{after:>12.1f}{ratio:>8.2f}{flag}")
+    if old['grid'] != new['grid']:
+        lines.append(f"Note: grids differ ({old['grid']} vs {new['grid']})")
+    return lines, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time lookup(), lookup_vgs() and the GUI slider path.")
+    parser.add_argument('--grid', default='medium', choices=sorted(GRIDS), help="Synthetic table size")
+    parser.add_argument('--mat', help="Benchmark a .mat file instead of a synthetic table")
+    parser.add_argument('--device', default='nch', help="Device struct of --mat, or synthetic device type")
+    parser.add_argument('--filter', help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds spent per benchmark")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Compare against an earlier JSON result file")
+    args = parser.parse_args(argv)
+
+    if args.mat:
+        table = DeviceTable.from_mat(args.mat, args.device)
+    else:
+        table = make_table(args.grid, args.device)
+    print(f"Table: {table}")
+
+    results = run(table, args.filter, args.repeats, args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            lines, regressions = compare(json.load(f), results)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import sys
+import numpy as np
+from scipy import io
+import benchmarks  # noqa: F401  (puts Codes/ on the import path)
+from device_table import DeviceTable
+
+# Synthetic transistor tables from a simple EKV model.
+#
+# The drain current uses the EKV interpolation function between weak and
+# strong inversion, F(v) = ln(1 + exp(v / 2UT))^2, with forward and reverse
+# components, channel length modulation and a body-effect threshold. Small
+# signal parameters are the analytic derivatives of the same expression, the
+# capacitances follow the inversion level and the noise densities are
+# 4kT*gamma*gm (thermal) and KF*gm^2/(Cox*W*L) at 1 Hz (flicker). The values
+# are not meant to match a real process, only to be smooth, monotonic and of
+# realistic magnitude so that every lookup mode behaves as on simulated data.
+
+GRIDS = {
+    'small': (7, 25, 25, 3),
+    'medium': (13, 49, 49, 7),
+    'large': (40, 121, 121, 13),
+}
+
+K_BOLTZMANN = 1.380649e-23
+TEMPERATURE = 300.0
+
+# Process parameters per device type (lengths in um, capacitances per um and um^2)
+DEVICES = {
+    'nch': {'mu_cox': 300e-6, 'VT0': 0.45, 'gamma': 0.45, 'phi2': 0.8, 'n': 1.3,
+            'lambda': 0.04, 'cox': 8.5e-15, 'cov': 0.3e-15, 'KF': 1e-27},
+    'pch': {'mu_cox': 70e-6, 'VT0': 0.42, 'gamma': 0.40, 'phi2': 0.8, 'n': 1.35,
+            'lambda': 0.06, 'cox': 8.5e-15, 'cov': 0.3e-15, 'KF': 3e-28},
+}
+
+def _ekv(v, UT):
+    """EKV interpolation function F(v) and its derivative dF/dv."""
+    x = v / (2 * UT)
+    log_term = np.logaddexp(0, x)
+    sigmoid = 0.5 * (1 + np.tanh(x / 2))
+    return log_term ** 2, log_term * sigmoid / UT
+
+def make_table(grid='medium', device='nch', W=5.0):
+    """
+    Build a synthetic DeviceTable.
+
+    Parameters:
+        grid: Name in GRIDS or a tuple (nL, nVGS, nVDS, nVSB).
+        device: 'nch' or 'pch' process parameters.
+        W: Device width in um.
+    """
+    n_L, n_VGS, n_VDS, n_VSB = GRIDS[grid] if isinstance(grid, str) else grid
+    p = DEVICES[device]
+    L = np.geomspace(0.18, 2.0, n_L)
+    VGS = np.linspace(0, 1.2, n_VGS)
+    VDS = np.linspace(0, 1.2, n_VDS)
+    VSB = np.linspace(0, 0.6, n_VSB) if n_VSB > 1 else np.array([0.0])
+    Lg, Vg, Vd, Vs = np.meshgrid(L, VGS, VDS, VSB, indexing='ij')
+
+    UT = K_BOLTZMANN * TEMPERATURE / 1.602176634e-19
+    n = p['n']
+    # Threshold with body effect and a mild short-channel roll-off
+    root = np.sqrt(p['phi2'] + Vs)
+    VT = p['VT0'] + p['gamma'] * (root - np.sqrt(p['phi2'])) - 0.02 / Lg
+
+    IS = 2 * n * p['mu_cox'] * UT ** 2 * W / Lg
+    forward, d_forward = _ekv((Vg - VT) / n, UT)
+    reverse, d_reverse = _ekv((Vg - VT) / n - Vd, UT)
+    clm = 1 + p['lambda'] / Lg * Vd
+    ID0 = IS * (forward - reverse)
+    ID = ID0 * clm + 1e-13
+
+    GM = IS * (d_forward - d_reverse) / n * clm
+    GDS = IS * d_reverse * clm + ID0 * p['lambda'] / Lg + 1e-12
+    GMB = GM * p['gamma'] / (2 * root)
+
+    # Capacitances follow the forward and reverse inversion levels
+    WLCox = W * Lg * p['cox']
+    q_forward = forward / (1 + forward)
+    q_reverse = reverse / (1 + reverse)
+    CGS = W * p['cov'] + 2 / 3 * WLCox * q_forward
+    CGD = W * p['cov'] + 0.5 * WLCox * q_reverse
+    CGB = WLCox * (n - 1) / n * (1 - q_forward)
+    CGG = CGS + CGD + CGB
+
+    STH = 4 * K_BOLTZMANN * TEMPERATURE * (2 / 3) * GM
+    SFL = p['KF'] * GM ** 2 / WLCox
+
+    fields = {'ID': ID, 'GM': GM, 'GDS': GDS, 'GMB': GMB, 'CGG': CGG, 'CGS': CGS,
+              'CGD': CGD, 'STH': STH, 'SFL': SFL, 'VT': VT}
+    meta = {'INFO': f"synthetic EKV {device}", 'TEMP': TEMPERATURE}
+    return DeviceTable(L, VGS, VDS, VSB, W, fields, meta)
+
+def to_struct(table):
+    """Dictionary in the layout of the .mat structs (axes as column vectors)."""
+    struct = {key: table.axes[key][:, None] for key in table.axes}
+    struct['W'] = np.array([[table.W]])
+    struct.update({name: np.asarray(table.fields[name]) for name in table.fields})
+    struct.update(table.meta)
+    return struct
+
+def save_mat(file_name, grid='medium'):
+    """Write synthetic 'nch' and 'pch' structs to a .mat file usable by every script in Codes/."""
+    io.savemat(file_name, {device: to_struct(make_table(grid, device)) for device in DEVICES})
+
+if __name__ == "__main__":
+    # Usage: python -m benchmarks.synthetic nch_18.mat [small|medium|large]
+    if len(sys.argv) < 2:
+        print("Usage: python -m benchmarks.synthetic <file.mat> [grid]")
+        sys.exit(1)
+    save_mat(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'medium')
+    print(f"Synthetic tables written to {sys.argv[1]}")
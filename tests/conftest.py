@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# The modules in Codes/ import each other by bare name; importing benchmarks
+# puts Codes/ on the import path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import benchmarks  # noqa: E402,F401
+from benchmarks.synthetic import make_table  # noqa: E402
+
+@pytest.fixture(scope='session')
+def nch():
+    """Small synthetic nch table (7 L x 25 VGS x 25 VDS x 3 VSB)."""
+    return make_table('small', 'nch')
@@ -0,0 +1,46 @@
+import numpy as np
+
+# Inputs of the equivalence tests. Each case is (function, args, kwargs) for
+# lookup() or lookup_vgs() on the small synthetic nch table. The outputs of
+# the original (baseline) implementation for these cases are stored in
+# baseline.npz by make_baseline.py.
+#
+# The original Mode 3 snapped L, VDS and VSB to the nearest simulated value,
+# so Mode 3 cases only use simulated values; Modes 1 and 2 and lookup_vgs
+# mode 1 interpolate and are also checked between them.
+
+def cases(L):
+    """Cases keyed by name; L is the length axis of the table."""
+    return {
+        # Mode 1: stored fields
+        'mode1_default': ('lookup', ('ID',), {}),
+        'mode1_L_sweep': ('lookup', ('ID', 'L', np.arange(0.2, 1.8, 0.2), 'VGS', 0.5), {}),
+        'mode1_vgs_vds': ('lookup', ('ID',), {'VGS': np.arange(0, 1.2, 0.1), 'VDS': np.arange(0.1, 1.2, 0.2)}),
+        'mode1_vsb': ('lookup', ('CGG',), {'VGS': 0.7, 'L': 0.5, 'VDS': 0.6, 'VSB': [0, 0.15, 0.45]}),
+
+        # Mode 2: ratios
+        'mode2_gm_id_L': ('lookup', ('GM_ID', 'L', np.arange(0.2, 1.8, 0.2)), {}),
+        'mode2_id_w': ('lookup', ('ID_W',), {'VGS': np.arange(0.2, 1.1, 0.05), 'L': 0.33, 'VDS': 0.7}),
+        'mode2_gm_gds': ('lookup', ('GM_GDS',), {'VGS': 0.6, 'VDS': np.arange(0.1, 1.2, 0.1), 'L': 1.1}),
+        'mode2_sth_gm': ('lookup', ('STH_GM',), {'VGS': np.arange(0.3, 1.0, 0.1), 'L': [0.25, 0.7]}),
+
+        # Mode 3: cross lookups at simulated L, VDS and VSB
+        'mode3_default': ('lookup', ('GM_CGG', 'GM_ID', np.linspace(3, 30, 55)), {}),
+        'mode3_L_sweep': ('lookup', ('ID_W', 'GM_ID', 15, 'L', L[[1, 3, 5]]), {}),
+        'mode3_gm_gds': ('lookup', ('GM_GDS', 'GM_ID', np.linspace(3, 30, 28), 'L', L[2], 'VDS', 0.3), {}),
+        'mode3_vds_sweep': ('lookup', ('GM_CGG', 'GM_ID', 12, 'VDS', np.arange(0.2, 1.0, 0.1)), {}),
+        'mode3_cgs_w': ('lookup', ('CGS_W', 'GM_ID', 20, 'L', L[3]), {}),
+        'mode3_id_w': ('lookup', ('GM_CGG', 'ID_W', np.logspace(-7, -4, 20), 'L', L[4]), {}),
+        'mode3_vsb': ('lookup', ('GM_CGG', 'GM_ID', 15, 'L', L[2], 'VSB', 0.3), {}),
+        'mode3_gm_id_peak': ('lookup', ('GM_CGG', 'GM_ID', np.linspace(26, 31, 11), 'L', L[3]), {}),
+        'mode3_gm_gds_peak': ('lookup', ('GM_GDS', 'GM_ID', np.linspace(26, 31, 11), 'L', L[6], 'VDS', 0.3), {}),
+        'mode3_gm_cgg_peak': ('lookup', ('ID_W', 'GM_CGG', np.logspace(9.5, 11, 16), 'L', L[3]), {}),
+        'mode3_linear': ('lookup', ('GM_CGG', 'GM_ID', np.linspace(5, 25, 21), 'L', L[1], 'METHOD', 'linear'), {}),
+
+        # lookup_vgs mode 1
+        'vgs_gm_id': ('lookup_vgs', (), {'GM_ID': 10, 'VDS': 0.6, 'VSB': 0.1, 'L': 0.25}),
+        'vgs_gm_id_array': ('lookup_vgs', (), {'GM_ID': np.array([8, 12, 16, 20, 24]), 'L': 0.5, 'VDS': 0.4}),
+        'vgs_id_w': ('lookup_vgs', (), {'ID_W': 1e-5, 'L': 1.0, 'VDS': 0.6}),
+        'vgs_id_w_extrapolated': ('lookup_vgs', (), {'ID_W': 1e-1, 'L': 0.3}),
+        'vgs_linear': ('lookup_vgs', (), {'GM_ID': 14, 'L': 0.8, 'VDS': 0.9, 'VSB': 0.2, 'METHOD': 'linear'}),
+    }
@@ -0,0 +1,54 @@
+"""
+Regenerate baseline.npz from the original lookup() and lookup_vgs().
+
+Usage (from the repository root):
+    git worktree add ../baseline $(git rev-list --max-parents=0 HEAD)
+    python tests/make_baseline.py ../baseline/Codes
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import numpy as np
+from scipy import io as sio
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [TESTS, os.path.dirname(TESTS)]
+
+import benchmarks  # noqa: E402,F401  (puts Codes/ on the import path)
+from benchmarks.synthetic import make_table, to_struct  # noqa: E402
+from equivalence_cases import cases  # noqa: E402
+
+BASELINE = os.path.join(TESTS, 'baseline.npz')
+
+def _load(name, directory):
+    """Import directory/name.py under its bare module name, as the original modules import each other."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def main(directory):
+    table = make_table('small', 'nch')
+    buffer = io.BytesIO()
+    sio.savemat(buffer, {'nch': to_struct(table)})
+    buffer.seek(0)
+    struct = sio.loadmat(buffer)['nch']
+
+    functions = {'lookup': _load('lookup', directory).lookup,
+                 'lookup_vgs': _load('lookup_vgs', directory).lookup_vgs}
+    results = {}
+    # The original functions print their mode and progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, (function, args, kwargs) in cases(table.L).items():
+            results[name] = np.asarray(functions[function](struct, *args, **kwargs), dtype=np.float64)
+    np.savez(BASELINE, **results)
+    print(f"{len(results)} cases written to {BASELINE}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    main(sys.argv[1])
@@ -0,0 +1,88 @@
+import gc
+import numpy as np
+from scipy import io
+from benchmarks.synthetic import to_struct
+import device_table
+from device_table import DeviceTable, as_table
+from lookup import lookup
+
+def _struct(table, tmp_path):
+    io.savemat(tmp_path / 'nch.mat', {'nch': to_struct(table)})
+    return io.loadmat(tmp_path / 'nch.mat')['nch']
+
+def test_struct_is_compiled_once(nch, tmp_path):
+    struct = _struct(nch, tmp_path)
+    table = as_table(struct)
+    assert as_table(struct) is table
+    np.testing.assert_array_equal(lookup(struct, 'GM_ID', VGS=0.6, L=0.5), lookup(nch, 'GM_ID', VGS=0.6, L=0.5))
+    assert as_table(struct) is table
+
+    # The compiled table is released together with its struct
+    key = id(struct)
+    del struct
+    gc.collect()
+    assert key not in device_table._COMPILED
+
+def test_compact_table_caches_float32_ratios(nch):
+    compact = nch.compact()
+    ratio = compact.ratio('GM', 'ID')
+    assert ratio.data.dtype == np.float32
+    assert compact.cache_nbytes == ratio.nbytes == nch.ratio('GM', 'ID').nbytes // 2
+    assert compact.nbytes == compact.field_nbytes + compact.cache_nbytes
+    np.testing.assert_allclose(lookup(compact, 'GM_CGG', 'GM_ID', 12, L=0.5),
+                               lookup(nch, 'GM_CGG', 'GM_ID', 12, L=0.5), rtol=1e-5)
+
+def test_curve_indexes_share_the_ratio_cache_budget(nch):
+    grid = nch.ratio('GM', 'ID').nbytes
+    table = DeviceTable(nch.L, nch.VGS, nch.VDS, nch.VSB, nch.W, nch.fields, cache_bytes=3 * grid)
+    expected = lookup(nch, 'GM_CGG', 'GM_ID', 12, L=0.5)
+    np.testing.assert_array_equal(lookup(table, 'GM_CGG', 'GM_ID', 12, L=0.5), expected)
+
+    # Only the bracketing curves are fitted and stored, and they are counted in the cache
+    index = table.curve_index('GM_ID', 'GM_CGG')
+    assert 0 < len(index.curves) <= 8
+    assert table.cache_nbytes == 2 * grid + index.nbytes
+
+    # Other outputs evict the least recently used grids and curve indexes
+    for outvar in ('GM_GDS', 'ID_W', 'CGG_W', 'GDS_W'):
+        lookup(table, outvar, 'GM_ID', 12, L=0.5)
+        assert table.cache_nbytes <= table.cache_bytes
+    assert table.curve_index('GM_ID', 'GM_CGG') is not index
+    np.testing.assert_array_equal(lookup(table, 'GM_CGG', 'GM_ID', 12, L=0.5), expected)
+
+def test_ratio_grids_are_cached_within_budget(nch):
+    grid = nch.ratio('GM', 'ID').nbytes
+    table = DeviceTable(nch.L, nch.VGS, nch.VDS, nch.VSB, nch.W, nch.fields, cache_bytes=2 * grid)
+    gm_id = table.ratio('GM', 'ID')
+    np.testing.assert_array_equal(gm_id, np.asarray(nch.fields['GM']) / np.asarray(nch.fields['ID']))
+    assert not gm_id.flags.writeable
+    assert table.output('GM_ID') is gm_id
+
+    # The least recently used grid is evicted once the budget is exceeded
+    gm_cgg = table.ratio('GM', 'CGG')
+    table.ratio('GM', 'ID')
+    table.ratio('GM', 'GDS')
+    assert table.cache_nbytes == 2 * grid
+    assert table.ratio('GM', 'ID') is gm_id
+    assert table.ratio('GM', 'CGG') is not gm_cgg
+
+    # Replacing a field drops the grids derived from it
+    table.set_field('GM', 2 * np.asarray(nch.fields['GM']))
+    np.testing.assert_array_equal(table.ratio('GM', 'ID'), 2 * gm_id)
+
+def test_compact_error_is_bounded_by_the_report(nch):
+    compact = nch.compact()
+    assert compact.field_nbytes == nch.field_nbytes // 2
+    report = compact.accuracy_report()
+    for name, entry in compact.accuracy.items():
+        assert entry['encoding'] == ('log-float32' if name in device_table.LOG_FIELDS else 'float32')
+        assert f"{entry['max_rel_error']:.3e}" in report
+        original = np.asarray(nch.fields[name])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error = np.abs(np.asarray(compact.fields[name]) - original) / np.abs(original)
+        assert np.nanmax(error[np.isfinite(error)]) <= entry['max_rel_error'] < 1e-5
+
+    # Interpolated fields stay within the field error
+    bound = compact.accuracy['ID']['max_rel_error']
+    np.testing.assert_allclose(lookup(compact, 'ID', 'L', 0.5, 'VDS', 0.33),
+                               lookup(nch, 'ID', 'L', 0.5, 'VDS', 0.33), rtol=1.001 * bound, atol=0)
@@ -0,0 +1,31 @@
+import io
+import os
+import numpy as np
+import pytest
+from scipy import io as sio
+from benchmarks.synthetic import to_struct
+from equivalence_cases import cases
+from lookup import lookup
+from lookup_vgs import lookup_vgs
+
+# Current lookup()/lookup_vgs() results against the outputs of the original
+# implementation stored in baseline.npz (regenerate with make_baseline.py)
+BASELINE = np.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.npz'))
+FUNCTIONS = {'lookup': lookup, 'lookup_vgs': lookup_vgs}
+
+@pytest.fixture(scope='module')
+def struct(nch):
+    """The table as a loadmat struct, the input of the original functions."""
+    buffer = io.BytesIO()
+    sio.savemat(buffer, {'nch': to_struct(nch)})
+    buffer.seek(0)
+    return sio.loadmat(buffer)['nch']
+
+@pytest.mark.parametrize('data', ['struct', 'table'])
+@pytest.mark.parametrize('name', BASELINE.files)
+def test_matches_baseline(name, data, nch, struct):
+    function, args, kwargs = cases(nch.L)[name]
+    result = FUNCTIONS[function](struct if data == 'struct' else nch, *args, **kwargs)
+    expected = BASELINE[name]
+    assert np.shape(result) == expected.shape
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=0, equal_nan=True)
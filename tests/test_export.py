@@ -0,0 +1,59 @@
+import csv
+import json
+import numpy as np
+import pytest
+from export import export_sweep
+from sweep import iter_sweep, run_sweep
+
+SPEC = {'outputs': ['GM_ID', 'GM/(2*pi*CGG)'], 'L': [0.2689, 0.6, 2.0], 'VGS': [0.4, 0.6, 0.8], 'VDS': [0.3, 0.6]}
+
+@pytest.fixture(scope='module')
+def sweep(nch):
+    return run_sweep(nch, SPEC, processes=1)
+
+def _long(result, coords):
+    """Expected long-format columns: axis values of every grid point, then the outputs."""
+    axes = [np.asarray(values, dtype=np.float64) for key, values in coords.items() if key != 'outputs']
+    grids = np.meshgrid(*axes, indexing='ij')
+    return np.column_stack([grid.ravel() for grid in grids] + [values.ravel() for values in result])
+
+def test_csv_round_trip(nch, sweep, tmp_path):
+    result, coords = sweep
+    _, chunks = iter_sweep(nch, SPEC, chunk_size=1)
+    path = tmp_path / 'sweep.csv'
+    assert export_sweep(str(path), coords, chunks, float_format='%.17g') == result[0].size
+
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['L', 'VGS', 'VDS', 'VSB', 'GM_ID', 'GM/(2*pi*CGG)']
+    np.testing.assert_array_equal(np.array(rows[1:], dtype=np.float64), _long(result, coords))
+
+def test_hdf5_round_trip(sweep, tmp_path):
+    h5py = pytest.importorskip('h5py')
+    result, coords = sweep
+    path = tmp_path / 'sweep.h5'
+    export_sweep(str(path), coords, result)
+
+    with h5py.File(path, 'r') as f:
+        assert json.loads(f.attrs['outputs']) == coords['outputs']
+        for key in ('L', 'VGS', 'VDS', 'VSB'):
+            np.testing.assert_array_equal(f[key][()], coords[key])
+        np.testing.assert_array_equal(f['GM_ID'][()], result[0])
+        formula = [f[name] for name in f if f[name].attrs.get('output') == 'GM/(2*pi*CGG)']
+        np.testing.assert_array_equal(formula[0][()], result[1])
+
+def test_parquet_round_trip(sweep, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    result, coords = sweep
+    path = tmp_path / 'sweep.parquet'
+    export_sweep(str(path), coords, result)
+
+    table = pq.read_table(path)
+    assert table.column_names == ['L', 'VGS', 'VDS', 'VSB', 'GM_ID', 'GM/(2*pi*CGG)']
+    np.testing.assert_array_equal(np.column_stack([column.to_numpy() for column in table.columns]),
+                                  _long(result, coords))
+
+def test_unknown_format_raises(sweep, tmp_path):
+    result, coords = sweep
+    with pytest.raises(ValueError, match='Unsupported export format'):
+        export_sweep(str(tmp_path / 'sweep.xlsx'), coords, result)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from expression import CONSTANTS, compile_expression, temperature
+from lookup import lookup
+
+def _fields(nch):
+    return {name: np.asarray(nch.fields[name]) for name in ('GM', 'ID', 'CGG', 'GDS', 'STH')}
+
+@pytest.mark.parametrize('text, formula', [
+    ('GM/(2*pi*CGG)', lambda f, T: f['GM'] / (2 * np.pi * f['CGG'])),
+    ('GM*GM_ID/(2*pi*CGG)', lambda f, T: f['GM'] * (f['GM'] / f['ID']) / (2 * np.pi * f['CGG'])),
+    ('STH/(4*k*T*GM)', lambda f, T: f['STH'] / (4 * CONSTANTS['k'] * T * f['GM'])),
+    ('(GM/GDS)**2 - sqrt(abs(-ID))', lambda f, T: (f['GM'] / f['GDS']) ** 2 - np.sqrt(np.abs(-f['ID']))),
+])
+def test_expression_matches_numpy(nch, text, formula):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = formula(_fields(nch), temperature(nch))
+    np.testing.assert_allclose(compile_expression(text).evaluate(nch), expected, rtol=1e-13)
+    np.testing.assert_allclose(nch.output(text), expected, rtol=1e-13)
+
+def test_expression_lookup_matches_field_lookups(nch):
+    # The formula grid is interpolated like a ratio grid
+    expected = lookup(nch, 'GM_CGG', 'L', 0.5, 'VGS', 0.6) / (2 * np.pi)
+    np.testing.assert_allclose(lookup(nch, 'GM/(2*pi*CGG)', 'L', 0.5, 'VGS', 0.6), expected, rtol=1e-12)
+
+def test_repeated_subexpressions_are_evaluated_once():
+    expression = compile_expression('GM*CGG + CGG*GM')
+    assert len(expression.steps) == 2
+    assert compile_expression('GM /(2 * pi*CGG)').key == compile_expression('GM / (CGG*(pi*2))').key
+
+@pytest.mark.parametrize('text', ['GM(', '__import__("os")', 'GM[0]', 'lambda: 1', 'sqrt(GM, ID)'])
+def test_invalid_expressions_raise(text):
+    with pytest.raises(ValueError):
+        compile_expression(text)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from scipy.interpolate import interpn
+from device_table import AXES
+from grid_interp import interp_grid, interp_points
+
+QUERIES = [np.array([0.2, 0.4017, 1.1]), np.arange(0.0, 1.2, 0.07), np.array([0.6]), np.array([0.0, 0.45])]
+
+def test_grid_matches_interpn(nch):
+    axes = (nch.L, nch.VGS, nch.VDS, nch.VSB)
+    data = np.asarray(nch.fields['ID'])
+    points = np.stack(np.meshgrid(*QUERIES, indexing='ij'), axis=-1)
+    np.testing.assert_allclose(interp_grid(axes, data, QUERIES), interpn(axes, data, points), rtol=1e-12)
+
+    # Leading axes (e.g. several fields) are kept in front
+    stacked = np.stack([data, 2 * data])
+    np.testing.assert_allclose(interp_grid(axes, stacked, QUERIES)[1], 2 * interpn(axes, data, points), rtol=1e-12)
+
+def test_grid_rejects_out_of_bounds(nch):
+    axes = (nch.L, nch.VGS, nch.VDS, nch.VSB)
+    queries = [np.array([0.1])] + QUERIES[1:]
+    with pytest.raises(ValueError, match='L values is out of bounds'):
+        interp_grid(axes, nch.fields['ID'], queries, names=AXES)
+
+def test_points_match_interpn(nch):
+    axes = (nch.L, nch.VGS, nch.VDS, nch.VSB)
+    rng = np.random.default_rng(0)
+    points = [rng.uniform(grid[0], grid[-1], 50) for grid in axes]
+    data = np.asarray(nch.fields['GM'])
+    np.testing.assert_allclose(interp_points(axes, data, points), interpn(axes, data, np.stack(points, axis=-1)),
+                               rtol=1e-12)
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+from inputs import parse_inputs, parse_value
+
+def test_parse_value():
+    np.testing.assert_allclose(parse_value('0.2:0.1:0.5'), [0.2, 0.3, 0.4])
+    np.testing.assert_allclose(parse_value('0.2, 0.5, 1'), [0.2, 0.5, 1])
+    assert parse_value('0.6') == 0.6
+    assert parse_value(0.6) == 0.6
+
+def test_parse_inputs_reports_varying_input():
+    params, varying = parse_inputs({'L': '0.2:0.1:0.5', 'VDS': '0.6', 'VSB': ' ', '': '1'})
+    assert set(params) == {'L', 'VDS'}
+    assert varying[0] == 'L'
+    with pytest.raises(ValueError, match='VDS'):
+        parse_inputs({'VDS': 'abc'})
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from scipy import io
+from benchmarks.synthetic import to_struct
+from device_table import LazyFields
+from lazy_table import open_devices, open_lazy
+from lookup import lookup
+
+def test_fields_are_released_under_the_ceiling(nch):
+    loads = []
+    def load(name):
+        loads.append(name)
+        return nch.fields[name]
+
+    field = nch.fields['ID'].nbytes
+    fields = LazyFields(nch.names, load, max_bytes=2 * field)
+    fields.shape = nch.shape
+    assert fields.loaded == () and fields.nbytes == 0
+    for name in ('ID', 'GM', 'ID', 'CGG'):
+        np.testing.assert_array_equal(fields[name], nch.fields[name])
+    # GM was the least recently used field when CGG was loaded
+    assert fields.loaded == ('ID', 'CGG') and fields.nbytes == 2 * field
+    fields['GM']
+    assert loads == ['ID', 'GM', 'CGG', 'GM']
+
+    # Fields set explicitly stay in memory and are not counted against the ceiling
+    fields['X'] = np.zeros(nch.shape)
+    fields.release()
+    assert fields.loaded == ('X',) and 'X' in fields and len(fields) == len(nch.names) + 1
+
+def test_mat_file_is_converted_once(nch, tmp_path):
+    io.savemat(tmp_path / 'nch.mat', {'nch': to_struct(nch), 'pch': to_struct(nch)})
+    cache = tmp_path / 'cache'
+    tables = open_devices(str(tmp_path / 'nch.mat'), cache_dir=str(cache))
+    assert sorted(tables) == ['nch', 'pch']
+    spill = sorted(os.listdir(cache))
+    assert len(spill) == 2
+
+    table = open_lazy(str(tmp_path / 'nch.mat'), 'nch', max_bytes=nch.fields['ID'].nbytes, cache_dir=str(cache))
+    assert sorted(os.listdir(cache)) == spill
+    assert table.field_nbytes == 0
+    np.testing.assert_array_equal(lookup(table, 'GM_ID', 'L', 0.5), lookup(nch, 'GM_ID', 'L', 0.5))
+    assert table.field_nbytes == nch.fields['ID'].nbytes
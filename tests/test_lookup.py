@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from lookup import lookup, lookup_many, prepare_lookup
+
+GM_ID = np.linspace(6, 20, 8)
+
+def _weight(grid, value):
+    """Lower grid index and linear weight of value between grid[lo] and grid[lo + 1]."""
+    lo = np.searchsorted(grid, value) - 1
+    return lo, (value - grid[lo]) / (grid[lo + 1] - grid[lo])
+
+def test_mode3_blends_bracketing_curves(nch):
+    l, wl = _weight(nch.L, 0.5)
+    d, wd = _weight(nch.VDS, 0.33)
+    curve = lambda L, VDS: lookup(nch, 'GM_CGG', 'GM_ID', GM_ID, 'L', nch.L[L], 'VDS', nch.VDS[VDS])
+
+    expected = (1 - wl) * curve(l, d) + wl * curve(l + 1, d)
+    np.testing.assert_allclose(lookup(nch, 'GM_CGG', 'GM_ID', GM_ID, 'L', 0.5, 'VDS', nch.VDS[d]),
+                               expected, rtol=1e-12)
+
+    expected = ((1 - wl) * ((1 - wd) * curve(l, d) + wd * curve(l, d + 1))
+                + wl * ((1 - wd) * curve(l + 1, d) + wd * curve(l + 1, d + 1)))
+    np.testing.assert_allclose(lookup(nch, 'GM_CGG', 'GM_ID', GM_ID, 'L', 0.5, 'VDS', 0.33),
+                               expected, rtol=1e-12)
+
+@pytest.mark.parametrize('name, index', [('L', 3), ('L', [1, 3, 6]), ('VDS', [6, 16])])
+def test_mode3_on_grid_matches_snap(nch, name, index):
+    inputs = (name, nch.axes[name][index])
+    blended = lookup(nch, 'GM_GDS', 'GM_ID', GM_ID, *inputs)
+    np.testing.assert_array_equal(blended, lookup(nch, 'GM_GDS', 'GM_ID', GM_ID, *inputs, 'SNAP', 'on'))
+
+def test_pointwise_matches_single_lookups(nch):
+    L, VGS, VDS = [0.25, 0.5, 1.5], [0.425, 0.6, 0.825], [0.33, 0.53, 0.93]
+    result = lookup(nch, 'GM_ID', 'L', L, 'VGS', VGS, 'VDS', VDS, 'VSB', 0.1, 'POINTWISE', 'on')
+    assert result.shape == (3,)
+    for i in range(3):
+        np.testing.assert_allclose(result[i], lookup(nch, 'GM_ID', 'L', L[i], 'VGS', VGS[i], 'VDS', VDS[i], 'VSB', 0.1),
+                                   rtol=1e-12)
+
+@pytest.mark.parametrize('outvars, args', [
+    (['ID', 'GM_ID', 'GM/(2*pi*CGG)'], ('VGS', np.arange(0.2, 1.1, 0.1), 'L', [0.3, 0.9], 'VDS', 0.33)),
+    (['ID', 'GM_GDS'], ('L', [0.25, 0.5], 'VGS', [0.4, 0.7], 'POINTWISE', 'on')),
+    (['GM_CGG', 'GM_GDS', 'ID_W'], ('GM_ID', np.linspace(6, 20, 8), 'L', [0.3, 0.9], 'VDS', 0.33)),
+])
+def test_lookup_many_matches_lookup(nch, outvars, args):
+    result = lookup_many(nch, outvars, *args)
+    assert list(result) == outvars
+    for outvar in outvars:
+        np.testing.assert_array_equal(result[outvar], lookup(nch, outvar, *args))
+
+    # With GRAD every output is a (value, gradient) pair
+    value, gradient = lookup_many(nch, outvars, *args, 'GRAD', 'on')[outvars[0]]
+    expected, expected_gradient = lookup(nch, outvars[0], *args, 'GRAD', 'on')
+    np.testing.assert_array_equal(value, expected)
+    for key in expected_gradient:
+        np.testing.assert_array_equal(gradient[key], expected_gradient[key])
+
+# Off-grid operating points (mid-cell), so small steps stay inside one interpolation cell
+POINT = {'L': 0.5, 'VGS': np.array([0.425, 0.625, 0.825]), 'VDS': 0.33, 'VSB': 0.1}
+POINTS = {'L': [0.25, 0.5, 1.5], 'VGS': [0.425, 0.625, 0.825], 'VDS': [0.33, 0.53, 0.93], 'VSB': 0.1,
+          'POINTWISE': 'on'}
+
+def _assert_central(partial, f, inputs, key, h):
+    """Compare partial with the central difference of f(inputs) along inputs[key], up to its rounding error."""
+    shifted = lambda step: f({**inputs, key: np.asarray(inputs[key], dtype=np.float64) + step})
+    rounding = 1e-12 * np.max(np.abs(f(inputs))) / h
+    np.testing.assert_allclose(partial, (shifted(h) - shifted(-h)) / (2 * h), rtol=1e-7, atol=rounding)
+
+@pytest.mark.parametrize('outvar', ['ID', 'GM_ID'])
+@pytest.mark.parametrize('inputs', [POINT, POINTS], ids=['grid', 'pointwise'])
+def test_gradient_matches_central_differences(nch, outvar, inputs):
+    value, gradient = lookup(nch, outvar, GRAD='on', **inputs)
+    f = lambda inputs: lookup(nch, outvar, **inputs)
+    np.testing.assert_array_equal(value, f(inputs))
+    for key in ('L', 'VGS', 'VDS', 'VSB'):
+        assert gradient[key].shape == value.shape
+        _assert_central(gradient[key], f, inputs, key, 1e-4)
+
+@pytest.mark.parametrize('L', [0.5, [0.25, 0.5, 1.5]], ids=['point', 'L_sweep'])
+def test_mode3_gradient_matches_central_differences(nch, L):
+    inputs = {'GM_ID': np.array([8.0, 12.0, 16.0]), 'L': L, 'VDS': 0.33, 'VSB': 0.1}
+    f = lambda inputs: lookup(nch, 'GM_CGG', 'GM_ID', inputs['GM_ID'],
+                              **{key: inputs[key] for key in ('L', 'VDS', 'VSB')})
+    value, gradient = lookup(nch, 'GM_CGG', 'GM_ID', inputs['GM_ID'], GRAD='on',
+                             **{key: inputs[key] for key in ('L', 'VDS', 'VSB')})
+    np.testing.assert_array_equal(value, f(inputs))
+    _assert_central(gradient['GM_ID'], f, inputs, 'GM_ID', 1e-4)
+    for key in ('L', 'VDS', 'VSB'):
+        _assert_central(gradient[key], f, inputs, key, 1e-4)
+
+@pytest.mark.parametrize('outvar, xvar, values, fixed', [
+    ('ID', 'VGS', np.arange(0.2, 1.1, 0.07), {'L': 0.5, 'VDS': 0.33}),
+    ('GM_ID', 'L', [0.2, 0.5, 1.7], {'VGS': 0.6, 'VSB': 0.1}),
+    ('GM_CGG', 'GM_ID', np.linspace(6, 20, 8), {'L': 0.5, 'VDS': 0.33}),
+    ('ID_W', 'L', [0.2, 0.5, 1.7], {'GM_ID': 15, 'VDS': 0.6}),
+])
+def test_prepared_lookup_matches_lookup(nch, outvar, xvar, values, fixed):
+    plan = prepare_lookup(nch, outvar, xvar=xvar, fixed=fixed)
+    ratio = [key for key in fixed if '_' in key]
+    args = (ratio[0], fixed[ratio[0]]) if ratio else ()
+    inputs = {key: value for key, value in fixed.items() if key not in ratio}
+    for x in (values, values[1]):
+        expected = lookup(nch, outvar, *args, xvar, x, **inputs)
+        np.testing.assert_allclose(plan(x), expected, rtol=1e-12)
+
+def test_prepared_lookup_rejects_gradient(nch):
+    with pytest.raises(ValueError, match='GRAD'):
+        prepare_lookup(nch, 'GM_CGG', xvar='GM_ID', fixed={'L': 0.5}, GRAD='on')
@@ -0,0 +1,30 @@
+import threading
+import lookup_stats
+from lookup import lookup
+
+def test_statistics_only_when_enabled(nch, monkeypatch):
+    monkeypatch.setattr(lookup_stats, 'ENABLED', False)
+    lookup_stats.reset_stats()
+    lookup(nch, 'GM_ID', 'L', 0.5)
+    assert lookup_stats.get_stats() == {'timers': {}, 'counters': {}}
+
+    monkeypatch.setattr(lookup_stats, 'ENABLED', True)
+    lookup(nch, 'GM_ID', 'L', 0.5)
+    assert lookup_stats.get_stats()['timers']['lookup.mode2']['calls'] == 1
+    assert 'lookup.mode2' in lookup_stats.report()
+    lookup_stats.reset_stats()
+
+def test_counters_are_thread_safe(monkeypatch):
+    monkeypatch.setattr(lookup_stats, 'ENABLED', True)
+    lookup_stats.reset_stats()
+
+    def work():
+        for _ in range(10000):
+            lookup_stats.count('test.events')
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lookup_stats.get_stats()['counters']['test.events'] == 40000
+    lookup_stats.reset_stats()
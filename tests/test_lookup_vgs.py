@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from lookup_vgs import lookup_vgs, lookup_vgs_batch
+
+def _scalar(table, **kwargs):
+    """lookup_vgs for one design point, NaN where it finds no solution."""
+    result = np.ravel(lookup_vgs(table, **kwargs))
+    return result[0] if result.size else np.nan
+
+@pytest.mark.parametrize('ratio, targets', [
+    ('GM_ID', [4, 8, 12, 16, 20, 24]),
+    ('ID_W', [1e-7, 1e-6, 1e-5, 1e-4]),
+])
+@pytest.mark.parametrize('method', ['pchip', 'linear'])
+def test_batch_matches_scalar_mode1(nch, ratio, targets, method):
+    L = np.array([nch.L[0], 0.35, 1.0, 0.95 * nch.L[-1]])[:, None]
+    targets = np.array(targets)[None, :]
+    batch = lookup_vgs_batch(nch, **{ratio: targets}, L=L, VDS=0.6, VSB=0.1, METHOD=method)
+    loop = np.array([[_scalar(nch, **{ratio: t}, L=l, VDS=0.6, VSB=0.1, METHOD=method)
+                      for t in targets[0]] for l in L[:, 0]])
+    np.testing.assert_allclose(batch, loop, rtol=0, atol=1e-12)
+
+def test_batch_matches_scalar_mode2(nch):
+    targets = np.array([6, 10, 14, 18])
+    batch = lookup_vgs_batch(nch, GM_ID=targets, VDB=0.6, VGB=1.0, L=0.5)
+    loop = np.array([_scalar(nch, GM_ID=t, VDB=0.6, VGB=1.0, L=0.5) for t in targets])
+    np.testing.assert_allclose(batch, loop, rtol=0, atol=1e-12)
+
+def test_inverse_grid_is_opt_in(nch):
+    from lookup_vgs import precompute_inverse
+    table = type(nch)(nch.L, nch.VGS, nch.VDS, nch.VSB, nch.W, nch.fields)
+    targets = np.arange(4, 24.05, 0.5)
+    precompute_inverse(table, 'GM_ID', targets)
+
+    point = dict(L=0.37, VDS=0.63, VSB=0.11)
+    exact = lookup_vgs_batch(nch, GM_ID=np.array([8.25, 15.75]), **point)
+    np.testing.assert_array_equal(lookup_vgs_batch(table, GM_ID=np.array([8.25, 15.75]), **point), exact)
+    assert _scalar(table, GM_ID=15.75, **point) == _scalar(nch, GM_ID=15.75, **point)
+
+    # At the simulated L, VDS, VSB and the target axis the grid reproduces the exact inversion
+    node = dict(L=table.L[2], VDS=table.VDS[10], VSB=table.VSB[1])
+    np.testing.assert_allclose(lookup_vgs_batch(table, GM_ID=targets, INVERSE='on', **node),
+                               lookup_vgs_batch(table, GM_ID=targets, **node), rtol=0, atol=1e-12)
+    with pytest.raises(ValueError):
+        lookup_vgs_batch(table, GM_ID=10, VDB=0.6, VGB=1.0, INVERSE='on')
@@ -0,0 +1,14 @@
+import numpy as np
+from sweep import run_sweep
+from table_store import load_table, write_table
+
+def test_modified_table_is_not_reloaded_by_workers(nch, tmp_path):
+    write_table(nch, tmp_path / 'nch.gmid')
+    table = load_table(tmp_path / 'nch.gmid')
+    table.set_field('ID', 2 * np.asarray(table.fields['ID']))
+    assert table.source is None
+
+    spec = {'outputs': ['ID', 'GM_ID'], 'L': table.L[::2], 'VDS': [0.3, 0.6]}
+    result, _ = run_sweep(table, spec, processes=2)
+    expected, _ = run_sweep(table, spec, processes=1)
+    np.testing.assert_array_equal(result, expected)
@@ -0,0 +1,39 @@
+import numpy as np
+from benchmarks.synthetic import make_table
+from lookup import lookup, lookup_many
+from lookup_vgs import lookup_vgs_batch
+from table_set import TableSet
+
+def _corners():
+    return TableSet([make_table('small', 'nch'), make_table('small', 'nch', W=7.0).compact()], ['TT', 'W7'])
+
+def test_corners_match_their_tables():
+    corners = _corners()
+    cases = [
+        ('ID', (), {'VGS': np.arange(0.2, 1.0, 0.1), 'L': [0.3, 0.9]}),
+        ('GM_ID', ('L', [0.25, 0.5, 1.5], 'VGS', [0.4, 0.6, 0.8], 'POINTWISE', 'on'), {}),
+        ('GM_CGG', ('GM_ID', np.linspace(5, 20, 7), 'L', 0.5), {}),
+    ]
+    for outvar, args, kwargs in cases:
+        result = lookup(corners, outvar, *args, **kwargs)
+        many = lookup_many(corners, [outvar], *args, **kwargs)[outvar]
+        for i, table in enumerate(corners.tables):
+            expected = lookup(table, outvar, *args, **kwargs)
+            np.testing.assert_array_equal(result[i], expected)
+            np.testing.assert_array_equal(many[i], expected)
+
+    result = lookup_vgs_batch(corners, GM_ID=[10, 15], L=0.5)
+    for i, table in enumerate(corners.tables):
+        np.testing.assert_array_equal(result[i], lookup_vgs_batch(table, GM_ID=[10, 15], L=0.5))
+
+def test_corners_use_the_table_caches():
+    corners = _corners()
+    lookup(corners, 'GM_ID', 'L', 0.5)
+    # The compact corner keeps its ratio grid in float32, in its own budgeted cache
+    assert corners['W7'].ratio('GM', 'ID').data.dtype == np.float32
+    assert corners['W7'].cache_nbytes == corners['TT'].cache_nbytes // 2
+
+    # Changes to a corner are seen by the next lookup
+    table = corners['TT']
+    table.set_field('GM', 2 * np.asarray(table.field('GM')))
+    np.testing.assert_array_equal(lookup(corners, 'GM_ID', 'L', 0.5)[0], lookup(table, 'GM_ID', 'L', 0.5))
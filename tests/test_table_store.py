@@ -0,0 +1,28 @@
+import numpy as np
+from scipy import io
+from benchmarks.synthetic import to_struct
+from lookup import lookup
+from table_store import convert_mat, load_table, read_header, write_table
+
+def test_native_round_trip(nch, tmp_path):
+    path = tmp_path / 'nch.gmid'
+    write_table(nch, path, 'nch')
+    assert read_header(path)['device'] == 'nch'
+
+    table = load_table(path)
+    assert table.source == str(path)
+    assert table.W == nch.W and table.meta['TEMP'] == nch.meta['TEMP']
+    for key in nch.axes:
+        np.testing.assert_array_equal(table.axes[key], nch.axes[key])
+    for name in nch.fields:
+        # Read-only views of the file mapping, not copies
+        assert not table.fields[name].flags.writeable and not table.fields[name].flags.owndata
+        np.testing.assert_array_equal(table.fields[name], nch.fields[name])
+    np.testing.assert_array_equal(lookup(table, 'GM_CGG', 'GM_ID', 12, 'L', 0.5),
+                                  lookup(nch, 'GM_CGG', 'GM_ID', 12, 'L', 0.5))
+
+def test_convert_mat(nch, tmp_path):
+    io.savemat(tmp_path / 'nch.mat', {'nch': to_struct(nch)})
+    path = convert_mat(str(tmp_path / 'nch.mat'))
+    assert path == str(tmp_path / 'nch_nch.gmid')
+    np.testing.assert_array_equal(load_table(path).fields['ID'], nch.fields['ID'])